@@ -0,0 +1,122 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .utils.metrics import REGISTRY
+
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_MAX_QUEUE = 16
+# 排队超过该时长（秒）仍未轮到，同样按过载拒绝
+DEFAULT_MAX_WAIT = 120
+DEFAULT_MAX_MARKDOWN_MB = 5
+DEFAULT_MAX_IMAGES_MB = 50
+
+# 成本估算：一次转换至少 1 个单位，Markdown 每 256KB、图片每 8MB 再加 1 个单位
+MARKDOWN_COST_BYTES = 256 * 1024
+IMAGE_COST_BYTES = 8 * 1024 * 1024
+
+_REJECTED = REGISTRY.counter(
+    "markpress_admission_rejected_total", "Requests rejected by admission control, by reason", ("reason",))
+_CAPACITY_USED = REGISTRY.gauge(
+    "markpress_admission_cost_in_use", "Estimated cost units of conversions currently admitted")
+
+
+class AdmissionRejected(Exception):
+    """请求被准入控制拒绝，status 为 HTTP 状态码（413 / 429），retry_after 为建议的重试秒数"""
+
+    def __init__(self, status: int, detail: str, retry_after: int = None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    /api/convert 的准入控制：
+    按上传体积估算每次转换的成本，同时运行的总成本不超过 max_concurrent 个单位（大文档占用更多名额）；
+    放不下的请求按到达顺序排队，队列已满或等待超过 max_wait 时返回 429，
+    Retry-After 由最近转换的"每单位成本耗时"滑动平均推算。
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT, max_queue: int = DEFAULT_MAX_QUEUE,
+                 max_markdown_bytes: int = DEFAULT_MAX_MARKDOWN_MB * 1024 * 1024,
+                 max_image_bytes: int = DEFAULT_MAX_IMAGES_MB * 1024 * 1024, max_wait: float = DEFAULT_MAX_WAIT):
+        self.capacity = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.max_markdown_bytes = max_markdown_bytes
+        self.max_image_bytes = max_image_bytes
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._in_use = 0.0
+        # [(ticket, cost)]，按到达顺序
+        self._waiting = deque()
+        # 每单位成本的转换耗时（秒），指数滑动平均
+        self._seconds_per_cost = 2.0
+
+    @property
+    def max_request_bytes(self) -> int:
+        return self.max_markdown_bytes + self.max_image_bytes
+
+    def check_request_length(self, content_length: int, overhead: int = 0):
+        """按 Content-Length 预检整个请求体（含 multipart 开销 overhead）"""
+        limit = self.max_request_bytes + overhead
+        if content_length > limit:
+            _REJECTED.inc(reason="request_size")
+            raise AdmissionRejected(413, f"请求体过大 ({content_length} 字节，上限 {limit})")
+
+    def check_size(self, markdown_bytes: int, image_bytes: int):
+        if markdown_bytes > self.max_markdown_bytes:
+            _REJECTED.inc(reason="markdown_size")
+            raise AdmissionRejected(413, f"Markdown 文件过大 ({markdown_bytes} 字节，上限 {self.max_markdown_bytes})")
+        if image_bytes > self.max_image_bytes:
+            _REJECTED.inc(reason="image_size")
+            raise AdmissionRejected(413, f"图片总大小过大 ({image_bytes} 字节，上限 {self.max_image_bytes})")
+
+    def estimate_cost(self, markdown_bytes: int, image_bytes: int) -> float:
+        cost = 1 + markdown_bytes / MARKDOWN_COST_BYTES + image_bytes / IMAGE_COST_BYTES
+        # 单个请求最多占满全部名额，否则永远无法被接纳
+        return min(float(self.capacity), cost)
+
+    def _retry_after(self, cost: float) -> int:
+        pending = self._in_use + sum(c for _, c in self._waiting) + cost
+        return max(1, math.ceil(pending * self._seconds_per_cost / self.capacity))
+
+    @contextmanager
+    def admit(self, cost: float):
+        """在 with 块内占用 cost 个单位；无法接纳时抛出 AdmissionRejected(429)"""
+        with self._cond:
+            runnable_now = not self._waiting and self._in_use + cost <= self.capacity
+            if not runnable_now and len(self._waiting) >= self.max_queue:
+                _REJECTED.inc(reason="queue_full")
+                raise AdmissionRejected(429, "服务繁忙，排队已满", self._retry_after(cost))
+
+            ticket = object()
+            self._waiting.append((ticket, cost))
+            deadline = time.monotonic() + self.max_wait
+            while not (self._waiting[0][0] is ticket and self._in_use + cost <= self.capacity):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove((ticket, cost))
+                    self._cond.notify_all()
+                    _REJECTED.inc(reason="timeout")
+                    raise AdmissionRejected(429, "服务繁忙，排队超时", self._retry_after(cost))
+                self._cond.wait(remaining)
+            self._waiting.popleft()
+            self._in_use += cost
+            _CAPACITY_USED.set(self._in_use)
+            # 队首出队后，后面的请求可能也放得下
+            self._cond.notify_all()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self._in_use -= cost
+                _CAPACITY_USED.set(self._in_use)
+                self._seconds_per_cost = 0.8 * self._seconds_per_cost + 0.2 * elapsed / cost
+                self._cond.notify_all()
@@ -0,0 +1,215 @@
+import contextlib
+import glob
+import io
+import json
+import math
+import os
+import platform
+import re
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import reportlab
+
+from . import converter
+from .core import MarkPressEngine
+from .stress import StressSpec, write_document
+from .utils.tracing import StageTotals, span, tracing
+from .utils.utils import APP_TMP
+
+# 未指定输入时使用的合成文档倍率：语料随 seed 确定生成，不依赖当前目录或源码仓库里的文件
+DEFAULT_SYNTHETIC_SCALES = (1.0,)
+
+# 与基准相比，耗时或峰值内存超过该比例即视为性能回退
+DEFAULT_TOLERANCE = 0.2
+
+# 统计的阶段（按流水线顺序输出）即 utils.tracing 埋点的 category，均为"自身耗时"：嵌套在内部的其他阶段已被扣除
+STAGES = ("io", "parse", "html", "block", "inline", "math", "images", "layout", "write")
+
+
+def find_corpus(inputs: list) -> list:
+    """展开输入：文件原样保留，目录取其中的 .md 文件"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "*.md"))))
+        else:
+            paths.append(item)
+    return [os.path.abspath(p) for p in paths]
+
+
+def synthetic_corpus(out_dir: str, scales: list, seed: int = 0, spec: StressSpec = StressSpec()) -> list:
+    """按倍率生成一组合成压力文档（synthetic-x<倍率>.md），同一 seed 下内容完全确定"""
+    os.makedirs(out_dir, exist_ok=True)
+    return [write_document(os.path.join(out_dir, f"synthetic-x{scale:g}.md"), spec.scaled(scale), seed)
+            for scale in scales]
+
+
+def _run_once(engine: MarkPressEngine, md_path: str, out_path: str, measure_memory: bool = False,
+              verbose: bool = False) -> dict:
+    stages = StageTotals()
+    base_dir = os.path.dirname(md_path)
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        with sink, tracing(stages):
+            start = time.perf_counter()
+            with span("read", "io"), open(md_path, "r", encoding="utf-8") as f:
+                text = f.read()
+            ast = converter.parse_markdown(text)
+            engine.reset(out_path)
+            converter.render_document(engine, ast, base_dir)
+            engine.save_pdf()
+            total = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if measure_memory else None
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+
+    return {"total": total, "stages": {s: stages.totals.get(s, 0.0) for s in STAGES}, "peak": peak}
+
+
+def run_benchmark(paths: list, theme: str = "academic", repeat: int = 3, offline: bool = True,
+                  verbose: bool = False) -> dict:
+    """
+    对每个文档重复转换 repeat 次，取各阶段耗时的中位数；再额外跑一次开启 tracemalloc 记录峰值内存
+    （tracemalloc 会显著拖慢执行，因此不与计时混在一起）。
+    字体注册、KaTeX 浏览器启动等一次性开销单独记为 startup，不计入单篇文档。
+    """
+    previous_offline = os.environ.get("MARKPRESS_OFFLINE")
+    if offline:
+        os.environ["MARKPRESS_OFFLINE"] = "1"
+
+    os.makedirs(APP_TMP, exist_ok=True)
+    out_dir = tempfile.mkdtemp(prefix="bench-", dir=APP_TMP)
+    try:
+        start = time.perf_counter()
+        with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+            engine = MarkPressEngine(os.path.join(out_dir, "warmup.pdf"), theme)
+        startup = time.perf_counter() - start
+
+        documents = {}
+        try:
+            for md_path in paths:
+                name = os.path.basename(md_path)
+                out_path = os.path.join(out_dir, os.path.splitext(name)[0] + ".pdf")
+                runs = [_run_once(engine, md_path, out_path, verbose=verbose) for _ in range(max(1, repeat))]
+                memory_run = _run_once(engine, md_path, out_path, measure_memory=True, verbose=verbose)
+                documents[name] = {
+                    "total": statistics.median(r["total"] for r in runs),
+                    "stages": {s: statistics.median(r["stages"][s] for r in runs) for s in STAGES},
+                    "peak_mb": memory_run["peak"] / (1024 * 1024),
+                    "pages": _count_pages(out_path),
+                }
+                print(f"[MarkPress] bench {name}: {documents[name]['total']:.3f}s, "
+                      f"峰值内存 {documents[name]['peak_mb']:.1f} MB")
+        finally:
+            engine.close_katex_render()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        # 恢复调用方的环境，run_benchmark 可能在 server 等长驻进程里被调用
+        if previous_offline is None:
+            os.environ.pop("MARKPRESS_OFFLINE", None)
+        else:
+            os.environ["MARKPRESS_OFFLINE"] = previous_offline
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "reportlab": reportlab.Version,
+            "platform": platform.platform(),
+            "theme": theme,
+            "repeat": repeat,
+            "offline": offline,
+        },
+        "startup": startup,
+        "documents": documents,
+    }
+
+
+def _count_pages(pdf_path: str) -> int:
+    # ReportLab 输出的每个页面对象都带有 /Type /Page（页面树是 /Pages），无需解析整个 PDF
+    try:
+        with open(pdf_path, "rb") as f:
+            return len(re.findall(rb"/Type /Page\b", f.read()))
+    except OSError:
+        return 0
+
+
+def compare_with_baseline(result: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """返回回退项列表：[(文档, 指标, 基准值, 当前值)]，只比较双方都有的文档"""
+    regressions = []
+    base_docs = baseline.get("documents", {})
+    for name, cur in result["documents"].items():
+        base = base_docs.get(name)
+        if not base:
+            continue
+        for metric in ("total", "peak_mb"):
+            old, new = base.get(metric), cur.get(metric)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def format_report(result: dict, baseline: dict = None) -> str:
+    base_docs = (baseline or {}).get("documents", {})
+    header = ["document", "pages", "total(s)", "Δ", "peak(MB)", "Δ"] + list(STAGES)
+    rows = []
+    for name, doc in result["documents"].items():
+        base = base_docs.get(name, {})
+
+        def delta(metric):
+            old = base.get(metric)
+            return f"{(doc[metric] - old) / old:+.0%}" if old else "-"
+
+        rows.append([name, str(doc["pages"]), f"{doc['total']:.3f}", delta("total"),
+                     f"{doc['peak_mb']:.1f}", delta("peak_mb")]
+                    + [f"{doc['stages'][s]:.3f}" for s in STAGES])
+
+    widths = [max(len(r[i]) for r in [header] + rows) for i in range(len(header))]
+    lines = ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)) for row in [header] + rows]
+    lines.append(f"startup (fonts / KaTeX): {result['startup']:.3f}s")
+    return "\n".join(lines)
+
+
+def scaling_exponents(result: dict, scales: list) -> dict:
+    """
+    用最小与最大倍率的两篇合成文档估算各阶段的增长阶数 k（耗时 ∝ 规模^k）：
+    k≈1 为线性，明显大于 1 说明该阶段随文档变大而超线性变慢。
+    """
+    docs = result["documents"]
+    low, high = min(scales), max(scales)
+    small, large = docs.get(f"synthetic-x{low:g}.md"), docs.get(f"synthetic-x{high:g}.md")
+    if not small or not large or high <= low:
+        return {}
+
+    def exponent(old, new):
+        # 过短的阶段计时噪声太大，不做估计
+        if old < 1e-3 or new < 1e-3:
+            return None
+        return math.log(new / old) / math.log(high / low)
+
+    exponents = {"total": exponent(small["total"], large["total"])}
+    exponents.update({s: exponent(small["stages"][s], large["stages"][s]) for s in STAGES})
+    return exponents
+
+
+def format_scaling(exponents: dict) -> str:
+    cells = [f"{name}={k:.2f}" for name, k in exponents.items() if k is not None]
+    return "scaling exponent (time ∝ size^k): " + ("  ".join(cells) if cells else "-")
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(result: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
@@ -3,9 +3,19 @@ import sys
 from pathlib import Path
 
 
-def _cmd_convert(args):
-    from markpress.converter import convert_markdown_file
+def _report_failure(e: Exception, debug: bool):
+    print(f"\n[CRITICAL] 引擎宕机: {str(e)}", file=sys.stderr)
+    if debug:
+        # 守护进程 / 工作进程内的异常在本进程里没有堆栈，先打印对方传回的追踪
+        detail = getattr(e, "detail", None)
+        if detail:
+            print(detail, file=sys.stderr)
+        raise e
+    print("提示: 添加 --debug 参数查看详细堆栈追踪。", file=sys.stderr)
+    sys.exit(1)
 
+
+def _cmd_convert(args):
     input_path = Path(args.input).resolve()
     if not input_path.exists() or not input_path.is_file():
         print(f"[Fatal] 找不到输入文件: {input_path}", file=sys.stderr)
@@ -17,23 +27,147 @@ def _cmd_convert(args):
     else:
         output_path = input_path.with_suffix(".pdf")
 
+    # 流式、并行排版与 trace 只在进程内支持，其余情况优先交给守护进程
+    if not (args.no_daemon or args.stream or args.workers or args.trace):
+        from markpress.daemon import try_convert
+        try:
+            elapsed = try_convert(str(input_path), str(output_path), args.theme, preview_pages=args.preview)
+        except Exception as e:
+            _report_failure(e, args.debug)
+        if elapsed is not None:
+            print(f"[MarkPress] 编译成功 (守护进程, {elapsed:.2f}s)！输出路径: {output_path}")
+            sys.exit(0)
+
+    from markpress.converter import convert_markdown_file
+
+    recorder = None
+    if args.trace:
+        from markpress.utils.tracing import ChromeTraceRecorder, add_listener
+        recorder = ChromeTraceRecorder()
+        add_listener(recorder)
+
     try:
         print(f"[MarkPress] 正在编译: {input_path.name} -> {output_path.name}")
-        convert_markdown_file(str(input_path), str(output_path), args.theme)
+        convert_markdown_file(str(input_path), str(output_path), args.theme,
+                              stream=args.stream, stream_chunk=args.stream_chunk, workers=args.workers,
+                              preview_pages=args.preview)
         print(f"[MarkPress] 编译成功！输出路径: {output_path}")
         sys.exit(0)
     except Exception as e:
-        print(f"\n[CRITICAL] 引擎宕机: {str(e)}", file=sys.stderr)
-        if args.debug:
-            raise e
-        print("提示: 添加 --debug 参数查看详细堆栈追踪。", file=sys.stderr)
+        _report_failure(e, args.debug)
+    finally:
+        # 失败时同样写出 trace，方便定位卡在哪个阶段
+        if recorder is not None:
+            recorder.save(args.trace)
+            print(f"[MarkPress] Trace 已写入: {args.trace} (可用 chrome://tracing 或 Perfetto 打开)")
+
+
+def _cmd_watch(args):
+    from markpress.watch import Watcher
+
+    input_path = Path(args.input).resolve()
+    if not input_path.exists() or not input_path.is_file():
+        print(f"[Fatal] 找不到输入文件: {input_path}", file=sys.stderr)
         sys.exit(1)
 
+    if args.output:
+        output_path = Path(args.output).resolve()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+    else:
+        output_path = input_path.with_suffix(".pdf")
+
+    Watcher(str(input_path), str(output_path), args.theme).run()
+
+
+def _cmd_bench(args):
+    import shutil
+    import tempfile
+    from markpress import bench
+    from markpress.utils.utils import APP_TMP
+
+    scales = []
+    if args.synthetic:
+        try:
+            scales = sorted({float(s) for s in args.synthetic.split(",") if s.strip()})
+        except ValueError:
+            print(f"[Fatal] 无效的倍率列表: {args.synthetic}", file=sys.stderr)
+            sys.exit(1)
+    # 什么都没指定时跑默认倍率的合成文档，tests/ 不随发行包安装
+    if not args.inputs and not scales:
+        scales = list(bench.DEFAULT_SYNTHETIC_SCALES)
+
+    paths = bench.find_corpus(args.inputs) if args.inputs else []
+    synthetic_dir = None
+    if scales:
+        Path(APP_TMP).mkdir(parents=True, exist_ok=True)
+        synthetic_dir = tempfile.mkdtemp(prefix="synthetic-", dir=APP_TMP)
+        paths += bench.synthetic_corpus(synthetic_dir, scales, seed=args.seed)
+    if not paths:
+        print("[Fatal] 没有找到可用于基准测试的 Markdown 文件", file=sys.stderr)
+        sys.exit(1)
+
+    baseline = bench.load_baseline(args.baseline) if args.baseline else None
+    try:
+        result = bench.run_benchmark(paths, theme=args.theme, repeat=args.repeat,
+                                     offline=not args.online, verbose=args.verbose)
+    finally:
+        if synthetic_dir:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+    print(bench.format_report(result, baseline))
+    if len(scales) > 1:
+        print(bench.format_scaling(bench.scaling_exponents(result, scales)))
+
+    if args.save_baseline:
+        bench.save_baseline(result, args.save_baseline)
+        print(f"[MarkPress] 基准已保存: {args.save_baseline}")
+
+    if baseline:
+        regressions = bench.compare_with_baseline(result, baseline, args.tolerance)
+        for name, metric, old, new in regressions:
+            print(f"[Warn] 性能回退 {name} {metric}: {old:.3f} -> {new:.3f}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+def _cmd_daemon(args):
+    from markpress.daemon import Daemon, default_socket_path, request
+
+    socket_path = args.socket or default_socket_path()
+    if args.stop or args.status:
+        reply = request({"op": "stop" if args.stop else "ping"}, socket_path)
+        if reply is None:
+            print(f"[MarkPress] 守护进程未运行 ({socket_path})")
+            sys.exit(1)
+        if args.stop:
+            print("[MarkPress] 已通知守护进程退出")
+        else:
+            info = reply[1]
+            print(f"[MarkPress] 守护进程运行中: v{info.get('version', '未知')}，pid {info['pid']}，{info['workers']} 个转换进程，"
+                  f"已完成 {info['handled']} 次转换（失败 {info['failed']} 次），已运行 {info['uptime']:.0f}s")
+        sys.exit(0)
+
+    import socket
+    if not hasattr(socket, "AF_UNIX"):
+        print("[Fatal] 当前平台不支持 Unix 套接字，无法启动守护进程", file=sys.stderr)
+        sys.exit(1)
+    daemon = Daemon(socket_path, workers=args.workers, max_jobs=args.worker_max_jobs,
+                    max_rss_mb=args.worker_max_rss)
+    try:
+        daemon.serve_forever()
+    except RuntimeError as e:
+        print(f"[Fatal] {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
 
 def _cmd_serve(args):
     from markpress.server import serve
     print(f"[MarkPress] Web 界面已启动 → http://{args.host}:{args.port}")
-    serve(host=args.host, port=args.port)
+    serve(host=args.host, port=args.port, job_workers=args.job_workers, job_queue=args.job_queue,
+          job_ttl=args.job_ttl, workers=args.workers, worker_max_jobs=args.worker_max_jobs,
+          worker_max_rss_mb=args.worker_max_rss, cache_dir=args.cache_dir, cache_mb=args.cache_size,
+          max_concurrent=args.max_concurrent, max_queue=args.max_queue, max_markdown_mb=args.max_markdown_mb,
+          max_images_mb=args.max_images_mb, in_memory=args.in_memory, live_sessions=args.live_sessions)
 
 
 def main():
@@ -59,11 +193,132 @@ def main():
         "-t", "--theme", type=str, default="academic",
         help="排版主题 (默认: academic，可选: lark / github / vue)",
     )
+    p_convert.add_argument(
+        "--stream", action="store_true",
+        help="流式构建：按一级标题分段排版并释放内存，适合数百页的超大文档",
+    )
+    p_convert.add_argument(
+        "--stream-chunk", type=int, default=None,
+        help="流式构建时每段最多包含的 Flowable 数量 (默认: 200)",
+    )
+    p_convert.add_argument(
+        "-j", "--workers", type=int, default=None,
+        help="并行排版的进程数：按顶层标题拆分章节后多进程排版再拼接 (需要 pypdf)。"
+             "注意：每个顶层章节都会从新的一页开始，分页与单进程输出不同",
+    )
+    p_convert.add_argument(
+        "--preview", type=int, default=None, metavar="N",
+        help="只生成前 N 页的预览，之后的公式与图片都不会被处理，用于快速检查主题效果",
+    )
+    p_convert.add_argument(
+        "--trace", type=str, metavar="OUT.json",
+        help="记录解析、逐块渲染、公式、图片、字体注册与排版各阶段的耗时，导出为 Chrome Trace 格式\n"
+             "（并行排版时只包含主进程的事件）",
+    )
+    p_convert.add_argument(
+        "--no-daemon", action="store_true",
+        help="不使用守护进程，始终在当前进程内转换（默认在守护进程运行时交给它）",
+    )
     p_convert.add_argument(
         "--debug", action="store_true",
         help="开启 Debug 模式，打印完整堆栈追踪",
     )
 
+    # ---------- watch 子命令 ----------
+    p_watch = subparsers.add_parser(
+        "watch",
+        help="监听 Markdown 文件及其引用的图片，改动后自动增量重建 PDF",
+    )
+    p_watch.add_argument("input", type=str, help="输入的 Markdown 文件路径")
+    p_watch.add_argument(
+        "-o", "--output", type=str,
+        help="输出的 PDF 文件路径（默认: 与源文件同级同名）",
+    )
+    p_watch.add_argument(
+        "-t", "--theme", type=str, default="academic",
+        help="排版主题 (默认: academic，可选: lark / github / vue)",
+    )
+
+    # ---------- bench 子命令 ----------
+    p_bench = subparsers.add_parser(
+        "bench",
+        help="对 Markdown 语料或合成文档做分阶段基准测试，并与基准 JSON 对比",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    p_bench.add_argument(
+        "inputs", nargs="*",
+        help="Markdown 文件或目录（未指定时只跑 1 倍规模的合成文档）",
+    )
+    p_bench.add_argument(
+        "-t", "--theme", type=str, default="academic",
+        help="排版主题 (默认: academic)",
+    )
+    p_bench.add_argument(
+        "-n", "--repeat", type=int, default=3,
+        help="每篇文档的重复次数，取中位数 (默认: 3)",
+    )
+    p_bench.add_argument(
+        "--baseline", type=str,
+        help="对比的基准 JSON，存在回退时以退出码 1 结束",
+    )
+    p_bench.add_argument(
+        "--save-baseline", type=str,
+        help="把本次结果保存为基准 JSON",
+    )
+    p_bench.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="允许的波动比例，超过即视为回退 (默认: 0.2)",
+    )
+    p_bench.add_argument(
+        "--online", action="store_true",
+        help="允许访问网络（默认离线：在线图片、SVG 徽章、云端字体均走降级分支）",
+    )
+    p_bench.add_argument(
+        "--synthetic", type=str, metavar="SCALES",
+        help="额外生成合成压力文档参与测试，逗号分隔的规模倍率，如 1,2,4\n"
+             "（含中英混排、公式、代码、表格、嵌套列表/引用与 emoji），并输出各阶段的增长阶数",
+    )
+    p_bench.add_argument(
+        "--seed", type=int, default=0,
+        help="合成文档的随机种子，相同种子生成相同内容 (默认: 0)",
+    )
+    p_bench.add_argument(
+        "--verbose", action="store_true",
+        help="显示转换过程中的日志输出",
+    )
+
+    # ---------- daemon 子命令 ----------
+    p_daemon = subparsers.add_parser(
+        "daemon",
+        help="启动常驻的转换守护进程，之后的 convert 交给它执行，省去每次启动与预热",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    p_daemon.add_argument(
+        "-w", "--workers", type=int, default=2,
+        help="预先启动的转换进程数，进程内常驻字体、主题与 KaTeX 页面 (默认: 2)",
+    )
+    p_daemon.add_argument(
+        "--socket", type=str, default=None,
+        help="监听的 Unix 套接字路径 (默认: $MARKPRESS_DAEMON_SOCKET 或 ~/.markpress/daemon.sock)\n"
+             "convert 通过同一环境变量找到守护进程",
+    )
+    p_daemon.add_argument(
+        "--worker-max-jobs", type=int, default=200,
+        help="每个转换进程处理多少个任务后回收重建 (默认: 200)",
+    )
+    p_daemon.add_argument(
+        "--worker-max-rss", type=float, default=1024,
+        help="转换进程常驻内存超过该值 (MB) 后回收重建 (默认: 1024)",
+    )
+    p_daemon.add_argument(
+        "--status", action="store_true",
+        help="查看守护进程是否在运行",
+    )
+    p_daemon.add_argument(
+        "--stop", action="store_true",
+        help="通知正在运行的守护进程退出",
+    )
+
     # ---------- serve 子命令 ----------
     p_serve = subparsers.add_parser(
         "serve",
@@ -77,11 +332,73 @@ def main():
         "--port", type=int, default=8080,
         help="监听端口 (默认: 8080)",
     )
+    p_serve.add_argument(
+        "-w", "--workers", type=int, default=0,
+        help="预先启动的转换进程数，进程内常驻字体、主题与 KaTeX 页面 (默认: 0，即在请求线程内转换)",
+    )
+    p_serve.add_argument(
+        "--worker-max-jobs", type=int, default=200,
+        help="每个转换进程处理多少个任务后回收重建 (默认: 200)",
+    )
+    p_serve.add_argument(
+        "--worker-max-rss", type=float, default=1024,
+        help="转换进程常驻内存超过该值 (MB) 后回收重建 (默认: 1024)",
+    )
+    p_serve.add_argument(
+        "--max-concurrent", type=int, default=None,
+        help="同时进行的转换成本上限：小文档占 1 个单位，大文档按上传体积占用更多 (默认: 4，或与 --workers 相同)",
+    )
+    p_serve.add_argument(
+        "--max-queue", type=int, default=None,
+        help="/api/convert 排队等待的请求上限，超出返回 429 + Retry-After (默认: 16)",
+    )
+    p_serve.add_argument(
+        "--max-markdown-mb", type=float, default=None,
+        help="单个 Markdown 上传的体积上限 (MB)，超出返回 413 (默认: 5)",
+    )
+    p_serve.add_argument(
+        "--max-images-mb", type=float, default=None,
+        help="单次请求图片总体积上限 (MB)，超出返回 413 (默认: 50)",
+    )
+    p_serve.add_argument(
+        "--in-memory", action="store_true",
+        help="/api/convert 在内存中完成转换：图片不落盘、PDF 直接写入缓冲区，省去临时目录的读写",
+    )
+    p_serve.add_argument(
+        "--live-sessions", type=int, default=None,
+        help="实时预览 (/ws/live) 同时打开的会话上限，每个会话常驻一个引擎，0 表示关闭 (默认: 4)",
+    )
+    p_serve.add_argument(
+        "--cache-dir", type=str, default=None,
+        help="PDF 结果缓存目录 (默认: ~/.markpress/results)",
+    )
+    p_serve.add_argument(
+        "--cache-size", type=float, default=None,
+        help="PDF 结果缓存容量上限 (MB)，按最近使用淘汰，0 表示关闭 (默认: 512)",
+    )
+    p_serve.add_argument(
+        "--job-workers", type=int, default=None,
+        help="异步任务 (/api/jobs) 的并发转换数 (默认: 2)",
+    )
+    p_serve.add_argument(
+        "--job-queue", type=int, default=None,
+        help="异步任务的排队上限，超出时返回 429 (默认: 32)",
+    )
+    p_serve.add_argument(
+        "--job-ttl", type=float, default=None,
+        help="任务结果的保留时长（秒），过期后删除 (默认: 3600)",
+    )
 
     args = parser.parse_args()
 
     if args.command == "convert":
         _cmd_convert(args)
+    elif args.command == "watch":
+        _cmd_watch(args)
+    elif args.command == "bench":
+        _cmd_bench(args)
+    elif args.command == "daemon":
+        _cmd_daemon(args)
     elif args.command == "serve":
         _cmd_serve(args)
     else:
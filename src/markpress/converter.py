@@ -1,26 +1,93 @@
+import io
 import os
 import re
-import tempfile
 from pprint import pprint
 
 import mistune
-from bs4 import BeautifulSoup
 from .core import MarkPressEngine
-from .utils.utils import APP_TMP, get_raw_text, slugify, strip_front_matter, optimize_ast_html_blocks
+from .utils.tracing import span, traced
+from .utils.utils import get_raw_text, new_temp_file, slugify, strip_front_matter, optimize_ast_html_blocks
+from .utils.vfs import MemoryFS
 
 
-def convert_markdown_file(input_path: str, output_path: str, theme: str = "academic", config=None):
+def convert_markdown_file(input_path: str, output_path: str, theme: str = "academic", config=None,
+                          stream: bool = False, stream_chunk: int = None, workers: int = None,
+                          block_cache=None, preview_pages: int = None):
     """
     读取 Markdown 文件，解析为 AST，驱动 Writer 生成 PDF。
     config 为可选的 StyleConfig 对象，若传入则忽略 theme 参数直接使用该配置。
+    stream 为 True 时按一级标题 / 每 stream_chunk 个 Flowable 分段排版，内存占用不随文档长度增长。
+    workers 大于 1 时按顶层标题拆分章节，多进程并行排版后拼接为一个 PDF（每个章节从新页开始）。
+    block_cache 为 incremental.BlockCache 时启用增量转换：未改动的顶层块复用上一次生成的 Flowable。
+    preview_pages 为正数时只生成前 N 页的预览，之后的块不再渲染（公式、在线图片都不会被处理）。
     """
     print(f"开始处理Markdown文件：{input_path}")
-    with open(input_path, "r", encoding="utf-8") as f:
+    with span("read", "io"), open(input_path, "r", encoding="utf-8") as f:
         text = f.read()
-    clean_md = strip_front_matter(text)
     # 输入文件的目录，用于解析相对路径
     base_dir = os.path.dirname(os.path.abspath(input_path))
 
+    optimized_ast = parse_markdown(text)
+
+    if workers and workers > 1 and block_cache is None and not preview_pages:
+        from .parallel import convert_ast_parallel
+        if convert_ast_parallel(optimized_ast, output_path, theme, config=config, base_dir=base_dir, workers=workers):
+            print("Done.")
+            return
+
+    # 初始化 PDF 引擎
+    writer = MarkPressEngine(output_path, theme, config=config, stream=stream, stream_chunk=stream_chunk,
+                             preview_pages=preview_pages)
+
+    # 遍历 AST 并渲染
+    # _render_ast(writer, ast, base_dir)
+    render_document(writer, optimized_ast, base_dir, block_cache=block_cache)
+
+    # 保存并关闭katex引擎
+    writer.save_pdf()
+    writer.close_katex_render()
+    print("Done.")
+
+
+def convert_markdown_bytes(markdown, files: MemoryFS = None, theme: str = "academic", config=None,
+                           preview_pages: int = None) -> bytes:
+    """
+    内存中的转换：markdown 为 str 或 UTF-8 bytes，files 为 Markdown 内相对路径引用的图片（MemoryFS），
+    PDF 写入内存缓冲区后返回字节，不读写任何输入输出文件（行内公式图片仍使用临时目录）。
+    preview_pages 同 convert_markdown_file。
+    """
+    text = markdown.decode("utf-8") if isinstance(markdown, bytes) else markdown
+    files = files if files is not None else MemoryFS()
+    ast = parse_markdown(text)
+
+    buffer = io.BytesIO()
+    writer = MarkPressEngine(buffer, theme, config=config, preview_pages=preview_pages)
+    writer.vfs = files
+    try:
+        render_document(writer, ast, files.root)
+        writer.save_pdf()
+    finally:
+        writer.close_katex_render()
+    return buffer.getvalue()
+
+
+def render_document(writer: MarkPressEngine, ast: list, base_dir: str = ".", block_cache=None):
+    """把整篇 AST 渲染进 writer 的 story（不排版），block_cache 不为空时走增量路径"""
+    if block_cache is None:
+        _render_ast(writer, ast, base_dir)
+        return
+    # 缓存块引用的公式图片在 block_cache 的私有目录里，由 prune()/close() 清理
+    writer.clear_temp_on_save = False
+    block_cache.begin_run()
+    _render_ast(writer, ast, base_dir, block_cache=block_cache)
+    block_cache.prune()
+    print(f"[MarkPress] 增量转换: 复用 {block_cache.hits} 个块, 重新渲染 {block_cache.misses} 个块")
+
+
+def parse_markdown(text: str) -> list:
+    """Markdown 源文本 -> 经过 HTML 块合并优化的 AST"""
+    clean_md = strip_front_matter(text)
+
     # 初始化 Mistune
     markdown = mistune.create_markdown(
         renderer=None,  # 做解析，不是渲染
@@ -44,121 +111,127 @@ def convert_markdown_file(input_path: str, output_path: str, theme: str = "acade
     )
 
     # 获取 AST (Abstract Syntax Tree)，这是一个由字典组成的列表，每个字典代表一个 Block (段落, 标题, 代码块等)
-    ast = markdown(clean_md)
-    optimized_ast = optimize_ast_html_blocks(ast)
+    with span("mistune", "parse"):
+        ast = markdown(clean_md)
+    with span("optimize_ast_html_blocks", "html"):
+        return optimize_ast_html_blocks(ast)
 
-    # 初始化 PDF 引擎
-    writer = MarkPressEngine(output_path, theme, config=config)
-
-    # 遍历 AST 并渲染
-    # _render_ast(writer, ast, base_dir)
-    _render_ast(writer, optimized_ast, base_dir)
 
-    # 保存并关闭katex引擎
-    writer.save_pdf()
-    writer.close_katex_render()
-    print("Done.")
-
-
-def _render_ast(writer: MarkPressEngine, tokens: list, base_dir: str = "."):
+def _render_ast(writer: MarkPressEngine, tokens: list, base_dir: str = ".", block_cache=None):
     """
     AST 遍历调度器 (Block Level)
     :param writer: PDF 引擎
     :param tokens: AST tokens
     :param base_dir: 基础目录，用于解析相对路径
+    :param block_cache: 增量转换缓存，只作用于顶层块
     """
     for token in tokens:
-        t_type = token.get('type')
-        children = token.get('children')
-        attrs = token.get('attrs', {})
-
-        # 标题 (Heading)
-        if t_type == 'heading':
-            level = attrs.get('level', 1)
-            # 1. 获取纯文本并生成目标 ID
-            raw_text = get_raw_text(children)
-            anchor_id = slugify(raw_text)
-
-            # 2. 渲染带样式的 XML 内容
-            xml_text = _render_inline(writer, children)
-
-            # 3. [核心修复]：包裹锚点标签
-            # 使用 <a name="..."> 整个包裹住标题文本
-            # 这样既注册了书签目的地，又避免了产生空的 <a></a> 导致 CJK 换行崩溃
-            text_with_anchor = f'<a name="{anchor_id}"/>{xml_text}'
-
-            writer.add_heading(text_with_anchor, level=level)
-            # text = _render_inline(writer, children)
-            # writer.add_heading(text, level=level)
-
-        # 段落 (Paragraph)
-        elif t_type == 'paragraph':
-            # 检测 mistune 未能解析的管道表格（不规则列数等情况）
-            raw_text = get_raw_text(children)
-            if '\n' in raw_text and '|' in raw_text:
-                table_data = _try_parse_pipe_table(raw_text)
-                if table_data:
-                    writer.add_table(table_data)
-                    continue
-
-            # 检查是否只包含图片（独立图片段落）
-            if len(children) == 1 and children[0].get('type') == 'image':
-                img_attrs = children[0].get('attrs', {})
-                img_url = img_attrs.get('url', '')
-                img_alt = img_attrs.get('alt', '')
-                # 处理相对路径
-                if not os.path.isabs(img_url) and not img_url.startswith(('http://', 'https://')):
-                    img_url = os.path.join(base_dir, img_url)
-                writer.add_image(img_url, img_alt)
-            else:
-                text = _render_inline(writer, children)
-                # 过滤掉空段落
-                if text.strip():
-                    writer.add_text(text)
-
-        # 行间代码块 (Block Code)
-        elif t_type == 'block_code':
-            code = token.get('raw', '')
-            info = attrs.get('info', '')  # 语言，例如 python
-            writer.add_code(code, language=info)
-
-        # 列表 (List)
-        elif t_type == 'list':
-            ordered = attrs.get('ordered', False)
-            start_index = attrs.get('start', 1)
-            list_items = _parse_list_items(writer, children)
-            writer.add_list(list_items, is_ordered=ordered,start_index=start_index)
-
-        # 表格 (Table)
-        elif t_type == 'table':
-            table_data = _parse_table(writer, children, attrs)
+        # 流式模式下，上一个顶层块已经完整生成，可以在这里切段排版
+        writer.stream_checkpoint()
+        # 预览的页数已满：剩下的块不再渲染
+        if writer.preview_done:
+            return
+        if block_cache is not None and not writer.context_stack:
+            block_cache.render(writer, token, base_dir, lambda: _render_ast(writer, [token], base_dir))
+            continue
+        with span(token.get('type') or 'unknown', "block"):
+            _render_block(writer, token, base_dir)
+
+
+def _render_block(writer: MarkPressEngine, token: dict, base_dir: str = "."):
+    """渲染单个 Block Token（逐块埋点，便于在 trace 中按类型查看耗时）"""
+    t_type = token.get('type')
+    children = token.get('children')
+    attrs = token.get('attrs', {})
+
+    # 标题 (Heading)
+    if t_type == 'heading':
+        level = attrs.get('level', 1)
+        # 1. 获取纯文本并生成目标 ID
+        raw_text = get_raw_text(children)
+        anchor_id = slugify(raw_text)
+
+        # 2. 渲染带样式的 XML 内容
+        xml_text = _render_inline(writer, children)
+
+        # 3. [核心修复]：包裹锚点标签
+        # 使用 <a name="..."> 整个包裹住标题文本
+        # 这样既注册了书签目的地，又避免了产生空的 <a></a> 导致 CJK 换行崩溃
+        text_with_anchor = f'<a name="{anchor_id}"/>{xml_text}'
+
+        writer.add_heading(text_with_anchor, level=level)
+        # text = _render_inline(writer, children)
+        # writer.add_heading(text, level=level)
+
+    # 段落 (Paragraph)
+    elif t_type == 'paragraph':
+        # 检测 mistune 未能解析的管道表格（不规则列数等情况）
+        raw_text = get_raw_text(children)
+        if '\n' in raw_text and '|' in raw_text:
+            table_data = _try_parse_pipe_table(raw_text)
             if table_data:
                 writer.add_table(table_data)
+                return
+
+        # 检查是否只包含图片（独立图片段落）
+        if len(children) == 1 and children[0].get('type') == 'image':
+            img_attrs = children[0].get('attrs', {})
+            img_url = img_attrs.get('url', '')
+            img_alt = img_attrs.get('alt', '')
+            # 处理相对路径
+            if not os.path.isabs(img_url) and not img_url.startswith(('http://', 'https://')):
+                img_url = os.path.join(base_dir, img_url)
+            writer.add_image(img_url, img_alt)
+        else:
+            text = _render_inline(writer, children)
+            # 过滤掉空段落
+            if text.strip():
+                writer.add_text(text)
+
+    # 行间代码块 (Block Code)
+    elif t_type == 'block_code':
+        code = token.get('raw', '')
+        info = attrs.get('info', '')  # 语言，例如 python
+        writer.add_code(code, language=info)
+
+    # 列表 (List)
+    elif t_type == 'list':
+        ordered = attrs.get('ordered', False)
+        start_index = attrs.get('start', 1)
+        list_items = _parse_list_items(writer, children)
+        writer.add_list(list_items, is_ordered=ordered,start_index=start_index)
+
+    # 表格 (Table)
+    elif t_type == 'table':
+        table_data = _parse_table(writer, children, attrs)
+        if table_data:
+            writer.add_table(table_data)
 
-        # 分隔线 (Thematic Break)
-        elif t_type == 'thematic_break':
-            writer.add_horizontal_rule()
-
-        # 引用 (Blockquote)
-        elif t_type == 'block_quote':
-            # 压栈，告诉 Writer 进入引用模式 (增加缩进/改变样式)
-            writer.start_quote()
-            # 递归：把子元素（可能是 paragraph，也可能是更深层的 block_quote）再次扔给 _render_ast 处理
-            _render_ast(writer, children, base_dir)
-            # 弹栈：告诉 Writer 退出引用模式
-            writer.end_quote()
-        # 行间公式 (Block math)
-        elif t_type == 'block_math':
-            writer.add_formula(token.get('raw', ''))
-        elif t_type == 'block_html':
-            raw_html = token.get('raw', '')
-            # raw_html = raw_html.replace("</div>\n<div", "</div></div>\n<div<div")
-            # raw_html_spilt = raw_html.split("</div>\n<div")
-            # for raw_part in raw_html_spilt:
-            # if raw_html.strip() != "":
-            _parse_block_html(writer, raw_html.strip(), base_dir)
-
-
+    # 分隔线 (Thematic Break)
+    elif t_type == 'thematic_break':
+        writer.add_horizontal_rule()
+
+    # 引用 (Blockquote)
+    elif t_type == 'block_quote':
+        # 压栈，告诉 Writer 进入引用模式 (增加缩进/改变样式)
+        writer.start_quote()
+        # 递归：把子元素（可能是 paragraph，也可能是更深层的 block_quote）再次扔给 _render_ast 处理
+        _render_ast(writer, children, base_dir)
+        # 弹栈：告诉 Writer 退出引用模式
+        writer.end_quote()
+    # 行间公式 (Block math)
+    elif t_type == 'block_math':
+        writer.add_formula(token.get('raw', ''))
+    elif t_type == 'block_html':
+        raw_html = token.get('raw', '')
+        # raw_html = raw_html.replace("</div>\n<div", "</div></div>\n<div<div")
+        # raw_html_spilt = raw_html.split("</div>\n<div")
+        # for raw_part in raw_html_spilt:
+        # if raw_html.strip() != "":
+        _parse_block_html(writer, raw_html.strip(), base_dir)
+
+
+@traced("render_inline", "inline")
 def _render_inline(writer: MarkPressEngine, tokens: list) -> str:
     """
     将 Inline Tokens (Text, Strong, Link, Image) 转换为
@@ -195,7 +268,7 @@ def _render_inline(writer: MarkPressEngine, tokens: list) -> str:
                 png_bytes, w, h = writer.katex_renderer.render_image(latex, is_block=False)
                 if png_bytes:
                     # 走katex
-                    fd, path = tempfile.mkstemp(suffix=".png", dir=APP_TMP)
+                    fd, path = new_temp_file(".png")
                     os.write(fd, png_bytes)
                     os.close(fd)
                     # 计算下沉 (valign)
@@ -513,12 +586,14 @@ def _parse_html_table(writer, table_tag) -> dict:
     return result
 
 
+@traced("block_html", "html")
 def _parse_block_html(writer, raw_html: str, base_dir: str = "."):
     # 1. 剔除注释
     html = re.sub(r'', '', raw_html, flags=re.DOTALL)
     if not html.strip():
         return
 
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html, 'html.parser')
 
     # 处理 HTML 表格（在其他 DOM 操作之前提取）
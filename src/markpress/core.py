@@ -9,9 +9,12 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import mm
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import SimpleDocTemplate, PageBreak, Spacer, Table, TableStyle
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import PageBreak, Spacer
 from reportlab.platypus.flowables import HRFlowable, Image
 
+from .inherited.QuoteBlock import QuoteBlock
+from .inherited.StreamingDocTemplate import StreamingDocTemplate
 from .renders.image import ImageRenderer
 from .renders.formular import FormulaRenderer
 from .renders.katex import KatexRenderer
@@ -22,15 +25,22 @@ from .renders.table import TableRenderer
 from .renders.text import TextRenderer
 from .themes import StyleConfig
 from .utils.fonts_manager import resolve_and_register_font
+from .utils.tracing import span, traced
 from .utils.utils import get_font_path, clear_temp_files, APP_TMP
 
 
 class MarkPressEngine:
-    def __init__(self, filename: str, theme_name: str = "academic", config: StyleConfig = None):
+    # 流式模式下，顶层累计超过该数量的 Flowable 就排版落盘一次（一级标题处总会切段）
+    STREAM_CHUNK_FLOWABLES = 200
+    # 预览模式按更小的段排版，页数一满就能停下，少渲染几个多余的块
+    PREVIEW_CHUNK_FLOWABLES = 10
+
+    def __init__(self, filename, theme_name: str = "academic", config: StyleConfig = None,
+                 stream: bool = False, stream_chunk: int = None, preview_pages: int = None):
         # 创建临时文件夹
 
         os.makedirs(APP_TMP, exist_ok=True)
-        # 保存的文件名
+        # 保存的文件名，也可以是可写的文件对象（如 io.BytesIO）
         self.filename = filename
 
         # 若外部传入已构建的 config，则直接使用，否则按 theme_name 加载预置主题
@@ -38,8 +48,34 @@ class MarkPressEngine:
 
         # 自动保存开关，调试时可以启用
         self.auto_save_mode = False
+        # 流式构建：按段排版并释放已绘制的 Flowable（含公式图片缓冲），适合超大文档
+        self._stream_settings = (stream, stream_chunk or self.STREAM_CHUNK_FLOWABLES)
+        self._stream_started = False
+        # 预览模式：只排前 preview_pages 页，之后的块不再渲染（不调用 KaTeX、不下载图片）
+        self._set_preview(preview_pages)
+        # 生成 PDF 用的 Canvas 类（并行分段排版时替换为 SectionCanvas）
+        self.canvasmaker = Canvas
+        # 保存后是否清空临时目录；多进程共享临时目录时由主进程统一清理
+        self.clear_temp_on_save = True
+        # 内存转换时挂载的 MemoryFS：本地图片从中读取，filename 此时为写入 PDF 的缓冲区
+        self.vfs = None
         # 加载字体
         self._register_fonts()
+        # 样式表与各渲染器；KaTeX 渲染器持有无头浏览器，只创建一次
+        self.katex_renderer = None
+        self._init_renderers()
+
+        # self.story 是最终输出列表
+        # self.context_stack 用于存储嵌套层级的 (list_obj, available_width)
+        self.story = []
+        self.context_stack = []
+        self.current_story = self.story  # 指针，指向当前正在写入的列表
+
+        # 计算初始可用宽度
+        self._init_doc_template()  # 这里会计算 self.page_width 等
+        self.avail_width = self.doc.width  # 初始宽度 = 页面有效宽度
+
+    def _init_renderers(self):
         # 加载样式sheet
         self.stylesheet = getSampleStyleSheet()
 
@@ -49,20 +85,45 @@ class MarkPressEngine:
         self.code_renderer = CodeRenderer(self.config, self.stylesheet)
         self.image_renderer = ImageRenderer(self.config, self.stylesheet)
         self.formula_renderer = FormulaRenderer(self.config, self.stylesheet)
-        self.katex_renderer = KatexRenderer(self.config, self.stylesheet)
+        if self.katex_renderer is None:
+            self.katex_renderer = KatexRenderer(self.config, self.stylesheet)
+        else:
+            self.katex_renderer.config, self.katex_renderer.styles = self.config, self.stylesheet
         self.list_renderer = ListRenderer(self.config, self.stylesheet)
         self.table_renderer = TableRenderer(self.config, self.stylesheet)
 
-        # self.story 是最终输出列表
-        # self.context_stack 用于存储嵌套层级的 (list_obj, available_width)
+    def _set_preview(self, preview_pages: int = None):
+        """预览模式强制走流式排版：边渲染边排版，才能在页数已满时停止渲染后续的块"""
+        self.preview_pages = preview_pages or None
+        stream, chunk = self._stream_settings
+        self.stream_mode = stream or self.preview_pages is not None
+        self.stream_chunk = min(chunk, self.PREVIEW_CHUNK_FLOWABLES) if self.preview_pages else chunk
+
+    @property
+    def preview_done(self) -> bool:
+        """预览的页数已经排满，后续的块无需再渲染"""
+        return self.preview_pages is not None and self.doc.truncated
+
+    def reset(self, filename, config: StyleConfig = None, preview_pages: int = None):
+        """
+        复用已加载的字体、样式和渲染器（含 KaTeX 浏览器），为新的输出文件重置文档状态。
+        传入与当前不同的 config 时切换主题：注册新字体并重建样式表与渲染器，浏览器保持不变。
+        """
+        if config is not None and config != self.config:
+            self.config = config
+            self._register_fonts()
+            self._init_renderers()
+        self.filename = filename
+        self.vfs = None
         self.story = []
         self.context_stack = []
-        self.current_story = self.story  # 指针，指向当前正在写入的列表
-
-        # 计算初始可用宽度
-        self._init_doc_template()  # 这里会计算 self.page_width 等
-        self.avail_width = self.doc.width  # 初始宽度 = 页面有效宽度
+        self.current_story = self.story
+        self._stream_started = False
+        self._set_preview(preview_pages)
+        self._init_doc_template()
+        self.avail_width = self.doc.width
 
+    @traced("register_fonts", "fonts")
     def _register_fonts(self):
         """从 Config 读取字体名，并加载"""
         try:
@@ -91,7 +152,8 @@ class MarkPressEngine:
                     font_type = "serif"
 
                 # 交给三级防线全权处理
-                resolve_and_register_font(logical_name, filename, font_type)
+                with span("register_font", "fonts", font=logical_name):
+                    resolve_and_register_font(logical_name, filename, font_type)
 
             # 资产就绪，向 ReportLab 注册字体族群关联
             pdfmetrics.registerFontFamily(
@@ -161,7 +223,7 @@ class MarkPressEngine:
         if self.config.page.orientation == "landscape":
             page_size = pagesizes.landscape(page_size)
 
-        self.doc = SimpleDocTemplate(
+        self.doc = StreamingDocTemplate(
             self.filename,
             pagesize=page_size,
             leftMargin=self.config.page.margin_left * mm,
@@ -171,6 +233,7 @@ class MarkPressEngine:
             title=self.config.meta.name,
             author=self.config.meta.author
         )
+        self.doc.max_pages = self.preview_pages
 
         # 计算可用宽度
         self.avail_width = page_size[0] - (self.config.page.margin_left + self.config.page.margin_right) * mm
@@ -182,7 +245,7 @@ class MarkPressEngine:
         1. 开启了 auto_save_mode
         2. 当前不在嵌套结构中 (引用块内部保存没有意义，因为主story没更新)
         """
-        if not self.auto_save_mode:
+        if not self.auto_save_mode or self.stream_mode:
             return
 
         # 如果栈不为空，说明正在引用块/容器内部，此时 self.story 并没有更新，此时强行 build 只会得到旧的 PDF，浪费性能，且可能引发并发问题
@@ -201,6 +264,29 @@ class MarkPressEngine:
             if "ord() expected a character, but string of length 0 found" in str(e):
                 print(self.story[-1])
 
+    def _flush_story(self, final: bool = False):
+        """流式模式：把顶层 story 中已完成的内容排版进 PDF，排完的 Flowable 随即释放"""
+        try:
+            if not self._stream_started:
+                self.doc.begin_stream(canvasmaker=self.canvasmaker)
+                self._stream_started = True
+            with span("doc.feed", "layout", flowables=len(self.story), final=final):
+                self.doc.feed(self.story, final=final)
+        except Exception:
+            if self.clear_temp_on_save:
+                clear_temp_files()
+            raise
+
+    def stream_checkpoint(self):
+        """
+        由 converter 在每个顶层块之后调用。
+        只有在流式模式、且不处于引用等嵌套结构内部时，才会在累计足够多的 Flowable 后切段。
+        """
+        if not self.stream_mode or self.context_stack:
+            return
+        if len(self.story) >= self.stream_chunk:
+            self._flush_story()
+
     def close_katex_render(self):
         """显式关闭资源"""
         if hasattr(self, 'katex_renderer'):
@@ -218,7 +304,7 @@ class MarkPressEngine:
         self.avail_width -= (q_conf.left_indent + q_conf.border_width) * mm
 
     def end_quote(self):
-        """退出引用：打包为 Table"""
+        """退出引用：打包为可跨页拆分的 QuoteBlock"""
         if not self.context_stack: return
 
         # 弹出状态
@@ -243,7 +329,7 @@ class MarkPressEngine:
         # 去除最后一段的 spaceAfter
         if quote_content and hasattr(quote_content[-1], 'style'):
             last_item = quote_content[-1]
-            # 如果是 Table (内层引用)，它没有 spaceAfter 属性，忽略即可；如果是 Paragraph，则去尾
+            # 如果是 QuoteBlock (内层引用)，它没有 style 属性，忽略即可；如果是 Paragraph，则去尾
             if hasattr(last_item.style, 'spaceAfter'):
                 new_style = copy.copy(last_item.style)
                 new_style.spaceAfter = 0
@@ -253,26 +339,16 @@ class MarkPressEngine:
         q_conf = self.config.styles.quote
         border_color = colors.HexColor(q_conf.border_color)
 
-        # hAlign='LEFT' 保证引用块紧贴左侧
-        t = Table([[quote_content]], colWidths=[self.avail_width], hAlign='LEFT', vAlign='CENTER')
-
-        t.setStyle(TableStyle([
-            # 竖线样式
-            ('LINEBEFORE', (0, 0), (0, -1), q_conf.border_width, border_color),
-
-            # 缩进控制，四个方向的padding
-            ('LEFTPADDING', (0, 0), (-1, -1), q_conf.left_indent),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 11),
-
-            # 强制顶部对齐
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-
-            # 调试用：如果还有问题，可以把下面这行解开看格子
-            # ('GRID', (0, 0), (-1, -1), 0.5, colors.red),
-        ]))
+        # 左侧竖线 + 内边距由 QuoteBlock 自行绘制，内容可以在子元素之间或内部跨页拆分
+        t = QuoteBlock(
+            quote_content,
+            border_width=q_conf.border_width,
+            border_color=border_color,
+            left_padding=q_conf.left_indent,
+            right_padding=11,
+            top_padding=3,
+            bottom_padding=0,
+        )
 
         # 将引用块加入父级
         self.current_story.append(t)
@@ -281,6 +357,9 @@ class MarkPressEngine:
         self.current_story.append(Spacer(1, 4 * mm))
 
     def add_heading(self, text: str, level: int):
+        # 一级标题是天然的分段点：先把之前的章节排完
+        if level == 1 and self.stream_mode and not self.context_stack and self.story:
+            self._flush_story()
         flowables = self.heading_renderer.render(text, level)
         self.current_story.extend(flowables)
         self.try_trigger_autosave()
@@ -360,7 +439,7 @@ class MarkPressEngine:
                 # 如果网络请求失败或截图失败，做文本降级兜底
                 self.add_text(f"<font color='gray'>[{alt_text or 'Badge'}]</font>")
                 return
-        flowables = self.image_renderer.render(image_path, alt_text, avail_width=self.avail_width)
+        flowables = self.image_renderer.render(image_path, alt_text, avail_width=self.avail_width, vfs=self.vfs)
         self.current_story.extend(flowables)
 
     def rasterize_svg(self, url: str):
@@ -403,10 +482,19 @@ class MarkPressEngine:
         if len(self.story) > 0 and self.story[-1] and isinstance(self.story[-1], Spacer):
             self.story.pop()
         try:
-            self.doc.build(self.story)  # 根 story
-            clear_temp_files()
+            if self.stream_mode:
+                # 剩余内容排完后结束最后一页并写出
+                with span("doc.build", "layout", stream=True):
+                    self._flush_story(final=True)
+                    self.doc.end_stream()
+            else:
+                with span("doc.build", "layout", flowables=len(self.story)):
+                    self.doc.build(self.story, canvasmaker=self.canvasmaker)  # 根 story
+            if self.clear_temp_on_save:
+                clear_temp_files()
         except Exception as e:
-            clear_temp_files()
+            if self.clear_temp_on_save:
+                clear_temp_files()
             print(f"Error building PDF: {e}")
             if "ord() expected a character, but string of length 0 found" in str(e):
                 print("tips：markdown文件内可能存在超长的行内公式或超出行宽的行间公式，请合理调整间距")
@@ -0,0 +1,230 @@
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+from . import __version__
+from .utils.utils import is_offline
+from .workers import DEFAULT_MAX_JOBS, DEFAULT_MAX_RSS_MB, WorkerPool
+
+# 与字体、结果缓存同属 ~/.markpress；可用环境变量 MARKPRESS_DAEMON_SOCKET 覆盖
+DEFAULT_SOCKET_PATH = Path.home() / ".markpress" / "daemon.sock"
+DEFAULT_DAEMON_WORKERS = 2
+
+
+def _version_warning(daemon_version) -> str:
+    return (f"[Warn] 守护进程版本 ({daemon_version or '未知'}) 与当前 markpress ({__version__}) 不一致，"
+            f"本次在进程内转换；请执行 markpress daemon --stop 后重新启动守护进程")
+
+
+class DaemonError(RuntimeError):
+    """守护进程内的转换失败，detail 为守护进程一侧的堆栈追踪"""
+
+    def __init__(self, message: str, detail: str = None):
+        super().__init__(message)
+        self.detail = detail
+
+
+def default_socket_path() -> str:
+    return os.environ.get("MARKPRESS_DAEMON_SOCKET") or str(DEFAULT_SOCKET_PATH)
+
+
+def request(message: dict, socket_path: str = None):
+    """
+    向守护进程发送一条请求并等待回复。
+    守护进程未运行（套接字不存在、已失效或无权访问）、平台不支持 Unix 套接字、或中途断开时返回 None。
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        conn = Client(socket_path or default_socket_path(), family="AF_UNIX")
+    except OSError:
+        return None
+    with conn:
+        try:
+            conn.send(message)
+            return conn.recv()
+        except (EOFError, OSError):
+            print("[Warn] 与守护进程的连接意外断开", file=sys.stderr)
+            return None
+
+
+def try_convert(input_path: str, output_path: str, theme: str, preview_pages: int = None,
+                socket_path: str = None):
+    """
+    把转换交给守护进程：成功时返回守护进程内的耗时（秒），守护进程不可用时返回 None，由调用方退回进程内转换；
+    转换失败时抛出 DaemonError。
+    升级后仍在运行的旧守护进程会用旧代码转换，因此先 ping 核对版本，不一致时告警并返回 None；
+    convert 请求同样带上版本号，守护进程在两次请求之间被替换时也会拒绝。
+    路径须为绝对路径（守护进程的工作目录与调用方不同）；离线模式按调用方的环境变量生效，与守护进程启动时的环境无关。
+    """
+    ping = request({"op": "ping"}, socket_path)
+    if ping is None:
+        return None
+    info = ping[1] if ping[0] == "ok" and isinstance(ping[1], dict) else {}
+    if info.get("version") != __version__:
+        print(_version_warning(info.get("version")), file=sys.stderr)
+        return None
+
+    reply = request({"op": "convert", "version": __version__, "input": input_path, "output": output_path,
+                     "theme": theme, "preview_pages": preview_pages, "offline": is_offline()}, socket_path)
+    if reply is None:
+        return None
+    if reply[0] == "version":
+        print(_version_warning(reply[1]), file=sys.stderr)
+        return None
+    if reply[0] == "error":
+        raise DaemonError(reply[1], reply[2])
+    return reply[1]
+
+
+class Daemon:
+    """
+    常驻转换守护进程：启动 WorkerPool（进程内常驻引擎、字体、主题样式与 KaTeX 页面），监听本机 Unix 套接字，
+    每个连接在独立线程中处理一个请求（convert / ping / stop）。
+    CLI 的 convert 检测到守护进程时把任务交给它，省去解释器启动、依赖导入、字体注册与浏览器启动。
+    套接字文件权限为 0600，只有同一用户的进程能连接。
+    请求为 dict，回复为元组：("ok", ...)、("error", 消息, 堆栈) 或版本不一致时的 ("version", 守护进程版本)。
+    """
+
+    def __init__(self, socket_path: str = None, workers: int = DEFAULT_DAEMON_WORKERS,
+                 max_jobs: int = DEFAULT_MAX_JOBS, max_rss_mb: float = DEFAULT_MAX_RSS_MB):
+        self.socket_path = socket_path or default_socket_path()
+        self.pool = WorkerPool(workers, max_jobs=max_jobs, max_rss_mb=max_rss_mb)
+        self.handled = 0
+        self.failed = 0
+        self.started_at = None
+        self._configs = {}
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._listener = None
+
+    def _prepare_socket(self):
+        if request({"op": "ping"}, self.socket_path) is not None:
+            raise RuntimeError(f"守护进程已在运行: {self.socket_path}")
+        # 上次异常退出留下的失效套接字
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        Path(self.socket_path).parent.mkdir(parents=True, exist_ok=True)
+
+    def serve_forever(self):
+        self._prepare_socket()
+        # 先 fork 工作进程，再创建监听套接字与处理线程
+        self.pool.start()
+        try:
+            old_umask = os.umask(0o177)
+            try:
+                self._listener = Listener(self.socket_path, family="AF_UNIX")
+            finally:
+                os.umask(old_umask)
+            self.started_at = time.time()
+            # SIGTERM 与 Ctrl-C 一样走 finally 中的清理
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+            print(f"[MarkPress] 守护进程已启动 (pid {os.getpid()})，监听 {self.socket_path}")
+
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except OSError as e:
+                    print(f"[Warn] 接受连接失败: {e}")
+                    time.sleep(0.1)
+                    continue
+                if self._stopping:
+                    conn.close()
+                    break
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def stop(self):
+        """请求退出：accept 阻塞在另一个线程里，连一次自身把它唤醒"""
+        self._stopping = True
+        try:
+            Client(self.socket_path, family="AF_UNIX").close()
+        except OSError:
+            pass
+
+    def close(self):
+        if self._listener is not None:
+            # Listener.close 会顺带删除套接字文件
+            self._listener.close()
+            self._listener = None
+        self.pool.close()
+        print("[MarkPress] 守护进程已退出")
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "version": __version__,
+            "workers": self.pool.size,
+            "handled": self.handled,
+            "failed": self.failed,
+            "uptime": time.time() - self.started_at,
+        }
+
+    def _config(self, theme: str):
+        from .themes import StyleConfig
+        with self._lock:
+            if theme not in self._configs:
+                self._configs[theme] = StyleConfig.get_pre_build_style(theme)
+            return self._configs[theme]
+
+    def _convert(self, message: dict) -> tuple:
+        start = time.perf_counter()
+        try:
+            config = self._config(message["theme"])
+            self.pool.run(message["input"], message["output"], config, preview_pages=message.get("preview_pages"),
+                          offline=message.get("offline"))
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"[Warn] 转换失败 {message.get('input')}: {e}")
+            # 工作进程内的异常带着子进程的堆栈，其余异常（如主题不存在）取守护进程自身的堆栈
+            return "error", str(e), getattr(e, "detail", None) or traceback.format_exc()
+        with self._lock:
+            self.handled += 1
+        return "ok", time.perf_counter() - start, __version__
+
+    def _dispatch(self, message) -> tuple:
+        if not isinstance(message, dict):
+            return "error", f"无效请求: 需要 dict，收到 {type(message).__name__}", None
+        op = message.get("op")
+        if op == "convert":
+            # 不带版本号的是握手之前的旧客户端，照常转换
+            client_version = message.get("version")
+            if client_version is not None and client_version != __version__:
+                return "version", __version__
+            return self._convert(message)
+        if op == "ping":
+            return "ok", self.status()
+        if op == "stop":
+            return "ok", None
+        return "error", f"未知请求: {op}", None
+
+    def _handle(self, conn):
+        op = None
+        with conn:
+            try:
+                message = conn.recv()
+            except Exception:
+                # 断开或无法反序列化的数据
+                return
+            try:
+                reply = self._dispatch(message)
+                op = message.get("op") if reply[0] == "ok" else None
+            except Exception as e:
+                # 处理线程里的异常不会被任何人看到，必须回复给客户端
+                print(f"[Warn] 处理守护进程请求失败: {type(e).__name__}: {e}")
+                reply = ("error", f"{type(e).__name__}: {e}", traceback.format_exc())
+            try:
+                conn.send(reply)
+            except OSError:
+                # 客户端已断开（如 Ctrl-C），结果照常写入了输出文件
+                pass
+        if op == "stop":
+            self.stop()
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from reportlab.platypus import Flowable
+
+from .utils.utils import APP_TMP, temp_file_scope
+
+# DocTemplate 排版时写在顶层 Flowable 上的一次性标记，复用前必须清除，
+# 否则上一次被推迟到下一页的图片会被当作"第二次放不下"直接报 too large
+_LAYOUT_MARKERS = ('_postponed', '_skipMeNextTime')
+
+
+def _clear_layout_markers(flowables: list):
+    """
+    标记也会写在容器内部的子 Flowable 上：列表拆分后逐项排版的 LIIndenter 会把属性转写到被包裹的段落，
+    而 ListFlowable 的各项在第一次排版后就固定下来，因此需要递归清除
+    """
+    stack = list(flowables)
+    seen = set()
+    while stack:
+        f = stack.pop()
+        if id(f) in seen:
+            continue
+        seen.add(id(f))
+        attrs = f.__dict__
+        for marker in _LAYOUT_MARKERS:
+            attrs.pop(marker, None)
+        for value in attrs.values():
+            if isinstance(value, Flowable):
+                stack.append(value)
+            elif isinstance(value, (list, tuple)):
+                stack.extend(v for v in value if isinstance(v, Flowable))
+
+
+class BlockCache:
+    """
+    增量转换的顶层块缓存：
+    Key 为 (顶层 AST 块的哈希, 主题配置哈希, 可用宽度, 资源目录, 同内容块的出现序号)，Value 为该块生成的 Flowable 列表。
+    同一个文档反复转换时（watch / 预览），未改动的段落、代码块、公式直接复用上一次的 Flowable，
+    只有改动过的块重新经过清洗、高亮和公式渲染，之后整篇重新排版。
+
+    注意：行内公式等 PNG 临时文件被缓存的 Paragraph 引用，而共享的 APP_TMP 会被其他转换清理，
+    因此渲染块时产生的临时文件写入缓存私有的子目录：prune()/clear() 删除被丢弃块的文件，close() 删除整个目录。
+    """
+
+    def __init__(self):
+        self._entries = {}
+        # Key 同 _entries, Value: 该块渲染时创建的临时文件路径
+        self._files = {}
+        self._temp_dir = None
+        # 本轮转换用到的 key，prune() 时丢弃其余条目，缓存大小始终不超过一篇文档
+        self._used = set()
+        # 本轮中同一内容块已出现的次数：同一个 Flowable 对象不能在一次 build 里出现两遍
+        self._seen = {}
+        self._config_digest = (None, None)
+        self.hits = 0
+        self.misses = 0
+
+    def begin_run(self):
+        self._used.clear()
+        self._seen.clear()
+        self.hits = self.misses = 0
+
+    def prune(self):
+        """丢弃本轮没有用到的块（已删除或已修改的旧版本）"""
+        for key in self._entries.keys() - self._used:
+            self._drop(key)
+
+    def clear(self):
+        """丢弃全部缓存条目（例如被引用的图片文件内容变了，块哈希无法感知）"""
+        for key in list(self._entries):
+            self._drop(key)
+
+    def close(self):
+        self._entries.clear()
+        self._files.clear()
+        self._used.clear()
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+
+    def _drop(self, key):
+        del self._entries[key]
+        for path in self._files.pop(key, ()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @property
+    def temp_dir(self) -> str:
+        if self._temp_dir is None:
+            os.makedirs(APP_TMP, exist_ok=True)
+            self._temp_dir = tempfile.mkdtemp(prefix="blocks-", dir=APP_TMP)
+        return self._temp_dir
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _theme_digest(self, config) -> str:
+        cached_config, digest = self._config_digest
+        if cached_config is not config:
+            # StyleConfig 是嵌套的 frozen dataclass，repr 覆盖全部字段
+            digest = hashlib.sha1(repr(config).encode("utf-8")).hexdigest()
+            self._config_digest = (config, digest)
+        return digest
+
+    def _key(self, writer, token: dict, base_dir: str) -> tuple:
+        raw = json.dumps(token, sort_keys=True, ensure_ascii=False, default=str)
+        block_digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        base = (block_digest, self._theme_digest(writer.config), round(writer.avail_width, 3), base_dir)
+        nth = self._seen.get(base, 0)
+        self._seen[base] = nth + 1
+        return base + (nth,)
+
+    def render(self, writer, token: dict, base_dir: str, render_block):
+        """渲染一个顶层块：命中缓存时直接追加上次的 Flowable，否则调用 render_block() 并记录产物"""
+        key = self._key(writer, token, base_dir)
+        self._used.add(key)
+
+        flowables = self._entries.get(key)
+        if flowables is not None:
+            self.hits += 1
+            _clear_layout_markers(flowables)
+            writer.current_story.extend(flowables)
+            return
+
+        self.misses += 1
+        # 把本块的输出收集到独立的列表里，流式模式在块内部切段时也不会打乱收集范围
+        buffer = []
+        writer.current_story = buffer
+        try:
+            with temp_file_scope(self.temp_dir) as created:
+                render_block()
+        finally:
+            writer.current_story = writer.story
+        writer.story.extend(buffer)
+        self._entries[key] = buffer
+        self._files[key] = created
@@ -0,0 +1,26 @@
+from reportlab.pdfbase.ttfonts import TTFontFace
+
+
+class LazyTTFontFace(TTFontFace):
+    """
+    从解析缓存恢复的 TTFontFace：字宽、cmap、字形偏移等解析结果来自缓存（__dict__ 直接还原，不调用 __init__），
+    字体文件的原始字节只在生成子集、嵌入 PDF 时才读取；没有用到的字重（如斜体）整个进程都不必读入内存。
+    """
+
+    @property
+    def _ttf_data(self):
+        data = self.__dict__.get("_ttf_bytes")
+        if data is None:
+            with open(self.filename, "rb") as f:
+                data = self._ttf_bytes = f.read()
+        return data
+
+    @_ttf_data.setter
+    def _ttf_data(self, value):
+        self._ttf_bytes = value
+
+    def _pdfScale(self, x):
+        # 原实现是 extractInfo 中按 unitsPerEm 生成的 lambda，无法序列化，这里按同样的规则还原
+        if self.unitsPerEm == 1000:
+            return x
+        return x * (1000 / self.unitsPerEm)
@@ -0,0 +1,19 @@
+import hashlib
+
+from reportlab.pdfgen.canvas import Canvas
+
+
+class PageDigestCanvas(Canvas):
+    """
+    记录每一页绘制指令摘要的 Canvas：
+    实时预览据此比较前后两次排版，找出内容真正发生变化的页码，前端只需跳到第一处变化。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_digests = []
+
+    def showPage(self):
+        code = "\n".join(str(op) for op in self._code)
+        self.page_digests.append(hashlib.sha1(code.encode("utf-8")).hexdigest())
+        super().showPage()
@@ -0,0 +1,113 @@
+from reportlab import rl_config
+from reportlab.platypus import Flowable
+
+
+class QuoteBlock(Flowable):
+    """
+    引用块容器：
+    左侧竖线 + 内边距，子元素按 Frame 的方式纵向排列（相邻间距取 spaceAfter 与 spaceBefore 的较大值）。
+    与单元格 Table 不同，它可以在子元素之间或子元素内部跨页拆分，每一段各自绘制竖线；
+    嵌套引用就是子元素里的另一个 QuoteBlock，拆分按层递归，不会出现表格套表格的整格重复测量。
+    """
+
+    def __init__(self, content, border_width, border_color,
+                 left_padding, right_padding=11, top_padding=3, bottom_padding=0):
+        super().__init__()
+        self.content = list(content or [])
+        self.border_width = border_width
+        self.border_color = border_color
+        self.left_padding = left_padding
+        self.right_padding = right_padding
+        self.top_padding = top_padding
+        self.bottom_padding = bottom_padding
+        self.hAlign = 'LEFT'
+        # wrap 的结果：[(flowable, 与上一个元素的间距, 宽, 高), ...]
+        self._layout = []
+        self._inner_width = 0
+        # _layout 是否覆盖了全部子元素（超出可用高度后会提前停止测量）
+        self._complete = False
+
+    def _copy_with(self, content):
+        return QuoteBlock(content, self.border_width, self.border_color, self.left_padding,
+                          self.right_padding, self.top_padding, self.bottom_padding)
+
+    def wrap(self, availWidth, availHeight):
+        inner_width = max(availWidth - self.left_padding - self.right_padding, 1)
+        layout = []
+        height = self.top_padding
+        prev_after = None
+        complete = True
+        for f in self.content:
+            # 已经超出本页可用高度：后面的子元素反正要拆到下一段，不再测量，
+            # 否则长引用每翻一页都要把剩余全部内容重新 wrap 一遍
+            if height > availHeight:
+                complete = False
+                break
+            w, h = f.wrapOn(self.canv, inner_width, 0x7fffffff)
+            # 顶部元素不计 spaceBefore，与 Frame 行为一致
+            gap = 0 if prev_after is None else max(prev_after, f.getSpaceBefore())
+            layout.append((f, gap, w, h))
+            height += gap + h
+            prev_after = f.getSpaceAfter()
+        height += self.bottom_padding
+
+        self._layout = layout
+        self._complete = complete
+        self._inner_width = inner_width
+        self.width, self.height = availWidth, height
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        if not self._layout or self.width != availWidth:
+            self.wrap(availWidth, availHeight)
+        if self._complete and self.height <= availHeight + rl_config._FUZZ:
+            return [self]
+
+        room = availHeight - self.top_padding - self.bottom_padding
+        used = 0
+        for idx, (f, gap, _w, h) in enumerate(self._layout):
+            if used + gap + h <= room + rl_config._FUZZ:
+                used += gap + h
+                continue
+
+            # 第 idx 个子元素放不下：先尝试把它自身拆开
+            remaining = room - used - gap
+            parts = f.splitOn(self.canv, self._inner_width, remaining) if remaining > 0 else []
+            if parts:
+                head = self.content[:idx] + parts[:1]
+                tail = parts[1:] + self.content[idx + 1:]
+            else:
+                head = self.content[:idx]
+                tail = self.content[idx:]
+            if not head:
+                # 连第一个元素的一部分都放不下，交给 Frame 换页
+                return []
+            if not tail:
+                return [self._copy_with(head)]
+            return [self._copy_with(head), self._copy_with(tail)]
+
+        if self._complete:
+            return [self]
+        # 已测量的部分全部放得下（split 的可用高度可能比 wrap 时略大），未测量的留给下一段
+        n = len(self._layout)
+        if n == 0:
+            return []
+        return [self._copy_with(self.content[:n]), self._copy_with(self.content[n:])]
+
+    def draw(self):
+        canv = self.canv
+        if self.border_width > 0:
+            canv.saveState()
+            canv.setStrokeColor(self.border_color)
+            canv.setLineWidth(self.border_width)
+            canv.line(0, 0, 0, self.height)
+            canv.restoreState()
+
+        y = self.height - self.top_padding
+        for f, gap, w, h in self._layout:
+            y -= gap + h
+            # _sW 为剩余宽度，drawOn 据此处理子元素自身的 hAlign（如居中的公式图片）
+            f.drawOn(canv, self.left_padding, y, _sW=self._inner_width - w)
+
+    def identity(self, maxLen=None):
+        return f"<QuoteBlock at {hex(id(self))}> {len(self.content)} children"
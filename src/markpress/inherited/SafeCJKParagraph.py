@@ -30,35 +30,129 @@
 #             raise e
 
 
+from unicodedata import category
+
+from reportlab import rl_config
+from reportlab.lib.textsplit import ALL_CANNOT_START
 from reportlab.platypus import Paragraph
+from reportlab.platypus.paragraph import ParaLines, _handleBulletWidth, makeCJKParaLine
+
+from markpress.utils.glyph_metrics import char_widths
+
+
+class _CJKUnit(str):
+    """单个字形（或一个零宽的图片/锚点片段），携带所属 frag 与宽度，供 makeCJKParaLine 使用"""
+
+    def __new__(cls, value, frag, width):
+        self = str.__new__(cls, value)
+        self.frag = frag
+        self.width = width
+        return self
+
+
+def cjk_frag_split(frags, maxWidths, calcBounds):
+    """
+    单遍 CJK 断行，等价于 ReportLab 的 cjkFragSplit，但原生处理：
+    - 空文本片段（<img/>、<a name/>、空 font 等），不会再触发 ord('') 崩溃
+    - 行内图片溢出时整体推到下一行，而不是因为 '' in ALL_CANNOT_START 悬挂在右边距外
+    - 行内图片视为合法断点，英文回溯找断点时可以在图片前后断开
+    字宽走 glyph_metrics 的字宽表，不再逐字符调用 stringWidth。
+    """
+    U = []
+    for f in frags:
+        text = getattr(f, 'text', '')
+        if isinstance(text, bytes):
+            text = text.decode('utf8')
+        cb_defn = getattr(f, 'cbDefn', None)
+        if cb_defn is not None:
+            w = getattr(cb_defn, 'width', 0)
+            U.extend([_CJKUnit(t, f, w) for t in text] if text else [_CJKUnit('', f, w)])
+        elif text:
+            U.extend(_CJKUnit(t, f, w) for t, w in zip(text, char_widths(text, f.fontName, f.fontSize)))
+        else:
+            U.append(_CJKUnit('', f, 0))
+
+    fuzz = rl_config._FUZZ
+    lines = []
+    i = widthUsed = lineStartPos = 0
+    maxWidth = maxWidths[0]
+    nU = len(U)
+    while i < nU:
+        u = U[i]
+        i += 1
+        w = u.width
+        if hasattr(w, 'normalizedValue'):
+            w._normalizer = maxWidth
+            w = w.normalizedValue(maxWidth)
+        widthUsed += w
+        lineBreak = hasattr(u.frag, 'lineBreak')
+        endLine = (widthUsed > maxWidth + fuzz and widthUsed > 0) or lineBreak
+        if endLine:
+            extraSpace = maxWidth - widthUsed
+            if not lineBreak:
+                if u and ord(u) < 0x3000:
+                    # 处在西文单词中间：向回找空白、CJK 字符或行内图片作为断点，最多回溯半行
+                    limitCheck = (lineStartPos + i) >> 1
+                    for j in range(i - 1, limitCheck, -1):
+                        uj = U[j]
+                        if not uj or category(uj) == 'Zs' or ord(uj) >= 0x3000:
+                            k = j + 1
+                            if k < i:
+                                j = k + 1
+                                extraSpace += sum(U[ii].width for ii in range(j, i))
+                                w = U[k].width
+                                u = U[k]
+                                i = j
+                                break
+
+                # 避头字符允许悬挂在本行；图片（空文本单元）永远推到下一行
+                if (not u or u not in ALL_CANNOT_START) and i > lineStartPos + 1:
+                    i -= 1
+                    extraSpace += w
+            lines.append(makeCJKParaLine(U[lineStartPos:i], maxWidth, widthUsed, extraSpace, lineBreak, calcBounds))
+            try:
+                maxWidth = maxWidths[len(lines)]
+            except IndexError:
+                maxWidth = maxWidths[-1]
+
+            lineStartPos = i
+            widthUsed = 0
+
+    if widthUsed > 0 or lineStartPos < nU:
+        lines.append(makeCJKParaLine(U[lineStartPos:], maxWidth, widthUsed, maxWidth - widthUsed, False, calcBounds))
+
+    return ParaLines(kind=1, lines=lines)
+
 
 class SafeCJKParagraph(Paragraph):
     """
-    终极版防弹 Paragraph：
-    用于全面接管并捕获 ReportLab CJK 引擎 (cjkFragSplit) 的各种底层崩溃。
-    包含但不限于：
-    - TypeError: ord() expected a character
-    - AttributeError: 'list' object has no attribute 'text'
+    防弹 CJK Paragraph：
+    多片段段落改用 cjk_frag_split 一次完成断行，空片段与行内图片不再让 ReportLab 的
+    cjkFragSplit 崩溃后整段重排。仅当出现无法预料的异常时才降级为西文断行，并打印告警。
     """
 
-    def breakLinesCJK(self, width):
+    def breakLinesCJK(self, maxWidths):
+        frags = self.frags
+        style = self.style
+        nFrags = len(frags)
+        # 单片段、空段落和拆分后的续段沿用 ReportLab 的实现，它们不经过 cjkFragSplit
+        if (nFrags <= 1 and not (nFrags == 1 and hasattr(frags[0], 'cbDefn')) and not style.endDots) \
+                or (hasattr(self, 'blPara') and getattr(self, '_splitpara', 0)):
+            return super().breakLinesCJK(maxWidths)
+
         try:
-            # 尝试调用原始的 CJK 换行逻辑
-            return super().breakLinesCJK(width)
+            if not isinstance(maxWidths, (list, tuple)):
+                maxWidths = [maxWidths]
+            self.height = 0
+            _handleBulletWidth(self.bulletText, style, maxWidths)
+            autoLeading = getattr(self, 'autoLeading', getattr(style, 'autoLeading', ''))
+            calcBounds = autoLeading not in ('', 'off')
+            return cjk_frag_split(frags, maxWidths, calcBounds)
         except Exception as e:
-            # [硬核降级策略]
-            # 只要 CJK 算法崩溃（无论是哪种底层报错），直接关闭 CJK 换行
-            original_wrap = self.style.wordWrap
-            self.style.wordWrap = None
-
+            print(f"[Warn] CJK 断行失败 ({type(e).__name__}: {e})，段落降级为西文断行: {str(self.text)[:40]!r}")
+            original_wrap = style.wordWrap
+            style.wordWrap = None
             try:
-                # 使用标准英文换行算法重试 (它处理 <img/> 的边界极其稳定，绝不崩溃)
-                result = self.breakLines(width)
-            except Exception:
-                # 如果标准引擎也崩了，说明是无法抢救的 XML 语法错误，抛出原始异常
-                self.style.wordWrap = original_wrap
-                raise e
-
-            # 恢复样式设置，保持状态机干净
-            self.style.wordWrap = original_wrap
-            return result
\ No newline at end of file
+                return self.breakLines(maxWidths)
+            finally:
+                style.wordWrap = original_wrap
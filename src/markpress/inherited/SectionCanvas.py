@@ -0,0 +1,35 @@
+from reportlab.pdfgen.canvas import Canvas
+
+# 跨分段锚点链接的占位 URI 前缀，拼接阶段会被替换为真正的页内跳转
+ANCHOR_URI_PREFIX = "markpress-anchor:"
+
+
+class SectionCanvas(Canvas):
+    """
+    并行分段排版用的 Canvas：
+    一个分段 PDF 里只包含本段的标题锚点，指向其他分段的 <a href="#..."> 在 ReportLab 中会因目标未定义而报错。
+    这里把这类链接改写成带 ANCHOR_URI_PREFIX 的 URI 链接，并在排版结束后导出本段锚点的位置，
+    由拼接阶段统一换算成最终文档中的页码与坐标。
+    """
+
+    def __init__(self, *args, foreign_anchors=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self._foreign_anchors = frozenset(foreign_anchors)
+
+    def linkRect(self, contents, destinationname, Rect=None, addtopage=1, name=None, relative=1,
+                 thickness=0, color=None, dashArray=None, **kw):
+        if destinationname in self._foreign_anchors:
+            return self.linkURL(ANCHOR_URI_PREFIX + destinationname, Rect, relative=relative,
+                                thickness=thickness, color=color, dashArray=dashArray)
+        return super().linkRect(contents, destinationname, Rect, addtopage, name, relative,
+                                thickness, color, dashArray, **kw)
+
+    def anchor_positions(self) -> dict:
+        """本段已绑定的锚点：{name: (页序号(从 0 开始), left, top)}"""
+        positions = {}
+        for name, dest in self._destinations.items():
+            if dest.page is None or dest.fmt is None:
+                continue
+            page_index = int(dest.page.name[len("Page"):]) - 1
+            positions[name] = (page_index, getattr(dest.fmt, "left", None), getattr(dest.fmt, "top", None))
+        return positions
@@ -1,11 +1,18 @@
-from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus.paragraph import cleanBlockQuotedText
 
 from markpress.inherited.SafeCJKParagraph import SafeCJKParagraph
+from markpress.utils.glyph_metrics import string_width
 
 
 class SmartInlineImgParagraph(SafeCJKParagraph):
     def __init__(self, text, style, **kwargs):
         super().__init__(text=text, style=style, **kwargs)
+        # 未注入 <br/> 的原始解析结果，任何宽度下的注入都以它为起点
+        self._smart_base = (self.text, self.style, self.frags)
+        # availWidth -> 注入后的 (text, style, frags)；None 表示该宽度下无需注入
+        self._smart_cache = {}
+        # 当前 frags 对应的宽度，ReportLab 以相同宽度反复 wrap 时直接跳过
+        self._smart_width = None
 
     """
     在 wrap 阶段根据当前行剩余宽度，决定 inline <img> 是否强制换行。
@@ -16,14 +23,14 @@ class SmartInlineImgParagraph(SafeCJKParagraph):
         if getattr(frag, "__tag__", None) == "img":
             return float(getattr(frag, "width", 0.0) or 0.0)
 
-        # 普通文本 frag：用 stringWidth 估算（Paragraph 内部也这么干）
+        # 普通文本 frag：用字宽表估算（与 Paragraph 内部的 stringWidth 结果一致）
         txt = getattr(frag, "text", "") or ""
         fontName = getattr(frag, "fontName", self.style.fontName)
         fontSize = getattr(frag, "fontSize", self.style.fontSize)
 
         # 注意：这里按“整段文本”估宽只用于“决定 img 是否换行”的近似游标推进。
         # 真正断行仍由 Paragraph 自己做，所以不会破坏最终排版。
-        return float(stringWidth(txt, fontName, fontSize))
+        return float(string_width(txt, fontName, fontSize))
 
     def _inject_br_before_imgs_if_needed(self, availWidth: float) -> bool:
         """
@@ -32,7 +39,8 @@ class SmartInlineImgParagraph(SafeCJKParagraph):
         返回：是否发生过注入（注入则需要重建 Paragraph）。
         """
         # Paragraph 的原始 XML 在 self.text（reportlab 叫 text，实际是带标签的标记串）
-        raw = getattr(self, "text", None)
+        # 始终基于未注入的原文扫描，避免上一次其他宽度下插入的 <br/> 残留
+        raw = self._smart_base[0] if hasattr(self, "_smart_base") else getattr(self, "text", None)
         if not raw:
             return False
 
@@ -79,7 +87,7 @@ class SmartInlineImgParagraph(SafeCJKParagraph):
                         plain.append(ch)
                 plain = "".join(plain)
                 if plain:
-                    used_w += stringWidth(plain, self.style.fontName, self.style.fontSize)
+                    used_w += string_width(plain, self.style.fontName, self.style.fontSize)
 
             # 抓出这个 img 标签整体
             k = raw.find("/>", j)
@@ -118,10 +126,23 @@ class SmartInlineImgParagraph(SafeCJKParagraph):
             self._smart_new_text = "".join(out).replace("<br/><br/>", "<br/>")
         return changed
 
+    def _apply_smart_breaks(self, availWidth: float):
+        """按宽度切换到对应的注入结果，同一宽度只扫描、解析一次"""
+        if availWidth not in self._smart_cache:
+            state = None
+            if self._inject_br_before_imgs_if_needed(availWidth):
+                # 只重新解析 XML，不再构造新实例并整体拷贝 __dict__
+                bullet_text = self.bulletText
+                self._setup(self._smart_new_text, self._smart_base[1], bullet_text, None, cleanBlockQuotedText)
+                state = (self.text, self.style, self.frags)
+                self.bulletText = bullet_text
+            self._smart_cache[availWidth] = state
+
+        self.text, self.style, self.frags = self._smart_cache[availWidth] or self._smart_base
+        self._smart_width = availWidth
+
     def wrap(self, availWidth, availHeight):
-        if self._inject_br_before_imgs_if_needed(availWidth):
-            new_text = self._smart_new_text
-            rebuilt = self.__class__(new_text, self.style, bulletText=getattr(self, "bulletText", None))
-            self.__dict__.update(rebuilt.__dict__)
+        if availWidth != self._smart_width:
+            self._apply_smart_breaks(availWidth)
 
-        return super().wrap(availWidth, availHeight)
\ No newline at end of file
+        return super().wrap(availWidth, availHeight)
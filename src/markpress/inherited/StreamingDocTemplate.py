@@ -0,0 +1,64 @@
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import SimpleDocTemplate, Frame, PageTemplate
+from reportlab.platypus.doctemplate import PageBegin
+
+from markpress.utils.tracing import span
+
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    """
+    可分段喂入 Flowable 的 SimpleDocTemplate：
+    build() 要求一次性拿到整篇文档的 story，超大 Markdown 会把所有段落、表格和公式图片同时留在内存里。
+    这里把 build 拆成 begin_stream / feed / end_stream 三步，同一个 canvas 贯穿始终，
+    每次 feed 的内容排完即从列表中移除，页码、锚点与一次性 build 完全一致。
+    普通模式下仍可照常调用 build()。两种模式最后都经过 _endBuild，写出 PDF 的耗时单独记为 write 阶段。
+    设置 max_pages 后只排前 max_pages 页，之后喂入的内容直接丢弃（truncated 置为 True），用于预览。
+    """
+
+    max_pages = None
+    truncated = False
+
+    def begin_stream(self, canvasmaker=Canvas):
+        """等价于 SimpleDocTemplate.build 的准备阶段：建立页面模板并打开 canvas"""
+        self._calc()
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([
+            PageTemplate(id='First', frames=frame, pagesize=self.pagesize),
+            PageTemplate(id='Later', frames=frame, pagesize=self.pagesize),
+        ])
+        self._startBuild(canvasmaker=canvasmaker)
+        self.canv._doctemplate = self
+        self.truncated = False
+
+    def _page_limit_reached(self) -> bool:
+        # 第 max_pages 页刚结束、下一页尚未开始（挂起的 PageBegin）时截断，end_stream 会丢弃这个空页
+        return bool(self.max_pages and self.page >= self.max_pages
+                    and self._hanging and self._hanging[-1] is PageBegin)
+
+    def feed(self, flowables: list, final: bool = False):
+        """
+        排版并绘制 flowables，处理完的元素会从列表中删除（原地修改）。
+        非最后一段时，末尾 keepWithNext 的元素留在列表里，等下一段的内容到了再一起排。
+        """
+        hold = 0
+        while not final and hold < len(flowables) and flowables[-1 - hold].getKeepWithNext():
+            hold += 1
+        while len(flowables) > hold:
+            if self.truncated or self._page_limit_reached():
+                self.truncated = True
+                del flowables[:]
+                return
+            self.clean_hanging()
+            self.handle_flowable(flowables)
+
+    def end_stream(self):
+        """收尾：结束最后一页并写出 PDF"""
+        try:
+            del self.canv._doctemplate
+        except AttributeError:
+            pass
+        self._endBuild()
+
+    def _endBuild(self):
+        with span("pdf.write", "write"):
+            super()._endBuild()
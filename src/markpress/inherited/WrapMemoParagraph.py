@@ -0,0 +1,22 @@
+from reportlab.platypus import Paragraph
+
+
+class WrapMemoParagraph(Paragraph):
+    """
+    记住最近一次断行宽度的 Paragraph，用于超大表格的单元格：
+    LongTable 分页时会把剩余的行拼成新表重新测量，列宽不变，同一单元格不必再断一次行。
+    Paragraph 的高度只取决于宽度，宽度不变时直接复用上一次的 blPara。
+    """
+
+    _wrapped_width = None
+
+    def wrap(self, availWidth, availHeight):
+        if availWidth != self._wrapped_width:
+            super().wrap(availWidth, availHeight)
+            self._wrapped_width = availWidth
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        # 拆分会改写 blPara，下次 wrap 必须重新断行
+        self._wrapped_width = None
+        return super().split(availWidth, availHeight)
@@ -0,0 +1,243 @@
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .converter import _render_ast, parse_markdown
+from .core import MarkPressEngine
+from .utils.metrics import REGISTRY
+from .utils.utils import APP_TMP, private_temp_dir
+
+# 默认并发转换数、排队上限与结果保留时长（秒）
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_RESULT_TTL = 3600
+
+# 任务目录：APP_TMP 下的 tmp*.png 会被引擎清理，任务文件放在独立的子目录里
+DEFAULT_JOB_ROOT = os.path.join(APP_TMP, "jobs")
+
+# 后台清理过期任务的间隔（秒），同时刷新本实例目录的修改时间作为存活心跳
+PURGE_INTERVAL = 60
+# 同一 root 下其他实例的目录超过该时长没有心跳，视为进程已退出留下的残留，启动时删除
+STALE_ROOT_SECONDS = 600
+
+_JOBS = REGISTRY.gauge("markpress_jobs", "Async conversion jobs by status", ("status",))
+
+
+class JobQueueFull(Exception):
+    """排队的任务数已达上限"""
+
+
+@dataclass
+class Job:
+    id: str
+    filename: str
+    work_dir: str
+    theme: str
+    config: object = None
+    status: str = "queued"  # queued / running / done / failed
+    stage: str = "queued"
+    progress: float = 0.0
+    error: str = None
+    created: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+
+    @property
+    def md_path(self) -> str:
+        return os.path.join(self.work_dir, Path(self.filename).name)
+
+    @property
+    def result_path(self) -> str:
+        return os.path.join(self.work_dir, Path(self.filename).stem + ".pdf")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+def run_conversion(job: Job, progress):
+    """
+    默认的任务执行函数，与 convert_markdown_file 的流程一致，但逐个顶层块渲染以便汇报进度：
+    解析 0~5%，渲染 5~80%（按顶层块数），排版写出 80~100%。
+    """
+    progress("parse", 0.0)
+    with open(job.md_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    ast = parse_markdown(text)
+
+    engine = MarkPressEngine(job.result_path, job.theme, config=job.config)
+    # 公式图片写入本任务私有的临时目录，并发的任务与同步转换互不清理对方的文件
+    try:
+        with private_temp_dir():
+            total = max(1, len(ast))
+            for i, token in enumerate(ast):
+                _render_ast(engine, [token], job.work_dir)
+                progress("render", 0.05 + 0.75 * (i + 1) / total)
+            progress("layout", 0.8)
+            engine.save_pdf()
+    finally:
+        engine.close_katex_render()
+
+
+class JobManager:
+    """
+    异步转换任务：固定数量的工作线程从有界队列中取任务，输入与结果保存在 root/<pid>-<随机串>/<job_id>/ 下，
+    同一 root 可以被多个服务进程共用，每个实例只管理自己的子目录。
+    已完成的任务保留 result_ttl 秒，过期后连同目录一起删除：后台线程每 purge_interval 秒清理一次，提交与查询时也会顺带清理。
+    runner(job, progress) 负责真正的转换（包括临时文件的清理），可以替换为其他执行方式（例如常驻的工作进程）。
+    """
+
+    def __init__(self, root: str = DEFAULT_JOB_ROOT, workers: int = DEFAULT_JOB_WORKERS,
+                 max_queue: int = DEFAULT_MAX_QUEUE, result_ttl: float = DEFAULT_RESULT_TTL, runner=None,
+                 purge_interval: float = PURGE_INTERVAL):
+        self.parent_root = root
+        self.root = os.path.join(root, f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.purge_interval = purge_interval
+        self.runner = runner or run_conversion
+        self._jobs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stop = threading.Event()
+        self._purger = None
+
+    def start(self):
+        if self._threads:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self._remove_stale_roots()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"markpress-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        self._stop.clear()
+        self._purger = threading.Thread(target=self._purge_loop, name="markpress-job-purge", daemon=True)
+        self._purger.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._purger is not None:
+            self._purger.join()
+            self._purger = None
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        # 任务状态只保存在内存里，实例退出后结果已无法查询
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _remove_stale_roots(self):
+        """删除其他实例退出后留下的目录（长时间没有心跳），仍在运行的实例不受影响"""
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.parent_root))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.path == self.root or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                stale = now - entry.stat(follow_symlinks=False).st_mtime > STALE_ROOT_SECONDS
+            except OSError:
+                continue
+            if stale:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _purge_loop(self):
+        while not self._stop.wait(self.purge_interval):
+            self.purge_expired()
+            try:
+                os.utime(self.root)
+            except OSError:
+                pass
+
+    def submit(self, filename: str, markdown: bytes, images: list = (), theme: str = "academic",
+               config=None) -> Job:
+        """
+        images 为 [(相对路径片段列表, 文件内容)]，写入任务目录后按 Markdown 中的相对路径还原。
+        排队数达到 max_queue 时抛出 JobQueueFull。
+        """
+        self.purge_expired()
+        with self._lock:
+            if self._queue.qsize() >= self.max_queue:
+                raise JobQueueFull(f"排队任务已达上限 ({self.max_queue})")
+            job_id = uuid.uuid4().hex
+            job = Job(job_id, filename, os.path.join(self.root, job_id), theme, config)
+            self._jobs[job_id] = job
+
+        os.makedirs(job.work_dir, exist_ok=True)
+        Path(job.md_path).write_bytes(markdown)
+        for rel_parts, data in images:
+            dest = Path(job.work_dir).joinpath(*rel_parts)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.write_bytes(data)
+
+        _JOBS.inc(status="queued")
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str):
+        self.purge_expired()
+        return self._jobs.get(job_id)
+
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished is not None and now - job.finished > self.result_ttl]
+            for job in expired:
+                del self._jobs[job.id]
+                _JOBS.dec(status=job.status)
+        for job in expired:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def _set_status(self, job: Job, status: str):
+        _JOBS.dec(status=job.status)
+        _JOBS.inc(status=status)
+        job.status = status
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.started = time.time()
+            self._set_status(job, "running")
+
+            def progress(stage, value):
+                job.stage = stage
+                job.progress = value
+
+            try:
+                self.runner(job, progress)
+                if not os.path.exists(job.result_path):
+                    raise RuntimeError("PDF 生成失败，文件不存在")
+                job.stage, job.progress = "done", 1.0
+                self._set_status(job, "done")
+            except Exception as e:
+                print(f"[Warn] 任务 {job.id} 转换失败: {e}")
+                job.error = f"{type(e).__name__}: {e}"
+                self._set_status(job, "failed")
+            finally:
+                job.finished = time.time()
@@ -0,0 +1,115 @@
+import asyncio
+import io
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .converter import parse_markdown, render_document
+from .core import MarkPressEngine
+from .incremental import BlockCache
+from .inherited.PageDigestCanvas import PageDigestCanvas
+from .utils.metrics import REGISTRY
+from .utils.vfs import MemoryFS
+
+# 同时存在的实时预览会话上限：每个会话独占一个引擎和一个 KaTeX 浏览器页面
+DEFAULT_MAX_SESSIONS = 4
+
+_SESSIONS = REGISTRY.gauge("markpress_live_sessions", "Open live preview sessions")
+_RENDER_LATENCY = REGISTRY.histogram(
+    "markpress_live_render_seconds", "Incremental re-render latency of live preview sessions")
+
+
+@dataclass
+class LiveResult:
+    pdf: bytes
+    pages: int
+    # 与上一次结果相比内容发生变化的页码（从 1 开始），页数减少时被删掉的页不计入
+    changed_pages: list = field(default_factory=list)
+    reused: int = 0
+    rendered: int = 0
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "rendered",
+            "pages": self.pages,
+            "changed_pages": self.changed_pages,
+            "reused": self.reused,
+            "rendered": self.rendered,
+            "elapsed": round(self.elapsed, 4),
+            "size": len(self.pdf),
+        }
+
+
+class LiveSession:
+    """
+    Web 实时预览的会话，与 watch 同理：
+    引擎（字体、样式表、KaTeX 浏览器）在会话内只初始化一次，顶层块的 Flowable 由 BlockCache 跨次复用，
+    公式截图另有 KaTeX 结果缓存，改动段落里原有的公式也不必重新渲染；只有改动过的块重新渲染，之后整篇重新排版。
+    Markdown 与图片都只保存在内存里（MemoryFS），PDF 写入缓冲区。
+    Playwright 的同步 API 绑定创建它的线程，因此引擎的创建、渲染与关闭都在会话自己的单线程执行器中完成。
+    """
+
+    def __init__(self):
+        self.files = MemoryFS()
+        self.block_cache = BlockCache()
+        self.engine = None
+        self._page_digests = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="markpress-live")
+        _SESSIONS.inc()
+
+    def put_image(self, rel_parts: list, data: bytes, check_total=None):
+        """
+        添加或替换图片；与渲染在同一线程中按顺序执行，不会打断正在进行的渲染。
+        check_total(total_bytes) 以替换后会话内图片的总字节数调用，抛出异常时本次图片不保存，异常经返回的 Future 传出。
+        """
+        return self._executor.submit(self._put_image, rel_parts, data, check_total)
+
+    def _put_image(self, rel_parts: list, data: bytes, check_total=None):
+        if check_total is not None:
+            # 同一路径重复上传是替换，旧内容不再计入
+            previous = self.files.read(os.path.join(self.files.root, *rel_parts))
+            check_total(self.files.total_bytes - len(previous or b"") + len(data))
+        self.files.add(rel_parts, data)
+        # 图片内容变了但 Markdown 没变，块哈希无法感知，整体失效
+        self.block_cache.clear()
+
+    async def render(self, markdown: str, config) -> LiveResult:
+        return await asyncio.wrap_future(self._executor.submit(self.render_sync, markdown, config))
+
+    def render_sync(self, markdown: str, config) -> LiveResult:
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        if self.engine is None:
+            self.engine = MarkPressEngine(buffer, config=config)
+            self.engine.canvasmaker = PageDigestCanvas
+            self.engine.katex_renderer.memo = OrderedDict()
+        else:
+            self.engine.reset(buffer, config=config)
+        self.engine.vfs = self.files
+
+        ast = parse_markdown(markdown)
+        render_document(self.engine, ast, self.files.root, block_cache=self.block_cache)
+        self.engine.save_pdf()
+
+        digests = self.engine.doc.canv.page_digests
+        previous = self._page_digests
+        changed = [i + 1 for i, digest in enumerate(digests) if i >= len(previous) or previous[i] != digest]
+        self._page_digests = digests
+        elapsed = time.perf_counter() - start
+        _RENDER_LATENCY.observe(elapsed)
+        return LiveResult(buffer.getvalue(), len(digests), changed, self.block_cache.hits, self.block_cache.misses,
+                          elapsed)
+
+    async def close(self):
+        await asyncio.wrap_future(self._executor.submit(self._close))
+        self._executor.shutdown(wait=False)
+
+    def _close(self):
+        if self.engine is not None:
+            self.engine.close_katex_render()
+            self.engine = None
+        self.block_cache.close()
+        _SESSIONS.dec()
@@ -0,0 +1,183 @@
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+# PDF 拼接依赖 pypdf（可选依赖：pip install markpress[parallel]），缺失时退回单进程排版
+try:
+    from pypdf import PdfWriter
+    from pypdf.generic import ArrayObject, FloatObject, NameObject, NullObject
+
+    HAS_PYPDF = True
+except ImportError:
+    HAS_PYPDF = False
+
+from .core import MarkPressEngine
+from .inherited.SectionCanvas import SectionCanvas, ANCHOR_URI_PREFIX
+from .themes import StyleConfig
+from .utils.utils import APP_TMP, clear_temp_files, get_raw_text, slugify
+
+_HTML_ANCHOR_RE = re.compile(r'<a\s[^>]*?\bname\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+# [Global Cache]
+# 工作进程内常驻的引擎与任务参数：字体、样式表和 KaTeX 浏览器在同一进程的多个章节之间复用
+_WORKER_ENGINE = None
+_WORKER_ARGS = None
+
+
+def split_sections(tokens: list) -> list:
+    """按最高一级的顶层标题切分 AST，标题之前的内容归入第一段"""
+    levels = [t.get('attrs', {}).get('level', 1) for t in tokens if t.get('type') == 'heading']
+    if not levels:
+        return [tokens]
+    top = min(levels)
+
+    sections, current = [], []
+    for token in tokens:
+        if token.get('type') == 'heading' and token.get('attrs', {}).get('level', 1) == top and current:
+            sections.append(current)
+            current = []
+        current.append(token)
+    if current:
+        sections.append(current)
+    return sections
+
+
+def collect_anchors(tokens: list) -> set:
+    """收集一段 AST 中会生成 <a name> 的锚点：标题 slug（与 _render_ast 一致）以及 HTML 中手写的 name"""
+    anchors = set()
+    for token in tokens:
+        if token.get('type') == 'heading':
+            anchors.add(slugify(get_raw_text(token.get('children'))))
+        raw = token.get('raw')
+        if isinstance(raw, str) and 'name' in raw:
+            anchors.update(_HTML_ANCHOR_RE.findall(raw))
+        children = token.get('children')
+        if isinstance(children, list):
+            anchors |= collect_anchors(children)
+    return anchors
+
+
+def _init_worker(theme, config, base_dir, all_anchors):
+    global _WORKER_ARGS
+    _WORKER_ARGS = (theme, config, base_dir, frozenset(all_anchors))
+
+
+def _render_section(index: int, tokens: list, out_path: str):
+    """工作进程：排版一个章节到独立 PDF，返回 (序号, 本段锚点位置)"""
+    global _WORKER_ENGINE
+    from .converter import _render_ast
+
+    theme, config, base_dir, all_anchors = _WORKER_ARGS
+    if _WORKER_ENGINE is None:
+        _WORKER_ENGINE = MarkPressEngine(out_path, theme, config=config)
+        # 临时目录被所有工作进程共享，由主进程在拼接完成后统一清理
+        _WORKER_ENGINE.clear_temp_on_save = False
+        # 进程池回收工作进程时关闭 KaTeX 浏览器（fork 出的子进程不会执行 atexit）
+        Finalize(_WORKER_ENGINE, _WORKER_ENGINE.close_katex_render, exitpriority=10)
+    else:
+        _WORKER_ENGINE.reset(out_path)
+    engine = _WORKER_ENGINE
+
+    foreign = all_anchors - collect_anchors(tokens)
+    engine.canvasmaker = lambda *args, **kwargs: SectionCanvas(*args, foreign_anchors=foreign, **kwargs)
+
+    _render_ast(engine, tokens, base_dir)
+    engine.save_pdf()
+    return index, engine.doc.canv.anchor_positions()
+
+
+def _pdf_number(value):
+    return NullObject() if value is None or value == "null" else FloatObject(value)
+
+
+def stitch_sections(section_paths: list, section_anchors: list, output_path: str, title: str = None, author: str = None):
+    """
+    按顺序拼接各章节 PDF：
+    页码顺延后，把各段导出的锚点换算为全局页码，再把跨段的占位 URI 链接改写成页内跳转。
+    段内链接本身就是指向本段页面的显式目标，pypdf 合并时会随页面一起重新映射。
+    """
+    writer = PdfWriter()
+    anchors = {}
+    for path, positions in zip(section_paths, section_anchors):
+        offset = len(writer.pages)
+        writer.append(path)
+        for name, (page_index, left, top) in positions.items():
+            # 与单进程构建一致：同名锚点以后定义的为准
+            anchors[name] = (offset + page_index, left, top)
+
+    unresolved = set()
+    for page in writer.pages:
+        for annot_ref in page.get('/Annots', None) or []:
+            annot = annot_ref.get_object()
+            action = annot.get('/A')
+            if action is None:
+                continue
+            uri = action.get_object().get('/URI')
+            if not isinstance(uri, str) or not uri.startswith(ANCHOR_URI_PREFIX):
+                continue
+            name = uri[len(ANCHOR_URI_PREFIX):]
+            target = anchors.get(name)
+            if target is None:
+                unresolved.add(name)
+                continue
+            page_index, left, top = target
+            del annot['/A']
+            annot[NameObject('/Dest')] = ArrayObject([
+                writer.pages[page_index].indirect_reference, NameObject('/XYZ'),
+                _pdf_number(left), _pdf_number(top), FloatObject(0),
+            ])
+    if unresolved:
+        print(f"[Warn] 以下锚点在任何章节中都不存在，链接保持无效: {sorted(unresolved)}")
+
+    metadata = {}
+    if title:
+        metadata['/Title'] = title
+    if author:
+        metadata['/Author'] = author
+    if metadata:
+        writer.add_metadata(metadata)
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+
+
+def convert_ast_parallel(tokens: list, output_path: str, theme: str = "academic", config=None,
+                         base_dir: str = ".", workers: int = None) -> bool:
+    """
+    多进程并行排版：按顶层标题切分章节，每个章节在进程池中独立生成 PDF，最后拼接为一个文件。
+    每个章节从新的一页开始：即使主题在该级标题前不分页，-j 的输出也会比单进程多出章节间的分页。
+    返回 False 表示不适合并行（缺少 pypdf 或只有一个章节），调用方应走单进程流程。
+    """
+    if not HAS_PYPDF:
+        print("[Warn] 未安装 pypdf，无法拼接分段 PDF，回退为单进程排版 (pip install pypdf)")
+        return False
+
+    sections = split_sections(tokens)
+    if len(sections) < 2:
+        return False
+
+    workers = min(workers or os.cpu_count() or 1, len(sections))
+    all_anchors = collect_anchors(tokens)
+    os.makedirs(APP_TMP, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="sections-", dir=APP_TMP)
+    section_paths = [os.path.join(work_dir, f"section-{i:05d}.pdf") for i in range(len(sections))]
+    section_anchors = [None] * len(sections)
+
+    print(f"[MarkPress] 并行排版: {len(sections)} 个章节, {workers} 个进程")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(theme, config, base_dir, all_anchors)) as pool:
+            futures = [pool.submit(_render_section, i, section, section_paths[i])
+                       for i, section in enumerate(sections)]
+            for future in futures:
+                index, positions = future.result()
+                section_anchors[index] = positions
+
+        meta = (config if config is not None else StyleConfig.get_pre_build_style(theme)).meta
+        stitch_sections(section_paths, section_anchors, output_path, title=meta.name, author=meta.author)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        clear_temp_files()
+    return True
@@ -1,26 +1,129 @@
 import re
+from functools import lru_cache
+from typing import List, Optional
+
 from reportlab.platypus import Paragraph, Table, TableStyle, Spacer, KeepTogether
 from reportlab.lib import colors
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import mm
 
-# Pygments imports
+# Pygments imports；lexer 注册表（pygments.lexers）较重，遇到第一个围栏代码块时才导入
 try:
     from pygments import lex
-    from pygments.lexers import get_lexer_by_name
     from pygments.token import Token
+    from pygments.util import ClassNotFound
 
     HAS_PYGMENTS = True
 except ImportError:
     HAS_PYGMENTS = False
 
 from .base import BaseRenderer
+from ..utils.metrics import record_cache
+
+# Lexer 缓存的条目上限：语言名来自用户 Markdown 的围栏信息串，长驻的服务/守护进程里不能无限增长
+LEXER_CACHE_SIZE = 256
+
+# 语言别名索引：小写别名 / 文件扩展名 -> Pygments 规范别名，首次使用时构建；
+# 构建完成后整体赋值，其他线程要么看到 None 要么看到完整的索引
+_LANG_ALIAS_INDEX = None
+
+# Pygments 没有覆盖、但在 Markdown 围栏里很常见的写法
+_EXTRA_ALIASES = {
+    "shell-session": "console",
+    "sh-session": "console",
+    "terminal": "console",
+    "yml": "yaml",
+    "golang": "go",
+    "py2": "python2",
+    "jsonc": "json",
+    "dockerfile": "docker",
+    "vue": "html",
+    "txt": "text",
+    "plaintext": "text",
+    "plain": "text",
+}
+
+
+def _build_alias_index() -> dict:
+    """基于 Pygments 注册表构建别名索引（只构建一次；并发的首次调用各自构建，结果相同）"""
+    global _LANG_ALIAS_INDEX
+    if _LANG_ALIAS_INDEX is not None:
+        return _LANG_ALIAS_INDEX
+    if not HAS_PYGMENTS:
+        return {}
+    from pygments.lexers import get_all_lexers
+
+    index = {}
+    for _name, aliases, filenames, _mimetypes in get_all_lexers():
+        if not aliases:
+            continue
+        canonical = aliases[0]
+        for alias in aliases:
+            index.setdefault(alias.lower(), canonical)
+        # 文件扩展名兜底，例如 ```yml / ```rs
+        for pattern in filenames:
+            if pattern.startswith("*.") and "*" not in pattern[2:] and "[" not in pattern:
+                index.setdefault(pattern[2:].lower(), canonical)
+
+    for alias, target in _EXTRA_ALIASES.items():
+        index.setdefault(alias, index.get(target, target))
+    _LANG_ALIAS_INDEX = index
+    return index
+
+
+def normalize_language(info: Optional[str]) -> str:
+    """
+    规范化围栏信息串：
+    '{python}' / '{.python}' / 'language-python' / 'python title="a.py"' -> 'python'
+    """
+    if not info:
+        return ""
+    lang = info.strip()
+    # pandoc / Quarto 风格: {python} {.python} {r, echo=FALSE}
+    if lang.startswith("{"):
+        lang = lang.strip("{}").strip()
+    # 只取第一个词，丢弃 title="..." 之类的附加属性
+    lang = re.split(r"[\s,{}]", lang, maxsplit=1)[0]
+    lang = lang.lstrip(".").lower()
+    if lang.startswith("language-"):
+        lang = lang[len("language-"):]
+    return lang
+
+
+# [Global Cache]
+# get_lexer_by_name 每次都要遍历 Pygments 的 lexer 注册表，开销不小
+# Key: 规范化后的语言名, Value: Lexer 实例；None 表示已确认无法解析（负缓存，避免反复重试）
+@lru_cache(maxsize=LEXER_CACHE_SIZE)
+def _lexer_for(lang: str):
+    from pygments.lexers import get_lexer_by_name
+
+    canonical = _build_alias_index().get(lang, lang)
+    try:
+        # stripnl=False: 代码已经在 render 里 strip 过，保持行号与原文一一对应
+        return get_lexer_by_name(canonical, stripnl=False)
+    except ClassNotFound:
+        return None
+
+
+def resolve_lexer(language: Optional[str]):
+    """根据语言名解析 Lexer，命中缓存直接返回；无法解析时返回 None（同样会被缓存）"""
+    if not HAS_PYGMENTS:
+        return None
+    lang = normalize_language(language)
+    if not lang:
+        return None
+    misses = _lexer_for.cache_info().misses
+    lexer = _lexer_for(lang)
+    record_cache("lexer", hit=_lexer_for.cache_info().misses == misses)
+    return lexer
 
 
 class CodeRenderer(BaseRenderer):
     def __init__(self, config, stylesheet):
         super().__init__(config, stylesheet)
         self.token_color_map = self._build_token_map()
+        # token 类型 -> 最终颜色（含继承链查找结果）
+        self._resolved_colors = {}
 
     def render(self, code: str, language: str = None, **kwargs):
         self._init_styles()
@@ -31,22 +134,22 @@ class CodeRenderer(BaseRenderer):
         # 切片粒度
         MAX_LINES_PER_BLOCK = 2
 
-        lines = code.split('\n')
-        total_lines = len(lines)
+        # 整块只做一次词法分析，再按行切分，跨行 token（如 docstring）也能保持颜色
+        xml_lines = self._highlight_code_to_lines(code, language)
+        total_lines = len(xml_lines)
         flowables = []
 
-        original_language = language
+        lang_label = normalize_language(language)
 
         for i in range(0, total_lines, MAX_LINES_PER_BLOCK):
-            chunk_lines = lines[i: i + MAX_LINES_PER_BLOCK]
-            chunk_code = "\n".join(chunk_lines)
+            chunk_xml = "<br/>".join(xml_lines[i: i + MAX_LINES_PER_BLOCK])
 
             is_first = (i == 0)
             is_last = (i + MAX_LINES_PER_BLOCK >= total_lines)
 
             t = self._create_table_card(
-                chunk_code,
-                original_language,
+                chunk_xml,
+                lang_label,
                 kwargs.get('avail_width', 160 * mm),
                 is_first,
                 is_last
@@ -59,8 +162,7 @@ class CodeRenderer(BaseRenderer):
                 flowables.append(t)
         return flowables + [Spacer(1, 10)]
 
-    def _create_table_card(self, code_text, language, avail_width, is_first, is_last):
-        xml_content = self._highlight_code_to_xml(code_text, language)
+    def _create_table_card(self, xml_content, language, avail_width, is_first, is_last):
         code_para = Paragraph(xml_content, self.styles["Code_Block"])
 
         data = []
@@ -164,38 +266,48 @@ class CodeRenderer(BaseRenderer):
                 continue
         return token_map
 
-    def _highlight_code_to_xml(self, code, language):
+    def _highlight_code_to_lines(self, code, language) -> List[str]:
+        """将整段代码高亮为 XML，按源码行返回（每行一个字符串，不含 <br/>）"""
         def escape_html(s):
             return s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;') \
-                .replace(' ', '&nbsp;').replace('\n', '<br/>')
+                .replace(' ', '&nbsp;')
 
         def wrap_cjk(text):
             return re.sub(r'([\u4e00-\u9fa5\u3000-\u303f\uff00-\uffef]+)',
                           rf'<font face="{self.config.fonts.regular}">\1</font>', text)
 
-        if not HAS_PYGMENTS or not language:
-            return wrap_cjk(escape_html(code))
-
-        try:
-            lexer = get_lexer_by_name(language)
-        except:
-            return wrap_cjk(escape_html(code))
-
-        tokens = lex(code, lexer)
-        out_xml = ""
-
-        for token_type, value in tokens:
-            value = escape_html(value)
-            value = wrap_cjk(value)
-            color = None
-            curr = token_type
-            while curr is not None:
-                if curr in self.token_color_map:
-                    color = self.token_color_map[curr]
-                    break
-                curr = curr.parent
-            if color:
-                out_xml += f'<font color="{color}">{value}</font>'
-            else:
-                out_xml += value
-        return out_xml
\ No newline at end of file
+        src_lines = code.split('\n')
+        lexer = resolve_lexer(language)
+        if lexer is None:
+            return [wrap_cjk(escape_html(line)) for line in src_lines]
+
+        out_lines = [[]]
+        for token_type, value in lex(code, lexer):
+            color = self._token_color(token_type)
+            # token 可能跨行（docstring、多行注释），逐行拆开，每行各自闭合 font 标签
+            for j, piece in enumerate(value.split('\n')):
+                if j > 0:
+                    out_lines.append([])
+                if not piece:
+                    continue
+                piece = wrap_cjk(escape_html(piece))
+                if color:
+                    piece = f'<font color="{color}">{piece}</font>'
+                out_lines[-1].append(piece)
+
+        # Lexer 会自动补一个结尾换行，按原始行数截断
+        return ["".join(parts) for parts in out_lines[:len(src_lines)]]
+
+    def _token_color(self, token_type):
+        """沿 token 继承链查找主题颜色，结果按 token 类型缓存"""
+        if token_type in self._resolved_colors:
+            return self._resolved_colors[token_type]
+        color = None
+        curr = token_type
+        while curr is not None:
+            if curr in self.token_color_map:
+                color = self.token_color_map[curr]
+                break
+            curr = curr.parent
+        self._resolved_colors[token_type] = color
+        return color
@@ -1,15 +1,14 @@
 # 公式，包含行内和行间
 import os
-import tempfile
 from typing import Any, List
 
-import matplotlib.pyplot as plt
-from PIL import Image as PILImage  # 用于精确获取像素尺寸
 from reportlab.lib.units import mm
 from reportlab.platypus import Image, Paragraph, Spacer, Flowable
 
 from .base import BaseRenderer
-from ..utils.utils import APP_TMP
+from ..utils.metrics import FORMULA_RENDERS
+from ..utils.tracing import traced
+from ..utils.utils import new_temp_file
 
 # # [Global Cache]
 # # Matplotlib 渲染开销极大，必须缓存已渲染的公式
@@ -74,6 +73,7 @@ class FormulaRenderer(BaseRenderer):
             safe_latex = latex.replace('<', '&lt;').replace('>', '&gt;')
             return f"<font color='red'>${safe_latex}$</font>"
 
+    @traced("matplotlib", "math")
     def _generate_image(self, latex: str, fontsize: float, dpi: int = 300):
         """
         核心渲染引擎 (Matplotlib -> Temp File)
@@ -82,6 +82,10 @@ class FormulaRenderer(BaseRenderer):
         # if cache_key in _FORMULA_CACHE:
         #     return _FORMULA_CACHE[cache_key]
 
+        # Matplotlib 导入约需 0.7s，只在 KaTeX 不可用、退回这里时才加载
+        import matplotlib.pyplot as plt
+        from PIL import Image as PILImage  # 用于精确获取像素尺寸
+
         # 配置 Matplotlib，stix' 字体风格最接近标准 LaTeX
         plt.rc('mathtext', fontset='stix')
 
@@ -94,7 +98,7 @@ class FormulaRenderer(BaseRenderer):
         # 保存到临时文件，使用 tempfile 生成唯一路径，且不自动删除 (ReportLab 读取需要文件存在)
         # to do: 在生产环境中，这些临时文件应该在程序结束时清理，或者定期清理 /tmp
         # 已经完成to do
-        fd, path = tempfile.mkstemp(suffix=".png",dir=APP_TMP)
+        fd, path = new_temp_file(".png")
         os.close(fd)  # 关闭文件描述符，释放给 plt 使用
 
         # 渲染保存，transparent=True 保证背景透明，融合纸张颜色，pad_inches=0.02 留极少量的白边，防止切掉积分号等大符号的边缘
@@ -110,6 +114,7 @@ class FormulaRenderer(BaseRenderer):
         pt_w = px_w * 72 / dpi
         pt_h = px_h * 72 / dpi
 
+        FORMULA_RENDERS.inc(engine="matplotlib")
         # 存入缓存
         result = (path, pt_w, pt_h)
         # _FORMULA_CACHE[cache_key] = result
@@ -5,10 +5,10 @@ from .base import BaseRenderer
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
 from reportlab.lib.styles import ParagraphStyle
-import tempfile
 import urllib.request
 from PIL import Image as PILImage
-from ..utils.utils import APP_TMP
+from ..utils.tracing import traced
+from ..utils.utils import is_offline, new_temp_file
 
 # 本地文档转换工具，允许加载高分辨率图片
 PILImage.MAX_IMAGE_PIXELS = None
@@ -40,22 +40,31 @@ class ImageRenderer(BaseRenderer):
             ))
 
     # 图片渲染器
+    @traced("image_load", "images")
     def render(self, image_path: str, alt_text: str = "", **kwargs):
         avail_width = kwargs.get('avail_width', 160 * mm)
 
         # 在线图片：下载到本地临时文件
+        downloaded = False
         if image_path.startswith(('http://', 'https://')):
             local_path = self._download_image(image_path)
             if not local_path:
                 print(f"警告: 无法下载图片: {image_path}")
                 return []
             image_path = local_path
+            downloaded = True
 
-        if not os.path.exists(image_path):
+        # 内存转换：本地图片只从挂载的 MemoryFS 中读取，不访问磁盘（下载的在线图片除外）
+        vfs = kwargs.get('vfs')
+        if vfs is not None and not downloaded:
+            source = vfs.open(image_path)
+        else:
+            source = image_path if os.path.exists(image_path) else None
+        if source is None:
             print(f"警告: 图片文件不存在或无法访问: {image_path}")
             return [Paragraph(f"<b><font color='red'>加载图片{alt_text}失败</font></b>",self.styles["Body_Text"])]
         try:
-            img = Image(image_path)
+            img = Image(source)
             # 获取原始尺寸
             img_width = img.imageWidth
             img_height = img.imageHeight
@@ -87,15 +96,19 @@ class ImageRenderer(BaseRenderer):
             return []
 
     @staticmethod
+    @traced("image_download", "images")
     def _download_image(url: str) -> str:
         """下载在线图片到临时文件，返回本地路径；失败返回 None"""
+        if is_offline():
+            print(f"[Warn] 离线模式，跳过在线图片 {url}")
+            return None
         try:
             req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
             with urllib.request.urlopen(req, timeout=30) as resp:
                 data = resp.read()
             # 从 URL 提取扩展名，默认 .png
             suffix = os.path.splitext(url.split('?')[0])[-1] or '.png'
-            fd, path = tempfile.mkstemp(suffix=suffix, dir=APP_TMP)
+            fd, path = new_temp_file(suffix)
             os.write(fd, data)
             os.close(fd)
             return path
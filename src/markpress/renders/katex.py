@@ -1,13 +1,13 @@
 from pathlib import Path
 from typing import Any, List
 import os
-import tempfile
 
-from playwright.sync_api import sync_playwright
 from reportlab.platypus import Flowable
 
 from .base import BaseRenderer
-from ..utils.utils import get_katex_path, APP_TMP
+from ..utils.metrics import BROWSER_LAUNCHES, FORMULA_RENDERS, record_cache
+from ..utils.tracing import traced
+from ..utils.utils import get_katex_path, APP_TMP, is_offline, new_temp_file
 
 
 class KatexRenderer(BaseRenderer):
@@ -25,13 +25,32 @@ class KatexRenderer(BaseRenderer):
             if not self.js_path.exists():
                 raise FileNotFoundError(f"KaTeX JS missing: {self.js_path}")
 
-        # 2. 初始化 Playwright (单例模式，避免每个公式都重启浏览器)
+        # 可选的公式结果缓存 {(latex, is_block): (png, w, h)}，为 OrderedDict 时启用（按最近使用淘汰），
+        # 常驻会话（实时预览）反复编辑时，改动段落里原有的公式不必重新截图
+        self.memo = None
+        self.memo_size = 1024
+
+        # 2. Playwright 单例，避免每个公式都重启浏览器；
+        # 启动 Chromium 要一秒以上，推迟到第一次遇到公式或 SVG 时（ensure_browser）
         self.playwright = None
         self.browser = None
         self.page = None
-        self._init_browser()
+        self._browser_started = False
+
+    def ensure_browser(self) -> bool:
+        """按需启动浏览器，返回是否可用；启动失败只告警一次，之后的公式退回 Matplotlib 渲染"""
+        if not self._browser_started:
+            self._browser_started = True
+            try:
+                self._init_browser()
+            except Exception as e:
+                print(f"[Warn] KaTeX 渲染引擎启动失败，公式改用 Matplotlib 渲染: {e}")
+                self.close()
+        return self.page is not None
 
     def _init_browser(self):
+        from playwright.sync_api import sync_playwright
+
         print("Initializing KaTeX Rendering Engine (Playwright)...")
         self.playwright = sync_playwright().start()
 
@@ -78,6 +97,7 @@ class KatexRenderer(BaseRenderer):
                 print("Hint: You can try running 'playwright install chromium' manually.")
                 raise e
 
+        BROWSER_LAUNCHES.inc()
         self.page = self.browser.new_page(device_scale_factor=3)
 
         html_path = Path(APP_TMP) / "_katex_env.html"
@@ -149,10 +169,29 @@ class KatexRenderer(BaseRenderer):
         #     print(f"CRITICAL: KaTeX JS failed to load. Path: {self.js_path}")
         #     raise e
 
+    @traced("katex", "math")
     def render_image(self, latex: str, is_block: bool = False):
         """
         调用 JS 渲染 LaTeX，并截图
         """
+        if self.memo is None:
+            return self._render_image(latex, is_block)
+        key = (latex, is_block)
+        result = self.memo.get(key)
+        record_cache("katex_memo", hit=result is not None)
+        if result is not None:
+            self.memo.move_to_end(key)
+            return result
+        result = self._render_image(latex, is_block)
+        if result[0]:
+            self.memo[key] = result
+            while len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        return result
+
+    def _render_image(self, latex: str, is_block: bool = False):
+        if not self.ensure_browser():
+            return None, 0, 0
         try:
             # 准备 JS 代码
             # throwOnError: false 防止 JS 报错导致程序崩
@@ -189,17 +228,22 @@ class KatexRenderer(BaseRenderer):
             width_pt = box['width'] * 0.75
             height_pt = box['height'] * 0.75
 
+            FORMULA_RENDERS.inc(engine="katex")
             return png_bytes, width_pt, height_pt
 
         except Exception as e:
             print(f"KaTeX Render Error Happens: {e}")
             return None, 0, 0
 
+    @traced("svg_rasterize", "images")
     def render_svg_url_to_png(self, url: str):
         """
         光栅化：让 Chromium 打开 SVG 链接并截图为 PNG
         """
-        if not self.browser or not self.page:
+        if is_offline() and url.startswith(('http://', 'https://')):
+            print(f"[Warn] 离线模式，跳过在线 SVG {url}")
+            return None, 0, 0
+        if not self.ensure_browser():
             return None, 0, 0
 
         try:
@@ -235,7 +279,7 @@ class KatexRenderer(BaseRenderer):
             return None, 0, 0
 
         # 写入临时文件
-        fd, path = tempfile.mkstemp(suffix=".png",dir=APP_TMP)
+        fd, path = new_temp_file(".png")
         os.write(fd, png_bytes)
         os.close(fd)
 
@@ -247,3 +291,4 @@ class KatexRenderer(BaseRenderer):
             self.browser.close()
         if self.playwright:
             self.playwright.stop()
+        self.playwright = self.browser = self.page = None
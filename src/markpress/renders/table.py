@@ -1,12 +1,34 @@
-from typing import Any, List, Optional
+import html
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
 
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import mm
-from reportlab.platypus import Flowable, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import Flowable, LongTable, Paragraph, Spacer, Table, TableStyle
 
 from .base import BaseRenderer
+from ..inherited.WrapMemoParagraph import WrapMemoParagraph
+from ..utils.glyph_metrics import string_width
+
+# 列宽测量缓存的条目上限：表格里的词/值高度重复，上限之外按 LRU 淘汰，长驻的服务/守护进程内存不会无限增长
+TEXT_WIDTH_CACHE_SIZE = 8192
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_IMG_WIDTH_RE = re.compile(r'<img[^>]*?width="([\d.]+)"')
+# 不可断开的最小单元：连续的非 CJK 非空白字符，或单个 CJK 字符
+_CJK_CHARS = '\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef'
+_UNBREAKABLE_RE = re.compile(rf'[^\s{_CJK_CHARS}]+|[{_CJK_CHARS}]')
+
+
+# [Global Cache]
+# 列宽测量会对成千上万个单元格测宽
+# Key: (text, font_name, font_size), Value: width_pt
+@lru_cache(maxsize=TEXT_WIDTH_CACHE_SIZE)
+def _text_width(text: str, font_name: str, font_size: float) -> float:
+    return string_width(text, font_name, font_size)
 
 
 class TableRenderer(BaseRenderer):
@@ -14,6 +36,14 @@ class TableRenderer(BaseRenderer):
 
     ALIGN_MAP = {"left": TA_LEFT, "center": TA_CENTER, "right": TA_RIGHT}
 
+    # 超过该行数（不含表头）切换到大表模式：LongTable + 表头跨页重复 + 批量行背景 + 单元格断行结果复用
+    LARGE_TABLE_ROWS = 100
+
+    # 单元格左右内边距
+    CELL_PADDING = 6
+    # 单列最小内容宽度不超过可用宽度的该比例，超长单词/URL 交给 splitLongWords 折断
+    MAX_MIN_CONTENT_RATIO = 0.4
+
     def __init__(self, config, stylesheet):
         super().__init__(config, stylesheet)
         self._init_styles()
@@ -62,9 +92,16 @@ class TableRenderer(BaseRenderer):
         if num_cols == 0:
             return []
 
-        # 等宽分配列宽
-        col_width = avail_width / num_cols
-        col_widths = [col_width] * num_cols
+        # 按内容测量分配列宽
+        col_widths = self._compute_col_widths(header, body, num_cols, avail_width, data.get("spans", []))
+
+        is_large = len(body) > self.LARGE_TABLE_ROWS
+        # 大表分页时剩余的行会被重新测量，单元格按列宽缓存断行结果
+        cell_cls = WrapMemoParagraph if is_large else Paragraph
+
+        # 列样式只解析一次，避免每个单元格重复查表
+        header_styles = [self._cell_style("Table_Header", aligns, i) for i in range(num_cols)]
+        cell_styles = [self._cell_style("Table_Cell", aligns, i) for i in range(num_cols)]
 
         # 构建 Paragraph 矩阵
         table_data = []
@@ -72,22 +109,24 @@ class TableRenderer(BaseRenderer):
         if header:
             header_row = []
             for i, cell_text in enumerate(header):
-                style = self._cell_style("Table_Header", aligns, i)
-                header_row.append(Paragraph(cell_text or "", style))
+                header_row.append(cell_cls(cell_text or "", header_styles[i]))
             table_data.append(header_row)
 
         for row in body:
             data_row = []
             for i in range(num_cols):
                 cell_text = row[i] if i < len(row) else ""
-                style = self._cell_style("Table_Cell", aligns, i)
-                data_row.append(Paragraph(cell_text or "", style))
+                data_row.append(cell_cls(cell_text or "", cell_styles[i]))
             table_data.append(data_row)
 
         if not table_data:
             return []
 
-        t = Table(table_data, colWidths=col_widths, hAlign='LEFT')
+        if is_large:
+            # LongTable 逐页测量行高，表头通过 repeatRows 在每一页重复
+            t = LongTable(table_data, colWidths=col_widths, hAlign='LEFT', repeatRows=1 if header else 0)
+        else:
+            t = Table(table_data, colWidths=col_widths, hAlign='LEFT')
 
         # 构建样式命令
         t_conf = self.config.styles.table
@@ -99,8 +138,8 @@ class TableRenderer(BaseRenderer):
         style_cmds = [
             ('GRID', (0, 0), (-1, -1), 0.5, grid_color),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('LEFTPADDING', (0, 0), (-1, -1), self.CELL_PADDING),
+            ('RIGHTPADDING', (0, 0), (-1, -1), self.CELL_PADDING),
             ('TOPPADDING', (0, 0), (-1, -1), 4),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
         ]
@@ -113,12 +152,20 @@ class TableRenderer(BaseRenderer):
         row_backgrounds = data.get("row_backgrounds", {})
         data_start = 1 if header else 0
         total_rows = len(table_data)
-        for row_idx in range(data_start, total_rows):
-            if row_idx in row_backgrounds:
-                bg = colors.HexColor(row_backgrounds[row_idx])
-            else:
-                bg = row_even if (row_idx - data_start) % 2 == 0 else row_odd
-            style_cmds.append(('BACKGROUND', (0, row_idx), (-1, row_idx), bg))
+        if is_large:
+            # 大表：一条 ROWBACKGROUNDS 覆盖全部数据行，只为自定义颜色的行追加 BACKGROUND
+            if data_start < total_rows:
+                style_cmds.append(('ROWBACKGROUNDS', (0, data_start), (-1, -1), [row_even, row_odd]))
+            for row_idx, bg_hex in sorted(row_backgrounds.items()):
+                if data_start <= row_idx < total_rows:
+                    style_cmds.append(('BACKGROUND', (0, row_idx), (-1, row_idx), colors.HexColor(bg_hex)))
+        else:
+            for row_idx in range(data_start, total_rows):
+                if row_idx in row_backgrounds:
+                    bg = colors.HexColor(row_backgrounds[row_idx])
+                else:
+                    bg = row_even if (row_idx - data_start) % 2 == 0 else row_odd
+                style_cmds.append(('BACKGROUND', (0, row_idx), (-1, row_idx), bg))
 
         # 处理单元格合并 (colspan)
         for (col_start, row_start), (col_end, row_end) in data.get("spans", []):
@@ -128,6 +175,73 @@ class TableRenderer(BaseRenderer):
 
         return [Spacer(1, 2 * mm), t, Spacer(1, 4 * mm)]
 
+    def _compute_col_widths(self, header: List[str], body: List[List[str]], num_cols: int,
+                            avail_width: float, spans: list) -> List[float]:
+        """
+        内容感知的列宽分配（类似 CSS auto 表格布局）：
+        1. 每列测量最小内容宽度（最长的不可断开单元）和最大内容宽度（不换行时的整行宽度）
+        2. 最大宽度放得下：按最大宽度比例铺满可用宽度
+        3. 最小宽度都放不下：按最小宽度比例压缩
+        4. 介于两者之间：在最小与最大之间按可伸缩量线性插值
+        """
+        pad = 2 * self.CELL_PADDING
+        min_w = [0.0] * num_cols
+        max_w = [0.0] * num_cols
+        min_cap = avail_width * self.MAX_MIN_CONTENT_RATIO
+
+        # 跨列单元格的内容不计入单列测量，否则会把首列撑得过宽
+        spanned = {(c0, r0) for (c0, r0), (c1, _r1) in spans if c1 > c0}
+
+        def measure_row(row, row_idx, style):
+            font_name, font_size = style.fontName, style.fontSize
+            for col in range(min(num_cols, len(row))):
+                if (col, row_idx) in spanned or not row[col]:
+                    continue
+                cell_min, cell_max = self._measure_cell(row[col], font_name, font_size)
+                if cell_max > max_w[col]:
+                    max_w[col] = cell_max
+                if cell_min > min_w[col]:
+                    min_w[col] = min(cell_min, min_cap)
+
+        data_start = 0
+        if header:
+            measure_row(header, 0, self.styles["Table_Header"])
+            data_start = 1
+        cell_style = self.styles["Table_Cell"]
+        for row_idx, row in enumerate(body, start=data_start):
+            measure_row(row, row_idx, cell_style)
+
+        # 空列至少保留约两个字符的宽度
+        floor = pad + cell_style.fontSize * 2
+        min_w = [max(floor, w + pad) for w in min_w]
+        max_w = [max(mn, w + pad) for mn, w in zip(min_w, max_w)]
+
+        total_min, total_max = sum(min_w), sum(max_w)
+        if total_max <= avail_width:
+            return [w * avail_width / total_max for w in max_w]
+        if total_min >= avail_width:
+            return [w * avail_width / total_min for w in min_w]
+        ratio = (avail_width - total_min) / (total_max - total_min)
+        return [mn + (mx - mn) * ratio for mn, mx in zip(min_w, max_w)]
+
+    def _measure_cell(self, xml_text: str, font_name: str, font_size: float) -> Tuple[float, float]:
+        """返回单元格的 (最小内容宽度, 最大内容宽度)，<br/> 分行分别测量，<img> 按其 width 计入"""
+        cell_min = cell_max = 0.0
+        for line in re.split(r'<br\s*/?>', xml_text):
+            img_ws = [float(w) for w in _IMG_WIDTH_RE.findall(line)]
+            img_w = sum(img_ws)
+            plain = html.unescape(_TAG_RE.sub('', line))
+            line_w = _text_width(plain, font_name, font_size) + img_w
+            if line_w > cell_max:
+                cell_max = line_w
+            for unit in _UNBREAKABLE_RE.findall(plain):
+                unit_w = _text_width(unit, font_name, font_size)
+                if unit_w > cell_min:
+                    cell_min = unit_w
+            if img_ws and max(img_ws) > cell_min:
+                cell_min = max(img_ws)
+        return cell_min, cell_max
+
     def _cell_style(self, base_name: str, aligns: List[Optional[str]], col_idx: int) -> ParagraphStyle:
         """根据列对齐方式返回适配的 ParagraphStyle（命中缓存或动态创建）"""
         align_str = aligns[col_idx] if col_idx < len(aligns) and aligns[col_idx] else "left"
@@ -1,7 +1,5 @@
 import re
 
-import emoji
-from bs4 import BeautifulSoup
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
 from reportlab.lib.styles import ParagraphStyle
@@ -99,8 +97,11 @@ class TextRenderer(BaseRenderer):
         if not text:
             return ""
 
-        # text = emoji.replace_emoji(text, replace=replace_to_twemoji)
-        text = emoji.replace_emoji(text, replace=replace_to_local_twemoji)
+        # emoji 包导入时要加载整张表情数据表；纯 ASCII 文本不可能含 emoji，不必加载
+        if not text.isascii():
+            import emoji
+            # text = emoji.replace_emoji(text, replace=replace_to_twemoji)
+            text = emoji.replace_emoji(text, replace=replace_to_local_twemoji)
 
         # --- [Step 1] 保护 <img /> 标签 ---
         protected_imgs = {}
@@ -113,6 +114,7 @@ class TextRenderer(BaseRenderer):
         text_safe = re.sub(r'<img[^>]+>', protect_match, text)
 
         # --- [Step 2] BS4 清洗 ---
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(text_safe, "html.parser")
 
         # 转换 span -> font
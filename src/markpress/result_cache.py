@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+from importlib import metadata
+from pathlib import Path
+
+import reportlab
+
+from .utils.metrics import record_cache
+from .utils.utils import get_theme_path
+
+# 与字体、字宽表缓存同属 ~/.markpress
+DEFAULT_CACHE_DIR = Path.home() / ".markpress" / "results"
+DEFAULT_MAX_MB = 512
+
+# 输出格式版本：排版或渲染逻辑改变了 PDF 内容时递增，让旧结果全部失效
+# （开发环境的包版本恒为 "dev"，只靠版本号无法区分代码改动）
+RESULT_FORMAT_VERSION = 1
+
+# [Global Cache]
+# Key: 主题名, Value: (主题 JSON 的 mtime_ns, 内容哈希)；主题文件被修改后按 mtime 重新计算
+_THEME_DIGESTS = {}
+
+try:
+    MARKPRESS_VERSION = metadata.version("markpress")
+except metadata.PackageNotFoundError:
+    MARKPRESS_VERSION = "dev"
+
+
+def _theme_digest(theme: str) -> bytes:
+    with get_theme_path(f"{theme}.json") as path:
+        mtime = os.stat(path).st_mtime_ns
+        cached = _THEME_DIGESTS.get(theme)
+        if cached is None or cached[0] != mtime:
+            cached = _THEME_DIGESTS[theme] = (mtime, hashlib.sha256(Path(path).read_bytes()).digest())
+    return cached[1]
+
+
+def result_key(markdown: bytes, images: list, theme: str, page_size: str, orientation: str,
+               preview_pages: int = 0) -> str:
+    """
+    转换结果的内容哈希：Markdown 原文、各图片的相对路径与内容、主题名与主题 JSON 内容、页面参数、预览页数、
+    输出格式版本与 MarkPress / ReportLab 版本。
+    images 为 [(相对路径片段列表, 文件内容)]，与上传顺序无关。
+    """
+    h = hashlib.sha256()
+
+    def feed(value):
+        data = value if isinstance(value, bytes) else str(value).encode("utf-8")
+        # 长度前缀，避免相邻字段拼接产生歧义
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+
+    for value in (RESULT_FORMAT_VERSION, MARKPRESS_VERSION, reportlab.Version, theme, _theme_digest(theme),
+                  page_size, orientation, preview_pages or 0, markdown):
+        feed(value)
+    for rel, digest in sorted(("/".join(parts), hashlib.sha256(data).digest()) for parts, data in images):
+        feed(rel)
+        feed(digest)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    磁盘上的 PDF 结果缓存，文件名即内容哈希；按文件修改时间做 LRU，总大小超过 max_bytes 时淘汰最久未用的结果。
+    多个进程可以共享同一目录：写入先落临时文件再原子替换。
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._size = sum(p.stat().st_size for p in self.root.glob("*.pdf"))
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.pdf"
+
+    def get(self, key: str):
+        """命中时返回 PDF 字节并刷新其 LRU 时间，否则返回 None"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            record_cache("pdf_result", hit=False)
+            return None
+        record_cache("pdf_result", hit=True)
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_bytes(data)
+            # 同一 key 可能已被并发的请求写过，覆盖时只计入大小差
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[Warn] 结果缓存写入失败 ({e})")
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for p in self.root.glob("*.pdf"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                self._size -= size
+            except OSError:
+                pass
@@ -1,125 +1,579 @@
-import json
-import os
-import tempfile
-from pathlib import Path
-
-from typing import List
-
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import HTMLResponse, Response
-
-from .converter import convert_markdown_file
-from .themes import StyleConfig
-from .utils.utils import get_theme_path
-
-app = FastAPI(title="MarkPress", docs_url=None, redoc_url=None)
-
-_AVAILABLE_THEMES = ["academic", "lark", "github", "vue"]
-_AVAILABLE_ORIENTATIONS = ["portrait", "landscape"]
-
-_THEME_META = {
-    "academic": {"label": "Academic", "description": "学术论文风格，黑白经典"},
-    "lark": {"label": "Lark", "description": "飞书文档风格，清爽简洁"},
-    "github": {"label": "GitHub", "description": "GitHub README 风格"},
-    "vue": {"label": "Vue", "description": "Vue 文档风格，绿色简约"},
-}
-
-
-def _build_config(theme: str, page_size: str, orientation: str) -> StyleConfig:
-    """加载主题 JSON 并覆盖 page_size 与 orientation，返回 StyleConfig 对象。"""
-    with get_theme_path(f"{theme}.json") as p:
-        with open(p, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-    if page_size and page_size != data["page"].get("size"):
-        data["page"]["size"] = page_size
-
-    if orientation and orientation in _AVAILABLE_ORIENTATIONS:
-        data["page"]["orientation"] = orientation
-
-    return StyleConfig.from_json_obj(data)
-
-
-@app.get("/", response_class=HTMLResponse)
-async def index():
-    html_path = Path(__file__).parent / "assets" / "web" / "index.html"
-    return HTMLResponse(content=html_path.read_text(encoding="utf-8"))
-
-
-@app.get("/api/themes")
-async def get_themes():
-    return {
-        "themes": [
-            {"id": t, **_THEME_META[t]}
-            for t in _AVAILABLE_THEMES
-        ],
-        "page_sizes": ["A4", "A3", "Letter"],
-        "orientations": [
-            {"id": "portrait", "label": "竖向", "description": "Portrait"},
-            {"id": "landscape", "label": "横向", "description": "Landscape"},
-        ],
-    }
-
-
-@app.post("/api/convert")
-def convert(
-    file: UploadFile = File(...),
-    theme: str = Form("academic"),
-    page_size: str = Form("A4"),
-    orientation: str = Form("portrait"),
-    images: List[UploadFile] = File(default=[]),
-):
-    """同步路由：FastAPI 对 def 路由自动在线程池中执行，
-    从而避免 Playwright Sync API 与 asyncio 事件循环的冲突。
-    images 中每个文件的 filename 字段携带 MD 内的完整相对路径（如 assets/fig1.png），
-    后端按此路径在临时目录中还原子目录结构。"""
-    if not file.filename.endswith(".md"):
-        raise HTTPException(status_code=400, detail="仅支持 .md 文件")
-    if theme not in _AVAILABLE_THEMES:
-        raise HTTPException(status_code=400, detail=f"未知主题: {theme}")
-
-    content = file.file.read()
-
-    with tempfile.TemporaryDirectory(prefix="markpress_web_") as tmp:
-        tmp_path = Path(tmp)
-        md_path = tmp_path / Path(file.filename).name
-        pdf_path = tmp_path / (Path(file.filename).stem + ".pdf")
-
-        md_path.write_bytes(content)
-
-        # img.filename 由前端设置为 MD 内的相对路径（如 "assets/fig1.png"）
-        # 过滤 ".." 防止路径穿越，自动创建所需子目录
-        for img in images:
-            if not img.filename:
-                continue
-            rel_parts = [p for p in img.filename.replace("\\", "/").split("/") if p and p != ".."]
-            img_dest = tmp_path.joinpath(*rel_parts)
-            img_dest.parent.mkdir(parents=True, exist_ok=True)
-            img_dest.write_bytes(img.file.read())
-            print(f"[MarkPress] 图片已保存: {img_dest.relative_to(tmp_path)}")
-
-        config = _build_config(theme, page_size, orientation)
-
-        try:
-            convert_markdown_file(str(md_path), str(pdf_path), theme=theme, config=config)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"转换失败: {e}")
-
-        if not pdf_path.exists():
-            raise HTTPException(status_code=500, detail="PDF 生成失败，文件不存在")
-
-        pdf_bytes = pdf_path.read_bytes()
-
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{Path(file.filename).stem}.pdf"'
-        },
-    )
-
-
-def serve(host: str = "127.0.0.1", port: int = 8080):
-    """由 CLI 调用，启动 uvicorn 服务。"""
-    import uvicorn
-    uvicorn.run(app, host=host, port=port)
+import asyncio
+import base64
+import binascii
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from typing import List
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
+
+from .converter import convert_markdown_bytes, convert_markdown_file
+from .result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, ResultCache, result_key
+from .admission import (DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_IMAGES_MB, DEFAULT_MAX_MARKDOWN_MB,
+                        DEFAULT_MAX_QUEUE as DEFAULT_ADMISSION_QUEUE, AdmissionController, AdmissionRejected)
+from .live import DEFAULT_MAX_SESSIONS, LiveSession
+from .jobs import DEFAULT_JOB_WORKERS, DEFAULT_MAX_QUEUE, DEFAULT_RESULT_TTL, JobManager, JobQueueFull
+from .themes import StyleConfig
+from .utils.metrics import REGISTRY, SIZE_BUCKETS
+from .utils.tracing import StageTotals, tracing
+from .utils.utils import get_theme_path, private_temp_dir
+from .utils.vfs import MemoryFS
+from .workers import DEFAULT_MAX_JOBS, DEFAULT_MAX_RSS_MB, WorkerPool
+
+app = FastAPI(title="MarkPress", docs_url=None, redoc_url=None)
+
+_AVAILABLE_THEMES = ["academic", "lark", "github", "vue"]
+_AVAILABLE_ORIENTATIONS = ["portrait", "landscape"]
+
+_THEME_META = {
+    "academic": {"label": "Academic", "description": "学术论文风格，黑白经典"},
+    "lark": {"label": "Lark", "description": "飞书文档风格，清爽简洁"},
+    "github": {"label": "GitHub", "description": "GitHub README 风格"},
+    "vue": {"label": "Vue", "description": "Vue 文档风格，绿色简约"},
+}
+
+# 异步任务管理器，首次使用时按 configure_jobs 的参数创建
+_JOB_SETTINGS = {"workers": DEFAULT_JOB_WORKERS, "max_queue": DEFAULT_MAX_QUEUE, "result_ttl": DEFAULT_RESULT_TTL}
+_job_manager = None
+_lazy_init_lock = threading.Lock()
+# 预热的转换进程池，serve(workers=N) 时创建；为空时在请求线程内直接转换
+_worker_pool = None
+# PDF 结果缓存，首次使用时按 configure_result_cache 的参数创建；max_mb 为 0 时关闭
+_CACHE_SETTINGS = {"root": DEFAULT_CACHE_DIR, "max_mb": DEFAULT_MAX_MB}
+_result_cache = None
+# /api/convert 的准入控制，首次使用时按 configure_admission 的参数创建
+_ADMISSION_SETTINGS = {
+    "max_concurrent": DEFAULT_MAX_CONCURRENT,
+    "max_queue": DEFAULT_ADMISSION_QUEUE,
+    "max_markdown_bytes": DEFAULT_MAX_MARKDOWN_MB * 1024 * 1024,
+    "max_image_bytes": DEFAULT_MAX_IMAGES_MB * 1024 * 1024,
+}
+_admission = None
+# multipart 边界与表单字段的额外开销，Content-Length 预检时放宽这么多
+_MULTIPART_OVERHEAD = 1024 * 1024
+# 上传文件分块读取的大小；内存模式下 /api/convert 不落盘：图片挂载为 MemoryFS，PDF 写入缓冲区
+_UPLOAD_CHUNK = 64 * 1024
+_UPLOAD_SETTINGS = {"in_memory": False}
+# 实时预览（/ws/live）会话数上限与当前会话数
+_LIVE_SETTINGS = {"max_sessions": DEFAULT_MAX_SESSIONS}
+_live_sessions = 0
+
+# ---------- 运行指标（/metrics） ----------
+_CONVERT_LATENCY = REGISTRY.histogram(
+    "markpress_conversion_duration_seconds", "End-to-end conversion latency of /api/convert")
+_STAGE_LATENCY = REGISTRY.histogram(
+    "markpress_conversion_stage_seconds", "Per-conversion self time spent in each pipeline stage", ("stage",))
+_IN_FLIGHT = REGISTRY.gauge(
+    "markpress_conversions_in_flight", "Conversions currently running")
+_QUEUED = REGISTRY.gauge(
+    "markpress_conversions_queued", "Convert requests received but not yet running (upload / waiting for a worker thread)")
+_PDF_SIZE = REGISTRY.histogram(
+    "markpress_pdf_output_bytes", "Size of generated PDFs", buckets=SIZE_BUCKETS)
+_CONVERSIONS = REGISTRY.counter(
+    "markpress_conversions_total", "Finished conversions by outcome", ("outcome",))
+_ERRORS = REGISTRY.counter(
+    "markpress_conversion_errors_total", "Failed conversions by exception type", ("exception",))
+
+
+def _build_config(theme: str, page_size: str, orientation: str) -> StyleConfig:
+    """加载主题 JSON 并覆盖 page_size 与 orientation，返回 StyleConfig 对象。"""
+    with get_theme_path(f"{theme}.json") as p:
+        with open(p, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    if page_size and page_size != data["page"].get("size"):
+        data["page"]["size"] = page_size
+
+    if orientation and orientation in _AVAILABLE_ORIENTATIONS:
+        data["page"]["orientation"] = orientation
+
+    return StyleConfig.from_json_obj(data)
+
+
+def configure_jobs(workers: int = None, max_queue: int = None, result_ttl: float = None):
+    """设置异步任务的工作线程数、排队上限与结果保留时长，需在第一个任务提交前调用"""
+    for key, value in (("workers", workers), ("max_queue", max_queue), ("result_ttl", result_ttl)):
+        if value is not None:
+            _JOB_SETTINGS[key] = value
+
+
+def configure_result_cache(root=None, max_mb: float = None):
+    """设置结果缓存目录与容量上限（MB，0 表示关闭），需在第一个请求之前调用"""
+    if root is not None:
+        _CACHE_SETTINGS["root"] = root
+    if max_mb is not None:
+        _CACHE_SETTINGS["max_mb"] = max_mb
+
+
+def configure_admission(max_concurrent: int = None, max_queue: int = None, max_markdown_mb: float = None,
+                        max_images_mb: float = None):
+    """设置并发成本上限、排队深度与上传体积上限，需在第一个请求之前调用"""
+    for key, value in (("max_concurrent", max_concurrent), ("max_queue", max_queue)):
+        if value is not None:
+            _ADMISSION_SETTINGS[key] = value
+    if max_markdown_mb is not None:
+        _ADMISSION_SETTINGS["max_markdown_bytes"] = int(max_markdown_mb * 1024 * 1024)
+    if max_images_mb is not None:
+        _ADMISSION_SETTINGS["max_image_bytes"] = int(max_images_mb * 1024 * 1024)
+
+
+def configure_uploads(in_memory: bool = None):
+    """设置 /api/convert 是否在内存中完成转换（不写临时目录），需在第一个请求之前调用"""
+    if in_memory is not None:
+        _UPLOAD_SETTINGS["in_memory"] = in_memory
+
+
+def configure_live(max_sessions: int = None):
+    """设置实时预览的会话数上限，0 表示关闭 /ws/live"""
+    if max_sessions is not None:
+        _LIVE_SETTINGS["max_sessions"] = max_sessions
+
+
+def _get_admission() -> AdmissionController:
+    global _admission
+    with _lazy_init_lock:
+        if _admission is None:
+            _admission = AdmissionController(**_ADMISSION_SETTINGS)
+        return _admission
+
+
+def _rejection_response(e: AdmissionRejected) -> HTTPException:
+    headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+    return HTTPException(status_code=e.status, detail=e.detail, headers=headers)
+
+
+def _read_upload(upload: UploadFile, check) -> bytes:
+    """分块读取上传文件，每读一块调用 check(已读字节数)，超限时立即停止，不必把整个文件读进内存"""
+    chunks, size = [], 0
+    while chunk := upload.file.read(_UPLOAD_CHUNK):
+        chunks.append(chunk)
+        size += len(chunk)
+        check(size)
+    return b"".join(chunks)
+
+
+def _read_uploads(file: UploadFile, images: list):
+    """读取 Markdown 与图片，返回 (content, [(相对路径片段列表, 文件内容)])；超出体积上限时抛出 413"""
+    admission = _get_admission()
+    try:
+        content = _read_upload(file, lambda n: admission.check_size(n, 0))
+        image_files, image_bytes = [], 0
+        # img.filename 由前端设置为 MD 内的相对路径（如 "assets/fig1.png"）
+        for img in images:
+            if not img.filename:
+                continue
+            data = _read_upload(img, lambda n: admission.check_size(len(content), image_bytes + n))
+            image_bytes += len(data)
+            image_files.append((_safe_rel_parts(img.filename), data))
+    except AdmissionRejected as e:
+        raise _rejection_response(e)
+    return content, image_files
+
+
+def _get_result_cache():
+    global _result_cache
+    with _lazy_init_lock:
+        if _result_cache is None and _CACHE_SETTINGS["max_mb"] > 0:
+            _result_cache = ResultCache(_CACHE_SETTINGS["root"], int(_CACHE_SETTINGS["max_mb"] * 1024 * 1024))
+        return _result_cache
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 使用弱比较：忽略 W/ 前缀，支持逗号分隔的多个值与 *"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag.removeprefix("W/") for t in tags)
+
+
+def _get_job_manager() -> JobManager:
+    global _job_manager
+    with _lazy_init_lock:
+        if _job_manager is None:
+            if _worker_pool is not None:
+                _job_manager = JobManager(**_JOB_SETTINGS, runner=_run_job_in_pool)
+            else:
+                _job_manager = JobManager(**_JOB_SETTINGS)
+            _job_manager.start()
+        return _job_manager
+
+
+def _run_job_in_pool(job, progress):
+    progress("convert", 0.05)
+    _run_conversion(job.md_path, job.result_path, job.theme, job.config)
+
+
+def _run_conversion(md_path: str, pdf_path: str, theme: str, config, preview_pages: int = None) -> dict:
+    """执行一次转换并返回 {阶段: 自身耗时}：有进程池时交给空闲的预热进程，否则在当前线程内转换"""
+    if _worker_pool is not None:
+        return _worker_pool.run(md_path, pdf_path, config, preview_pages=preview_pages)
+    # 只统计本线程的埋点，并发请求之间互不串扰
+    stages = StageTotals(threading.get_ident())
+    # 公式图片写入本次转换私有的临时目录，不会被并发的请求或异步任务清理
+    with tracing(stages), private_temp_dir():
+        convert_markdown_file(md_path, pdf_path, theme=theme, config=config, preview_pages=preview_pages)
+    return stages.totals
+
+
+def _safe_rel_parts(filename: str) -> list:
+    """前端上传的图片 filename 是 MD 内的相对路径，过滤 ".." 防止路径穿越"""
+    return [p for p in filename.replace("\\", "/").split("/") if p and p != ".."]
+
+
+def _validate_request(file: UploadFile, theme: str):
+    if not file.filename.endswith(".md"):
+        raise HTTPException(status_code=400, detail="仅支持 .md 文件")
+    if theme not in _AVAILABLE_THEMES:
+        raise HTTPException(status_code=400, detail=f"未知主题: {theme}")
+
+
+@app.middleware("http")
+async def _limit_body_size(request: Request, call_next):
+    """按 Content-Length 预检上传体积，明显超限的请求不必等整个表单解析完才拒绝"""
+    if request.method == "POST" and request.url.path in ("/api/convert", "/api/jobs"):
+        length = request.headers.get("content-length", "")
+        if length.isdigit():
+            try:
+                _get_admission().check_request_length(int(length), _MULTIPART_OVERHEAD)
+            except AdmissionRejected as e:
+                return JSONResponse(status_code=e.status, content={"detail": e.detail})
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def _track_queue(request: Request, call_next):
+    """请求进入后到真正开始转换之前（含准入控制的排队），都计为排队中"""
+    if request.url.path != "/api/convert":
+        return await call_next(request)
+    _QUEUED.inc()
+    request.state.queued = True
+    try:
+        return await call_next(request)
+    finally:
+        # 参数校验失败等情况下转换没有开始，在这里补减
+        if request.state.queued:
+            _QUEUED.dec()
+
+
+def _leave_queue(request: Request):
+    if getattr(request.state, "queued", False):
+        request.state.queued = False
+        _QUEUED.dec()
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/", response_class=HTMLResponse)
+async def index():
+    html_path = Path(__file__).parent / "assets" / "web" / "index.html"
+    return HTMLResponse(content=html_path.read_text(encoding="utf-8"))
+
+
+@app.get("/api/themes")
+async def get_themes():
+    return {
+        "themes": [
+            {"id": t, **_THEME_META[t]}
+            for t in _AVAILABLE_THEMES
+        ],
+        "page_sizes": ["A4", "A3", "Letter"],
+        "orientations": [
+            {"id": "portrait", "label": "竖向", "description": "Portrait"},
+            {"id": "landscape", "label": "横向", "description": "Landscape"},
+        ],
+    }
+
+
+def _convert_on_disk(filename: str, content: bytes, image_files: list, theme: str, config,
+                     preview_pages: int = None):
+    """在临时目录中还原上传内容并转换，返回 (PDF 字节或 None, {阶段: 自身耗时})"""
+    with tempfile.TemporaryDirectory(prefix="markpress_web_") as tmp:
+        tmp_path = Path(tmp)
+        md_path = tmp_path / Path(filename).name
+        pdf_path = tmp_path / (Path(filename).stem + ".pdf")
+
+        md_path.write_bytes(content)
+
+        # 按相对路径还原子目录结构（已过滤 ".." 防止路径穿越）
+        for rel_parts, data in image_files:
+            img_dest = tmp_path.joinpath(*rel_parts)
+            img_dest.parent.mkdir(parents=True, exist_ok=True)
+            img_dest.write_bytes(data)
+            print(f"[MarkPress] 图片已保存: {img_dest.relative_to(tmp_path)}")
+
+        stage_totals = _run_conversion(str(md_path), str(pdf_path), theme, config, preview_pages)
+        return (pdf_path.read_bytes() if pdf_path.exists() else None), stage_totals
+
+
+def _convert_in_memory(content: bytes, image_files: list, theme: str, config, preview_pages: int = None):
+    """图片挂载为 MemoryFS、PDF 写入缓冲区，返回 (PDF 字节, {阶段: 自身耗时})"""
+    files = MemoryFS()
+    for rel_parts, data in image_files:
+        files.add(rel_parts, data)
+    if _worker_pool is not None:
+        return _worker_pool.run_memory(content, files, config, preview_pages=preview_pages)
+    stages = StageTotals(threading.get_ident())
+    with tracing(stages), private_temp_dir():
+        pdf_bytes = convert_markdown_bytes(content, files, theme=theme, config=config, preview_pages=preview_pages)
+    return pdf_bytes, stages.totals
+
+
+def _convert_upload(filename: str, content: bytes, image_files: list, theme: str, config,
+                    preview_pages: int = None) -> bytes:
+    """转换上传内容，返回 PDF 字节；失败时抛出 HTTPException(500)"""
+    _IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        if _UPLOAD_SETTINGS["in_memory"]:
+            pdf_bytes, stage_totals = _convert_in_memory(content, image_files, theme, config, preview_pages)
+        else:
+            pdf_bytes, stage_totals = _convert_on_disk(filename, content, image_files, theme, config, preview_pages)
+    except Exception as e:
+        _CONVERSIONS.inc(outcome="error")
+        _ERRORS.inc(exception=getattr(e, "exc_name", type(e).__name__))
+        raise HTTPException(status_code=500, detail=f"转换失败: {e}")
+    finally:
+        _IN_FLIGHT.dec()
+
+    if not pdf_bytes:
+        _CONVERSIONS.inc(outcome="error")
+        _ERRORS.inc(exception="MissingOutput")
+        raise HTTPException(status_code=500, detail="PDF 生成失败，文件不存在")
+
+    _CONVERT_LATENCY.observe(time.perf_counter() - start)
+    for stage, seconds in stage_totals.items():
+        _STAGE_LATENCY.observe(seconds, stage=stage)
+    _PDF_SIZE.observe(len(pdf_bytes))
+    _CONVERSIONS.inc(outcome="success")
+    return pdf_bytes
+
+
+@app.post("/api/convert")
+def convert(
+    request: Request,
+    file: UploadFile = File(...),
+    theme: str = Form("academic"),
+    page_size: str = Form("A4"),
+    orientation: str = Form("portrait"),
+    preview_pages: int = Form(0),
+    images: List[UploadFile] = File(default=[]),
+):
+    """同步路由：FastAPI 对 def 路由自动在线程池中执行，
+    从而避免 Playwright Sync API 与 asyncio 事件循环的冲突。
+    images 中每个文件的 filename 字段携带 MD 内的完整相对路径（如 assets/fig1.png），
+    后端按此路径在临时目录（内存模式下为 MemoryFS）中还原子目录结构。
+    超出体积上限返回 413；并发已满且排队已满（或排队超时）返回 429 与 Retry-After。
+    preview_pages 大于 0 时只生成前 N 页的预览（inline 返回），之后的公式与图片都不会被处理。"""
+    _validate_request(file, theme)
+    if preview_pages < 0:
+        raise HTTPException(status_code=400, detail="preview_pages 不能为负数")
+    content, image_files = _read_uploads(file, images)
+
+    # 同样的输入总是得到同样的 PDF（仅创建时间等元数据不同），因此使用弱 ETag
+    key = result_key(content, image_files, theme, page_size, orientation, preview_pages)
+    etag = f'W/"{key}"'
+    stem = Path(file.filename).stem
+    headers = {
+        "Content-Disposition": (f'inline; filename="{stem}-preview.pdf"' if preview_pages
+                                else f'attachment; filename="{stem}.pdf"'),
+        "ETag": etag,
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cache = _get_result_cache()
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        return Response(content=cached, media_type="application/pdf", headers=headers)
+
+    config = _build_config(theme, page_size, orientation)
+    admission = _get_admission()
+    try:
+        # 预览只排前几页，工作量与文档长度基本无关，按最小成本计
+        cost = 1.0 if preview_pages else admission.estimate_cost(len(content), sum(len(d) for _, d in image_files))
+        with admission.admit(cost):
+            _leave_queue(request)
+            pdf_bytes = _convert_upload(file.filename, content, image_files, theme, config, preview_pages or None)
+    except AdmissionRejected as e:
+        raise _rejection_response(e)
+
+    if cache:
+        cache.put(key, pdf_bytes)
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+
+@app.websocket("/ws/live")
+async def live_preview(websocket: WebSocket):
+    """
+    实时预览：会话内常驻一个引擎，每次编辑只重新渲染改动过的顶层块。客户端发送 JSON 消息：
+      {"type": "image", "path": "assets/fig1.png", "data": "<base64>"}   添加 / 替换 Markdown 引用的图片
+      {"type": "render", "markdown": "...", "theme": "academic", "page_size": "A4", "orientation": "portrait"}
+    每次渲染回复一条 JSON（页数、内容变化的页码、复用 / 重新渲染的块数、耗时），紧接着一帧二进制 PDF；
+    出错时回复 {"type": "error", "detail": ...}。渲染期间连续到达的多次编辑只处理最后一次。
+    """
+    global _live_sessions
+    await websocket.accept()
+    with _lazy_init_lock:
+        full = _live_sessions >= _LIVE_SETTINGS["max_sessions"]
+        if not full:
+            _live_sessions += 1
+    if full:
+        # 1013: Try Again Later
+        await websocket.close(code=1013, reason="实时预览会话数已达上限")
+        return
+
+    session = LiveSession()
+    admission = _get_admission()
+    configs = {}
+    latest = None
+    wake = asyncio.Event()
+
+    # 持有图片上传结果的回报任务，避免任务对象在完成前被回收
+    reports = set()
+
+    async def report_image(put):
+        try:
+            await asyncio.wrap_future(put)
+        except AdmissionRejected as e:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+
+    async def receive():
+        nonlocal latest
+        while True:
+            try:
+                message = await websocket.receive_json()
+                if not isinstance(message, dict):
+                    raise ValueError("消息必须是 JSON 对象")
+                kind = message.get("type")
+                if kind == "image":
+                    data = base64.b64decode(message.get("data", ""), validate=True)
+                    # 总大小在会话线程里按替换后的图片集合检查，同一路径的重复上传不会累加
+                    put = session.put_image(_safe_rel_parts(message.get("path", "")), data,
+                                            check_total=lambda total: admission.check_size(0, total))
+                    report = asyncio.create_task(report_image(put))
+                    reports.add(report)
+                    report.add_done_callback(reports.discard)
+                elif kind == "render":
+                    if message.get("theme", "academic") not in _AVAILABLE_THEMES:
+                        raise ValueError(f"未知主题: {message.get('theme')}")
+                    admission.check_size(len(message.get("markdown", "").encode("utf-8")), 0)
+                    latest = message
+                    wake.set()
+                else:
+                    raise ValueError(f"未知消息类型: {kind}")
+            except (AdmissionRejected, ValueError, binascii.Error) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+
+    async def render():
+        nonlocal latest
+        while True:
+            await wake.wait()
+            wake.clear()
+            message, latest = latest, None
+            key = (message.get("theme", "academic"), message.get("page_size", "A4"),
+                   message.get("orientation", "portrait"))
+            if key not in configs:
+                configs[key] = _build_config(*key)
+            try:
+                result = await session.render(message.get("markdown", ""), configs[key])
+            except Exception as e:
+                print(f"[Warn] 实时预览渲染失败: {e}")
+                await websocket.send_json({"type": "error", "detail": f"渲染失败: {e}"})
+                continue
+            await websocket.send_json(result.to_dict())
+            await websocket.send_bytes(result.pdf)
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(render())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"[Warn] 实时预览会话异常结束: {type(error).__name__}: {error}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await session.close()
+        with _lazy_init_lock:
+            _live_sessions -= 1
+
+
+@app.post("/api/jobs", status_code=202)
+def submit_job(
+    file: UploadFile = File(...),
+    theme: str = Form("academic"),
+    page_size: str = Form("A4"),
+    orientation: str = Form("portrait"),
+    images: List[UploadFile] = File(default=[]),
+):
+    """异步转换：保存上传内容后立即返回任务 ID，转换由后台工作线程完成，不占用请求线程"""
+    _validate_request(file, theme)
+    config = _build_config(theme, page_size, orientation)
+    content, image_files = _read_uploads(file, images)
+
+    manager = _get_job_manager()
+    try:
+        job = manager.submit(file.filename, content, image_files, theme=theme, config=config)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "10"})
+
+    return {
+        **job.to_dict(),
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/result",
+    }
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = _get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return {**job.to_dict(), "queue_size": _get_job_manager().queue_size()}
+
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = _get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    if job.status == "failed":
+        return JSONResponse(status_code=500, content={"detail": f"转换失败: {job.error}"})
+    if job.status != "done":
+        return JSONResponse(status_code=409, content={"detail": "任务尚未完成", **job.to_dict()})
+    return FileResponse(job.result_path, media_type="application/pdf",
+                        filename=f"{Path(job.filename).stem}.pdf")
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, job_workers: int = None, job_queue: int = None,
+          job_ttl: float = None, workers: int = 0, worker_max_jobs: int = DEFAULT_MAX_JOBS,
+          worker_max_rss_mb: float = DEFAULT_MAX_RSS_MB, cache_dir: str = None, cache_mb: float = None,
+          max_concurrent: int = None, max_queue: int = None, max_markdown_mb: float = None,
+          max_images_mb: float = None, in_memory: bool = False, live_sessions: int = None):
+    """
+    由 CLI 调用，启动 uvicorn 服务。
+    workers > 0 时先启动并预热相应数量的转换进程（须在 uvicorn 创建线程之前 fork），所有转换都交给它们执行。
+    in_memory 为 True 时 /api/convert 全程不读写临时目录，上传与结果只在内存（及进程间管道）中流转。
+    """
+    global _worker_pool
+    configure_jobs(workers=job_workers, max_queue=job_queue, result_ttl=job_ttl)
+    configure_result_cache(root=cache_dir, max_mb=cache_mb)
+    configure_uploads(in_memory=in_memory)
+    configure_live(max_sessions=live_sessions)
+    # 有进程池时默认的并发上限与进程数一致，多出来的请求在准入处排队而不是堵在进程池上
+    configure_admission(max_concurrent=max_concurrent or workers or None, max_queue=max_queue,
+                        max_markdown_mb=max_markdown_mb, max_images_mb=max_images_mb)
+    if workers:
+        _worker_pool = WorkerPool(workers, max_jobs=worker_max_jobs, max_rss_mb=worker_max_rss_mb)
+        _worker_pool.start()
+    import uvicorn
+    uvicorn.run(app, host=host, port=port)
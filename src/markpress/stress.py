@@ -0,0 +1,210 @@
+import random
+from dataclasses import dataclass, replace
+
+_CJK_WORDS = (
+    "随机过程", "马尔可夫链", "平稳分布", "特征值", "注意力机制", "训练数据", "推理速度", "模型参数",
+    "排版引擎", "字体回退", "分页算法", "表格布局", "数学公式", "代码高亮", "引用块", "渲染管线",
+    "我们", "提出", "一种", "新的", "方法", "显著", "提升", "实验", "结果", "表明", "并且", "因此",
+)
+_LATIN_WORDS = (
+    "the", "model", "layout", "latency", "throughput", "token", "benchmark", "paragraph", "kernel",
+    "sparse", "attention", "gradient", "baseline", "ReportLab", "Markdown", "PDF", "scaling", "cache",
+    "https://example.com/docs", "O(n log n)", "v3.2", "GPU", "API", "x86_64",
+)
+_EMOJI = ("😀", "🚀", "✅", "📄", "🔥", "💡", "🎉", "⚠️", "📈", "🧪")
+_INLINE_FORMULAS = (
+    r"E=mc^2", r"\alpha + \beta = \gamma", r"\frac{a}{b}", r"\sqrt{x^2+y^2}", r"x_i^{(t)}",
+    r"\sum_{i=1}^{n} x_i", r"P(A \mid B)", r"\mathbb{E}[X]", r"\lambda_{\max}", r"O(n^2)",
+)
+_BLOCK_FORMULAS = (
+    r"\int_0^1 x^2 \, dx = \frac{1}{3}",
+    r"\mathrm{Attention}(Q, K, V) = \mathrm{softmax}\left(\frac{QK^T}{\sqrt{d_k}}\right) V",
+    r"f(x) = \begin{cases} x^2 & x > 0 \\ 0 & x \le 0 \end{cases}",
+    r"\begin{pmatrix} 1 & 2 \\ 3 & 4 \end{pmatrix} \begin{pmatrix} x \\ y \end{pmatrix}",
+    r"\lim_{n \to \infty} \left(1 + \frac{1}{n}\right)^n = e",
+)
+_CODE_LANGS = ("python", "javascript", "rust", "bash", "json")
+
+
+@dataclass(frozen=True)
+class StressSpec:
+    """压力文档参数，全部为数量；同一个 (spec, seed) 总是生成完全相同的文本"""
+    paragraphs: int = 200
+    # 每段的词数
+    paragraph_words: int = 80
+    # CJK 词语在正文中的占比，其余为拉丁词
+    cjk_ratio: float = 0.6
+    inline_formulas: int = 50
+    block_formulas: int = 20
+    code_blocks: int = 20
+    code_lines: int = 30
+    pipe_tables: int = 5
+    html_tables: int = 2
+    table_rows: int = 50
+    table_cols: int = 5
+    nested_lists: int = 5
+    nested_quotes: int = 5
+    nesting_depth: int = 4
+    # 每个正文词后插入 emoji 的概率
+    emoji_density: float = 0.02
+    # 每隔多少个段落开启一个新的一级标题
+    paragraphs_per_chapter: int = 40
+
+    def scaled(self, factor: float) -> "StressSpec":
+        """所有数量按 factor 等比放大（段落长度、代码行数、表格大小与嵌套深度保持不变）"""
+        def s(n):
+            return max(0, round(n * factor))
+        return replace(
+            self,
+            paragraphs=s(self.paragraphs), inline_formulas=s(self.inline_formulas),
+            block_formulas=s(self.block_formulas), code_blocks=s(self.code_blocks),
+            pipe_tables=s(self.pipe_tables), html_tables=s(self.html_tables),
+            nested_lists=s(self.nested_lists), nested_quotes=s(self.nested_quotes),
+        )
+
+
+class _Builder:
+    def __init__(self, spec: StressSpec, seed: int):
+        self.spec = spec
+        self.rng = random.Random(seed)
+
+    def words(self, n: int) -> str:
+        rng, spec = self.rng, self.spec
+        out = []
+        for _ in range(n):
+            if rng.random() < spec.cjk_ratio:
+                out.append(rng.choice(_CJK_WORDS))
+            else:
+                word = rng.choice(_LATIN_WORDS)
+                if rng.random() < 0.05:
+                    word = f"**{word}**"
+                elif rng.random() < 0.05:
+                    word = f"`{word}`"
+                out.append(word)
+            if rng.random() < spec.emoji_density:
+                out.append(rng.choice(_EMOJI))
+        return " ".join(out)
+
+    def paragraph(self, inline_formulas: int) -> str:
+        text = self.words(self.spec.paragraph_words)
+        for _ in range(inline_formulas):
+            pos = self.rng.randrange(len(text) + 1)
+            # 只在空格处插入，避免把 **粗体** 或 `代码` 切开
+            pos = text.find(" ", pos)
+            pos = len(text) if pos < 0 else pos
+            text = f"{text[:pos]} ${self.rng.choice(_INLINE_FORMULAS)}$ {text[pos:]}"
+        return text
+
+    def code_block(self) -> str:
+        lang = self.rng.choice(_CODE_LANGS)
+        lines = []
+        for i in range(self.spec.code_lines):
+            indent = "    " * self.rng.randrange(3)
+            if lang == "python":
+                lines.append(f"{indent}value_{i} = compute(x_{i}, factor={self.rng.randint(1, 99)})  # {self.words(3)}")
+            elif lang == "javascript":
+                lines.append(f"{indent}const v{i} = await fetch('/api/{i}').then(r => r.json()); // {self.words(2)}")
+            elif lang == "rust":
+                lines.append(f"{indent}let v{i}: Vec<u32> = (0..{self.rng.randint(2, 999)}).map(|x| x * 2).collect();")
+            elif lang == "bash":
+                lines.append(f"{indent}markpress convert input_{i}.md -o out_{i}.pdf --theme github")
+            else:
+                lines.append(f'{indent}"key_{i}": {{"value": {self.rng.random():.6f}, "tag": "{self.words(1)}"}},')
+        return f"```{lang}\n" + "\n".join(lines) + "\n```"
+
+    def pipe_table(self) -> str:
+        cols = self.spec.table_cols
+        rows = [
+            "| " + " | ".join(f"列 {c}" for c in range(cols)) + " |",
+            "|" + "|".join(self.rng.choice(("---", ":---", ":---:", "---:")) for _ in range(cols)) + "|",
+        ]
+        for _ in range(self.spec.table_rows):
+            cells = [self.words(self.rng.randint(1, 6)) if self.rng.random() < 0.7 else f"{self.rng.uniform(0, 1e4):.2f}"
+                     for _ in range(cols)]
+            rows.append("| " + " | ".join(cells) + " |")
+        return "\n".join(rows)
+
+    def html_table(self) -> str:
+        cols = self.spec.table_cols
+        out = ["<table>", "<tr>" + "".join(f"<th>H{c}</th>" for c in range(cols)) + "</tr>"]
+        for r in range(self.spec.table_rows):
+            style = ' style="background-color: #fff3cd"' if r % 7 == 0 else ""
+            out.append(f"<tr{style}>" + "".join(f"<td>{self.words(self.rng.randint(1, 4))}</td>" for _ in range(cols)) + "</tr>")
+        out.append("</table>")
+        return "\n".join(out)
+
+    def nested_list(self) -> str:
+        lines = []
+        ordered = self.rng.random() < 0.5
+
+        def emit(depth):
+            for i in range(self.rng.randint(2, 4)):
+                marker = f"{i + 1}." if ordered else "-"
+                lines.append("   " * depth + f"{marker} {self.words(self.rng.randint(3, 12))}")
+                if depth + 1 < self.spec.nesting_depth and self.rng.random() < 0.5:
+                    emit(depth + 1)
+
+        emit(0)
+        return "\n".join(lines)
+
+    def nested_quote(self) -> str:
+        lines = []
+        for depth in range(1, self.spec.nesting_depth + 1):
+            prefix = "> " * depth
+            lines.append(prefix + self.words(self.rng.randint(10, 30)))
+            lines.append(prefix.rstrip())
+        return "\n".join(lines)
+
+
+def generate_document(spec: StressSpec = StressSpec(), seed: int = 0) -> str:
+    """
+    生成参数化的 Markdown 压力文档。
+    除正文段落外的各类块按数量均匀撒在段落之间，章节以一级标题分隔、二级标题穿插其中，
+    方便流式构建、并行排版等按标题切分的功能在大文档上测试。
+    """
+    b = _Builder(spec, seed)
+    rng = b.rng
+
+    # 先决定每个非段落块跟在哪个段落后面，再按顺序拼接
+    slots = max(1, spec.paragraphs)
+    extras = [[] for _ in range(slots)]
+    for kind, count in (("block_formula", spec.block_formulas), ("code", spec.code_blocks),
+                        ("pipe_table", spec.pipe_tables), ("html_table", spec.html_tables),
+                        ("list", spec.nested_lists), ("quote", spec.nested_quotes)):
+        for _ in range(count):
+            extras[rng.randrange(slots)].append(kind)
+
+    inline_per_para = [0] * slots
+    for _ in range(spec.inline_formulas):
+        inline_per_para[rng.randrange(slots)] += 1
+
+    parts = [f"# 压力测试文档 (seed={seed})"]
+    chapter = 0
+    for i in range(slots):
+        if i and spec.paragraphs_per_chapter and i % spec.paragraphs_per_chapter == 0:
+            chapter += 1
+            parts.append(f"# 第 {chapter} 章 {b.words(3)}")
+        elif i % 8 == 0:
+            parts.append(f"## {i // 8}. {b.words(4)}")
+        if spec.paragraphs:
+            parts.append(b.paragraph(inline_per_para[i]))
+        for kind in extras[i]:
+            if kind == "block_formula":
+                parts.append(f"$$\n{rng.choice(_BLOCK_FORMULAS)}\n$$")
+            elif kind == "code":
+                parts.append(b.code_block())
+            elif kind == "pipe_table":
+                parts.append(b.pipe_table())
+            elif kind == "html_table":
+                parts.append(b.html_table())
+            elif kind == "list":
+                parts.append(b.nested_list())
+            elif kind == "quote":
+                parts.append(b.nested_quote())
+    return "\n\n".join(parts) + "\n"
+
+
+def write_document(path: str, spec: StressSpec = StressSpec(), seed: int = 0) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(generate_document(spec, seed))
+    return path
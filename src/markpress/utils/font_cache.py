@@ -0,0 +1,120 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from weakref import WeakKeyDictionary
+
+import reportlab
+from reportlab.pdfbase.ttfonts import TTFont
+
+from ..inherited.LazyTTFontFace import LazyTTFontFace
+from .metrics import record_cache
+from .tracing import traced
+
+# 解析结果磁盘缓存目录，与字体、字宽表缓存同属 ~/.markpress
+FONT_TABLE_CACHE_DIR = Path.home() / ".markpress" / "font-tables"
+
+# 缓存内容的结构版本：_dump 的格式或跳过/必需的属性变化时加一，旧条目在读取时删除重建
+FONT_TABLE_FORMAT_VERSION = 2
+
+# 不可序列化或不应缓存的属性：原始字节按需重新读取，_pdfScale 由 LazyTTFontFace 还原，state 按文档重建，
+# _pos 是解析时的读取游标，生成子集时会重新定位
+_FACE_SKIP = ("_ttf_data", "_pdfScale", "_pos")
+_FONT_SKIP = ("face", "state", "fontName")
+
+# 还原后测宽、生成子集、写入字体描述符必需的属性
+_FACE_REQUIRED = ("charToGlyph", "charWidths", "defaultWidth", "unitsPerEm", "numGlyphs", "glyphPos", "table",
+                  "name", "ascent", "descent", "bbox", "capHeight", "italicAngle", "stemV", "flags")
+_FONT_REQUIRED = ("encoding",)
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_path(font_path: str) -> Path:
+    """缓存文件名：字体文件内容哈希 + ReportLab 版本（解析结果的结构随 ReportLab 版本变化）"""
+    digest = hashlib.sha1(f"{_file_digest(font_path)}|{reportlab.Version}".encode("utf-8")).hexdigest()[:16]
+    return FONT_TABLE_CACHE_DIR / f"{Path(font_path).stem}-{digest}.pickle"
+
+
+def _dump(font: TTFont) -> bytes:
+    face_state = {k: v for k, v in font.face.__dict__.items() if k not in _FACE_SKIP}
+    font_state = {k: v for k, v in font.__dict__.items() if k not in _FONT_SKIP}
+    return pickle.dumps((FONT_TABLE_FORMAT_VERSION, font_state, face_state), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _validate(entry) -> tuple:
+    if not (isinstance(entry, tuple) and len(entry) == 3 and entry[0] == FONT_TABLE_FORMAT_VERSION):
+        version = entry[0] if isinstance(entry, tuple) and len(entry) == 3 else None
+        raise ValueError(f"格式版本 {version} 与当前版本 {FONT_TABLE_FORMAT_VERSION} 不符")
+    _, font_state, face_state = entry
+    if not (isinstance(font_state, dict) and isinstance(face_state, dict)):
+        raise ValueError("条目结构不符")
+    missing = [k for k in _FONT_REQUIRED if k not in font_state] + [k for k in _FACE_REQUIRED if k not in face_state]
+    if missing:
+        raise ValueError(f"缺少属性 {', '.join(missing)}")
+    unexpected = [k for k in _FACE_SKIP if k in face_state] + [k for k in _FONT_SKIP if k in font_state]
+    if unexpected:
+        raise ValueError(f"包含不应缓存的属性 {', '.join(unexpected)}")
+    if not (isinstance(face_state["charToGlyph"], dict) and isinstance(face_state["charWidths"], dict)):
+        raise ValueError("cmap / 字宽表类型不符")
+    return font_state, face_state
+
+
+def _restore(logical_name: str, font_path: str, blob: bytes) -> TTFont:
+    font_state, face_state = _validate(pickle.loads(blob))
+    face = LazyTTFontFace.__new__(LazyTTFontFace)
+    face.__dict__.update(face_state)
+    # 同一份内容的文件可能换了位置，原始字节以当前路径为准
+    face.filename = font_path
+    font = TTFont.__new__(TTFont)
+    font.__dict__.update(font_state)
+    font.fontName = logical_name
+    font.face = face
+    font.state = WeakKeyDictionary()
+    return font
+
+
+@traced("load_ttfont", "fonts")
+def load_ttfont(logical_name: str, font_path: str) -> TTFont:
+    """
+    等价于 TTFont(logical_name, font_path)：
+    命中磁盘缓存时直接还原解析结果，跳过整个 TrueType 文件的解析（大型中文字体需要数秒）；未命中时正常解析并写入缓存。
+    缓存条目损坏或与当前格式版本不符时告警、删除并重新解析。
+    """
+    font_path = str(font_path)
+    try:
+        path = _cache_path(font_path)
+    except OSError:
+        # 文件读不了，交给 TTFont 抛出原本的错误
+        return TTFont(logical_name, font_path)
+
+    if path.exists():
+        try:
+            font = _restore(logical_name, font_path, path.read_bytes())
+            record_cache("font_tables", hit=True)
+            return font
+        except Exception as e:
+            # 截断的文件、旧格式、跨版本无法反序列化的对象都按损坏处理
+            print(f"[Warn] 字体解析缓存 {path.name} 无效 ({type(e).__name__}: {e})，重新解析。")
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    record_cache("font_tables", hit=False)
+    font = TTFont(logical_name, font_path)
+    try:
+        FONT_TABLE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发进程读到半截文件
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(_dump(font))
+        os.replace(tmp, path)
+    except (OSError, pickle.PicklingError, AttributeError, TypeError) as e:
+        print(f"[Warn] 字体解析缓存写入失败 ({e})，仅本次使用。")
+    return font
@@ -65,9 +65,10 @@ import os
 import urllib.request
 from pathlib import Path
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 
-from markpress.utils.utils import get_font_path
+from markpress.utils.font_cache import load_ttfont
+from markpress.utils.metrics import record_cache
+from markpress.utils.utils import get_font_path, is_offline
 
 # 缓存锚点
 GLOBAL_FONT_CACHE = Path.home() / ".markpress" / "fonts"
@@ -100,6 +101,21 @@ FONT_FAMILIES = {
 # 家族污染黑名单：只要下载失败过一次，整个家族都会被打入冷宫
 FAILED_FAMILIES = set()
 
+# [Global Cache]
+# 进程级字体注册表，Key: 逻辑名, Value: 实际注册的字体文件路径
+# ReportLab 对已注册的 TTF 逻辑名再次 registerFont 不会生效，每次构造引擎都重新解析字体文件纯属浪费；
+# 已注册的逻辑名直接跳过，连同云端拉取、降级判断一起省掉
+REGISTERED_FONTS = {}
+
+
+def _is_registered(logical_name: str) -> bool:
+    return logical_name in REGISTERED_FONTS and logical_name in pdfmetrics.getRegisteredFontNames()
+
+
+def _register_ttf(logical_name: str, font_path):
+    pdfmetrics.registerFont(load_ttfont(logical_name, str(font_path)))
+    REGISTERED_FONTS[logical_name] = str(font_path)
+
 
 def get_family_name(font_filename: str) -> str:
     """根据文件名溯源其所属的家族"""
@@ -135,7 +151,7 @@ def execute_static_fallback(logical_name: str, original_filename: str, font_type
         with get_font_path(fallback_filename) as font_path:
             if Path(font_path).exists():
                 print(f"[MarkPress 降级] {original_filename} 已安全降级为静态资产 -> {fallback_filename}")
-                pdfmetrics.registerFont(TTFont(logical_name, str(font_path)))
+                _register_ttf(logical_name, font_path)
                 return
     except Exception as e:
         raise RuntimeError(f"渲染引擎崩溃：兜底资产 {fallback_filename} 加载失败 ({e})，请检查 assets 目录。")
@@ -147,6 +163,11 @@ def resolve_and_register_font(logical_name: str, font_filename: str, font_type:
     """
     核动力字体挂载管线：静态直读 -> 云端原子拉取 -> 静态强兜底
     """
+    if _is_registered(logical_name):
+        record_cache("font_registry", hit=True)
+        return
+    record_cache("font_registry", hit=False)
+
     family_name = get_family_name(font_filename)
 
     # [第零防线]：如果该字体所在的家族已经被污染，直接降级
@@ -160,7 +181,7 @@ def resolve_and_register_font(logical_name: str, font_filename: str, font_type:
         try:
             with get_font_path(font_filename) as font_path:
                 if Path(font_path).exists():
-                    pdfmetrics.registerFont(TTFont(logical_name, str(font_path)))
+                    _register_ttf(logical_name, font_path)
                     return
         except Exception:
             pass
@@ -178,6 +199,10 @@ def resolve_and_register_font(logical_name: str, font_filename: str, font_type:
         for member in family_members:
             cache_path = GLOBAL_FONT_CACHE / member
             if not cache_path.exists():
+                if is_offline():
+                    print(f"[Warn] 离线模式，不拉取云端字体 {member}")
+                    family_is_intact = False
+                    break
                 url = CLOUD_FONTS[member]
                 try:
                     print(f"[MarkPress 云端挂载] 正在拉取家族字体资产: {member} ...")
@@ -192,7 +217,7 @@ def resolve_and_register_font(logical_name: str, font_filename: str, font_type:
         # 家族完整无缺，正常注册目标字体
         if family_is_intact:
             cache_path = GLOBAL_FONT_CACHE / font_filename
-            pdfmetrics.registerFont(TTFont(logical_name, str(cache_path)))
+            _register_ttf(logical_name, cache_path)
             return
         else:
             # 家族破损，将其打入黑名单，防止后续渲染时同一个家族的代码继续尝试下载
@@ -0,0 +1,167 @@
+import hashlib
+import importlib.util
+import os
+from array import array
+from pathlib import Path
+
+import reportlab
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from .metrics import record_cache
+
+# numpy 随 matplotlib 一起安装，缺失时退化为纯 Python 查表；
+# 导入约需 0.1s，只探测是否存在，遇到第一段长文本时才真正导入
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+# 字宽表磁盘缓存目录，与字体缓存同属 ~/.markpress
+METRICS_CACHE_DIR = Path.home() / ".markpress" / "metrics"
+
+# 稠密表最多覆盖到的码位（含 CJK 扩展 B-F 平面），更大的码位按默认字宽计
+MAX_DENSE_CODEPOINT = 0x2FFFF
+
+# 短于该长度的文本直接逐字符查表，numpy 的调用开销反而更大
+VECTORIZE_MIN_LENGTH = 64
+
+# 磁盘字宽表的格式版本，计入缓存文件名；表的元素类型或布局变化时递增，旧文件自然失效
+METRICS_FORMAT_VERSION = 2
+
+# 字宽以 float64 存储，与 ReportLab 的 Python float 逐位一致
+_WIDTH_TYPECODE = 'd'
+
+# [Global Cache]
+# Key: 已注册的字体逻辑名, Value: (font, GlyphWidthTable)；表为 None 表示非 TTF 字体，直接用 ReportLab 测量
+# 同一逻辑名可能被重新注册为另一个字体文件（主题切换、降级兜底），因此连同 font 对象一起缓存用于校验
+_WIDTH_TABLES = {}
+
+
+class GlyphWidthTable:
+    """
+    单个 TTF 字体的稠密 码位 -> 字宽 表（单位：1/1000 em）。
+    ReportLab 的 TTF stringWidth 对每个字符做一次 dict.get，中文长段落很慢；
+    这里把 charWidths 展开成连续数组，长文本整串转成码位数组后用 numpy 向量化查表。
+    求和仍交给内置 sum，按与 ReportLab 相同的顺序累加，测量结果逐位一致。
+    """
+
+    def __init__(self, widths: array, default_width: float):
+        self.widths = widths
+        self.default_width = default_width
+        self._limit = len(widths)
+        self._lookup = widths.tolist()
+        self._np_widths = None
+
+    @classmethod
+    def from_face(cls, face) -> "GlyphWidthTable":
+        char_widths = face.charWidths
+        default_width = float(face.defaultWidth)
+        widths = array(_WIDTH_TYPECODE, [default_width]) * _dense_size(face)
+        size = len(widths)
+        for cp, w in char_widths.items():
+            if cp < size:
+                widths[cp] = w
+        return cls(widths, default_width)
+
+    def measure(self, text: str) -> float:
+        """返回 text 在 1pt 字号下的宽度 * 1000"""
+        if not text:
+            return 0.0
+        if HAS_NUMPY and len(text) >= VECTORIZE_MIN_LENGTH:
+            import numpy as np
+            if self._np_widths is None:
+                # 末尾追加一个默认字宽槽位，超出稠密表的码位统一 clamp 到这里
+                self._np_widths = np.append(np.frombuffer(self.widths, dtype=np.float64), self.default_width)
+            # surrogatepass：孤立代理项（如截断的 emoji）与 ord() 一样按其码位查表
+            cps = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+            return sum(self._np_widths[np.minimum(cps, self._limit)].tolist())
+        lookup, limit, dw = self._lookup, self._limit, self.default_width
+        try:
+            return sum(map(lookup.__getitem__, map(ord, text)))
+        except IndexError:
+            # 存在超出稠密表的码位（极少见），逐个兜底
+            return sum(lookup[cp] if cp < limit else dw for cp in map(ord, text))
+
+    def advances(self, text: str) -> list:
+        """逐字符字宽（1/1000 em），供按字形断行的算法使用"""
+        lookup, limit, dw = self._lookup, self._limit, self.default_width
+        try:
+            return list(map(lookup.__getitem__, map(ord, text)))
+        except IndexError:
+            return [lookup[cp] if cp < limit else dw for cp in map(ord, text)]
+
+
+def _dense_size(face) -> int:
+    """稠密表的槽位数：覆盖到字体的最大码位（不超过 MAX_DENSE_CODEPOINT）"""
+    return min(max(face.charWidths, default=0), MAX_DENSE_CODEPOINT) + 1
+
+
+def _cache_path(face) -> Path:
+    """磁盘缓存文件名：字体文件路径 + 大小 + 修改时间 + ReportLab 版本 + 表格式版本 的哈希"""
+    filename = str(getattr(face, "filename", "") or "")
+    try:
+        st = os.stat(filename)
+        stamp = f"{filename}|{st.st_size}|{st.st_mtime_ns}|{reportlab.Version}|{METRICS_FORMAT_VERSION}"
+    except OSError:
+        stamp = f"{filename}|{len(face.charWidths)}|{reportlab.Version}|{METRICS_FORMAT_VERSION}"
+    digest = hashlib.sha1(stamp.encode("utf-8")).hexdigest()[:16]
+    return METRICS_CACHE_DIR / f"{Path(filename).stem or 'font'}-{digest}.widths"
+
+
+def _load_or_build(face) -> GlyphWidthTable:
+    path = _cache_path(face)
+    default_width = float(face.defaultWidth)
+    if path.exists():
+        widths = array(_WIDTH_TYPECODE)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            data = b""
+        # 长度不符说明文件被截断或来自其他格式，丢弃后重建
+        if len(data) == _dense_size(face) * widths.itemsize:
+            widths.frombytes(data)
+            record_cache("glyph_metrics", hit=True)
+            return GlyphWidthTable(widths, default_width)
+        print(f"[Warn] 字宽表缓存 {path.name} 已损坏，重新生成。")
+
+    record_cache("glyph_metrics", hit=False)
+    table = GlyphWidthTable.from_face(face)
+    try:
+        METRICS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发进程读到半截文件
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(table.widths.tobytes())
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[Warn] 字宽表缓存写入失败 ({e})，仅使用内存表。")
+    return table
+
+
+def get_width_table(font_name: str):
+    """获取已注册字体的字宽表，非 TTF 字体返回 None"""
+    try:
+        font = pdfmetrics.getFont(font_name)
+    except KeyError:
+        return None
+    cached = _WIDTH_TABLES.get(font_name)
+    if cached is not None and cached[0] is font:
+        return cached[1]
+    table = _load_or_build(font.face) if isinstance(font, TTFont) else None
+    _WIDTH_TABLES[font_name] = (font, table)
+    return table
+
+
+def string_width(text: str, font_name: str, font_size: float) -> float:
+    """stringWidth 的快速替代，结果与 ReportLab 一致"""
+    table = get_width_table(font_name)
+    if table is None:
+        return pdfmetrics.stringWidth(text, font_name, font_size)
+    # 与 ReportLab 相同的乘法顺序：0.001 * size * sum
+    return 0.001 * font_size * table.measure(text)
+
+
+def char_widths(text: str, font_name: str, font_size: float) -> list:
+    """逐字符字宽（pt），等价于对每个字符分别调用 stringWidth"""
+    table = get_width_table(font_name)
+    if table is None:
+        return [pdfmetrics.stringWidth(ch, font_name, font_size) for ch in text]
+    scale = 0.001 * font_size
+    return [w * scale for w in table.advances(text)]
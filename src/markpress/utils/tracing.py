@@ -0,0 +1,145 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+# [Global Cache]
+# 已注册的埋点监听器。为空时 span()/traced() 只做一次列表判空，不取时间戳也不构造事件
+_LISTENERS = []
+
+
+@dataclass
+class Span:
+    """一次已结束的埋点区间，start 为 time.perf_counter() 的秒数"""
+    name: str
+    category: str
+    start: float
+    duration: float
+    thread_id: int
+    args: dict = field(default_factory=dict)
+
+
+def add_listener(callback):
+    """注册监听器：每个区间结束时以 Span 为参数回调（可能来自任意线程）"""
+    _LISTENERS.append(callback)
+
+
+def remove_listener(callback):
+    try:
+        _LISTENERS.remove(callback)
+    except ValueError:
+        pass
+
+
+@contextlib.contextmanager
+def tracing(callback):
+    """在 with 块内临时注册监听器"""
+    add_listener(callback)
+    try:
+        yield callback
+    finally:
+        remove_listener(callback)
+
+
+def _emit(span: Span):
+    for callback in list(_LISTENERS):
+        try:
+            callback(span)
+        except Exception as e:
+            print(f"[Warn] 埋点监听器异常: {e}")
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "markpress", **args):
+    """记录一段代码的耗时；没有监听器时几乎零开销"""
+    if not _LISTENERS:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _emit(Span(name, category, start, time.perf_counter() - start, threading.get_ident(), args))
+
+
+def traced(name: str, category: str = "markpress"):
+    """函数装饰器版本的 span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _LISTENERS:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _emit(Span(name, category, start, time.perf_counter() - start, threading.get_ident()))
+
+        return wrapper
+
+    return decorator
+
+
+class ChromeTraceRecorder:
+    """
+    收集 Span 并导出为 Chrome Trace Event 格式（chrome://tracing、Perfetto 均可打开）。
+    用法：with tracing(recorder): ...; recorder.save("out.json")
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        event = {
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            # Trace Event 的时间单位是微秒
+            "ts": (span.start - self.origin) * 1e6,
+            "dur": span.duration * 1e6,
+            "pid": os.getpid(),
+            "tid": span.thread_id,
+        }
+        if span.args:
+            event["args"] = {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in span.args.items()}
+        with self._lock:
+            self.events.append(event)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["ts"])
+        meta = {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "markpress"}}
+        return {"traceEvents": [meta] + events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+
+class StageTotals:
+    """
+    按 category 汇总"自身耗时"：子区间的时间从外层区间中扣除，各阶段相加不会超过总耗时。
+    区间按结束顺序到达，子区间总是先于父区间结束，因此用一个待认领列表即可还原嵌套关系。
+    thread_id 不为空时只统计该线程的区间（服务端多个请求并发转换时互不干扰）。
+    """
+
+    def __init__(self, thread_id: int = None):
+        self.thread_id = thread_id
+        self.totals = {}
+        # [(start, duration)]，尚未被外层区间认领的已结束区间
+        self._pending = []
+
+    def __call__(self, span: Span):
+        if self.thread_id is not None and span.thread_id != self.thread_id:
+            return
+        self_time = span.duration
+        while self._pending and self._pending[-1][0] >= span.start:
+            self_time -= self._pending.pop()[1]
+        self._pending.append((span.start, span.duration))
+        self.totals[span.category] = self.totals.get(span.category, 0.0) + max(0.0, self_time)
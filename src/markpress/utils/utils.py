@@ -1,13 +1,45 @@
 import importlib.resources
 import os
 import re
+import shutil
 import tempfile
+import threading
 from contextlib import contextmanager
 
-from bs4 import BeautifulSoup, Tag, Comment
 
 APP_TMP = os.path.join(tempfile.gettempdir(), "markpress")
 
+# 当前线程的临时文件作用域：(目录, 已创建文件列表)，为 None 时写入 APP_TMP
+_TEMP_SCOPE = threading.local()
+
+
+def is_offline() -> bool:
+    """设置环境变量 MARKPRESS_OFFLINE=1 后禁止一切网络访问：在线图片、SVG 徽章、云端字体都直接走降级分支"""
+    return os.environ.get("MARKPRESS_OFFLINE") == "1"
+
+
+@contextmanager
+def offline_mode(offline: bool = None):
+    """
+    在 with 块内按 offline 设置 MARKPRESS_OFFLINE，退出时恢复原值（常驻进程按调用方的设置执行单次转换）；
+    offline 为 None 时保持当前环境不变。
+    """
+    if offline is None:
+        yield
+        return
+    previous = os.environ.get("MARKPRESS_OFFLINE")
+    if offline:
+        os.environ["MARKPRESS_OFFLINE"] = "1"
+    else:
+        os.environ.pop("MARKPRESS_OFFLINE", None)
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("MARKPRESS_OFFLINE", None)
+        else:
+            os.environ["MARKPRESS_OFFLINE"] = previous
+
 @contextmanager
 def get_font_path(filename: str):
     """获取 assets/fonts 下文件的绝对路径。"""
@@ -47,7 +79,51 @@ def get_twemoji_path():
         yield str(path)
 
 
+@contextmanager
+def temp_file_scope(directory: str):
+    """
+    作用域内（当前线程）由 new_temp_file 创建的临时文件写入 directory 而不是共享的 APP_TMP，
+    yield 的列表收集这些文件的路径。增量缓存用它把缓存块引用的图片放进私有目录，不会被其他转换清理。
+    """
+    previous = getattr(_TEMP_SCOPE, "value", None)
+    created = []
+    _TEMP_SCOPE.value = (directory, created)
+    try:
+        yield created
+    finally:
+        _TEMP_SCOPE.value = previous
+
+
+@contextmanager
+def private_temp_dir(prefix: str = "conv-"):
+    """
+    为一次转换创建 APP_TMP 下的私有子目录并进入 temp_file_scope，结束后整体删除。
+    同一进程里并发的转换（服务端请求、异步任务）各用各的目录，互相清理不到对方仍在引用的图片。
+    """
+    os.makedirs(APP_TMP, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix=prefix, dir=APP_TMP)
+    try:
+        with temp_file_scope(directory):
+            yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def new_temp_file(suffix: str = ".png") -> tuple:
+    """创建临时文件并返回 (fd, path)；默认位于 APP_TMP，处于 temp_file_scope 中时位于作用域目录"""
+    scope = getattr(_TEMP_SCOPE, "value", None)
+    if scope is None:
+        return tempfile.mkstemp(suffix=suffix, dir=APP_TMP)
+    directory, created = scope
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    created.append(path)
+    return fd, path
+
+
 def clear_temp_files():
+    # 处于临时文件作用域时，本次转换的文件由作用域负责清理，共享目录里的文件属于其他转换
+    if getattr(_TEMP_SCOPE, "value", None) is not None:
+        return
     print(f"清理临时文件夹：{APP_TMP}")
     for f in os.listdir(APP_TMP):
         if f.startswith("tmp") and f.endswith(".png"):
@@ -133,6 +209,7 @@ def optimize_ast_html_blocks(tokens: list) -> list:
             return
 
         merged_html = "".join(html_buffer)
+        from bs4 import BeautifulSoup, Comment, Tag
 
         # 核心逻辑：利用 BS4 的容错解析能力，把字符串还原为严格的 DOM 树
         soup = BeautifulSoup(merged_html, 'html.parser')
@@ -0,0 +1,41 @@
+import io
+import os
+
+# 虚拟根目录：作为内存转换时的 base_dir，Markdown 中的相对路径会被拼接到它下面
+MEMORY_ROOT = os.path.abspath(os.sep + "markpress-memory")
+
+
+class MemoryFS:
+    """
+    只读的内存文件映射，供 Web 转换在不落盘的情况下解析 Markdown 中的相对图片路径。
+    路径统一规范化为 root 下的绝对路径；引擎挂载 MemoryFS 后，本地图片只从这里读取，不再访问磁盘。
+    """
+
+    def __init__(self, root: str = MEMORY_ROOT):
+        self.root = root
+        self._files = {}
+
+    def _key(self, path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    def add(self, rel_parts: list, data: bytes):
+        """rel_parts 为已过滤 ".." 的相对路径片段，如 ["assets", "fig1.png"]"""
+        self._files[self._key(os.path.join(self.root, *rel_parts))] = data
+
+    def read(self, path: str):
+        """返回文件内容，不存在时返回 None"""
+        return self._files.get(self._key(path))
+
+    def open(self, path: str):
+        data = self.read(path)
+        return io.BytesIO(data) if data is not None else None
+
+    def __contains__(self, path: str) -> bool:
+        return self._key(path) in self._files
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(len(data) for data in self._files.values())
@@ -0,0 +1,141 @@
+import os
+import re
+import time
+
+from .converter import parse_markdown, render_document
+from .core import MarkPressEngine
+from .incremental import BlockCache
+
+# 轮询文件修改时间的间隔（秒），不依赖 watchdog 等额外的文件系统监听库
+POLL_INTERVAL = 0.3
+# 最后一次改动后静默多久才触发重建，编辑器保存时常见的"写临时文件 + 重命名"会被合并为一次
+DEBOUNCE_SECONDS = 0.5
+
+_HTML_IMG_SRC_RE = re.compile(r'<img\s[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+
+def collect_local_images(tokens: list, base_dir: str) -> set:
+    """收集 AST 中引用的本地图片（Markdown 图片语法与 HTML <img>），在线图片不监听"""
+    paths = set()
+
+    def add(src):
+        if not src or src.startswith(('http://', 'https://', 'data:')):
+            return
+        paths.add(os.path.normpath(src if os.path.isabs(src) else os.path.join(base_dir, src)))
+
+    def walk(nodes):
+        for token in nodes:
+            if token.get('type') == 'image':
+                add(token.get('attrs', {}).get('url', ''))
+            raw = token.get('raw')
+            if isinstance(raw, str) and '<img' in raw:
+                for src in _HTML_IMG_SRC_RE.findall(raw):
+                    add(src)
+            children = token.get('children')
+            if isinstance(children, list):
+                walk(children)
+
+    walk(tokens)
+    return paths
+
+
+def _mtime(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _fmt_seconds(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+class Watcher:
+    """
+    常驻的预览构建器：
+    字体、样式表、KaTeX 浏览器随引擎只初始化一次，顶层块的 Flowable 通过 BlockCache 跨次复用；
+    监听 Markdown 文件及其引用的本地图片，一串连续改动只触发一次重建，并打印各阶段耗时。
+    """
+
+    def __init__(self, input_path: str, output_path: str, theme: str = "academic", config=None):
+        self.input_path = os.path.abspath(input_path)
+        self.output_path = output_path
+        self.base_dir = os.path.dirname(self.input_path)
+        self.block_cache = BlockCache()
+        # 引擎只创建一次，之后每次重建只 reset 文档状态
+        self.engine = MarkPressEngine(output_path, theme, config=config)
+        self._images = set()
+        self._mtimes = {}
+
+    def _snapshot(self) -> dict:
+        return {path: _mtime(path) for path in {self.input_path} | self._images}
+
+    def rebuild(self) -> bool:
+        timings = []
+        start = stage = time.perf_counter()
+
+        def lap(name):
+            nonlocal stage
+            now = time.perf_counter()
+            timings.append((name, now - stage))
+            stage = now
+
+        try:
+            with open(self.input_path, "r", encoding="utf-8") as f:
+                text = f.read()
+            lap("读取")
+            ast = parse_markdown(text)
+            self._images = collect_local_images(ast, self.base_dir)
+            lap("解析")
+
+            self.engine.reset(self.output_path)
+            render_document(self.engine, ast, self.base_dir, block_cache=self.block_cache)
+            lap("渲染")
+            self.engine.save_pdf()
+            lap("排版")
+        except Exception as e:
+            print(f"[Warn] 重建失败: {e}")
+            return False
+        finally:
+            # 记录本次构建所读取的版本，构建期间的新改动会在下一轮被发现
+            self._mtimes = self._snapshot()
+
+        detail = " | ".join(f"{name} {_fmt_seconds(t)}" for name, t in timings)
+        print(f"[MarkPress] 重建完成 ({_fmt_seconds(time.perf_counter() - start)}): {detail}")
+        return True
+
+    def _wait_for_change(self) -> set:
+        """阻塞直到监听的文件发生变化，并在改动停止 DEBOUNCE_SECONDS 后返回变化的文件"""
+        changed = set()
+        last_change = None
+        while True:
+            time.sleep(POLL_INTERVAL)
+            current = self._snapshot()
+            diff = {path for path, mtime in current.items() if self._mtimes.get(path) != mtime}
+            if diff:
+                changed |= diff
+                last_change = time.monotonic()
+                self._mtimes = current
+            elif last_change is not None and time.monotonic() - last_change >= DEBOUNCE_SECONDS:
+                return changed
+
+    def run(self):
+        print(f"[MarkPress] 正在监听: {self.input_path} -> {self.output_path} (Ctrl+C 退出)")
+        try:
+            self.rebuild()
+            while True:
+                changed = self._wait_for_change()
+                names = ", ".join(sorted(os.path.basename(p) for p in changed))
+                print(f"[MarkPress] 检测到改动: {names}")
+                if changed - {self.input_path}:
+                    # 图片内容变了但 Markdown 没变，块哈希无法感知，整体失效
+                    self.block_cache.clear()
+                self.rebuild()
+        except KeyboardInterrupt:
+            print("\n[MarkPress] 停止监听")
+        finally:
+            self.close()
+
+    def close(self):
+        self.block_cache.close()
+        self.engine.close_katex_render()
@@ -0,0 +1,295 @@
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+
+from .utils.metrics import REGISTRY
+from .utils.utils import APP_TMP, clear_temp_files, offline_mode
+
+# 每个工作进程处理多少个任务后回收重建（Matplotlib / Chromium 的内存会随时间累积）
+DEFAULT_MAX_JOBS = 200
+# 工作进程常驻内存超过该值（MB）后回收；不含 Chromium 子进程
+DEFAULT_MAX_RSS_MB = 1024
+# 启动时预热的主题：字体注册、样式编译都在进程内完成。只预热默认主题，
+# lark / vue 需要拉取云端字体，放到第一次使用时再注册，离线或网络异常时不会拖垮进程启动
+WARM_THEMES = ("academic",)
+# 单次转换时按需导入的依赖，常驻进程在预热阶段一并导入，第一个任务不必承担导入开销
+WARM_MODULES = ("bs4", "emoji", "numpy", "pygments.lexers", "matplotlib.pyplot")
+# 工作进程的启动方式：进程池由已经在跑 uvicorn / 守护进程线程的进程拉起（含回收后的替补），
+# fork 会把其他线程持有的锁原样复制进子进程，可能死锁；spawn 从干净的解释器启动，状态全部由预热重建
+DEFAULT_START_METHOD = "spawn"
+
+_RECYCLES = REGISTRY.counter(
+    "markpress_worker_recycles_total", "Worker processes recycled, by reason", ("reason",))
+_IDLE = REGISTRY.gauge("markpress_workers_idle", "Warm worker processes waiting for a job")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class WorkerCrashed(RuntimeError):
+    """工作进程在预热或任务执行中意外退出"""
+
+
+class ConversionFailed(RuntimeError):
+    """工作进程内转换抛出的异常，exc_name 为原始异常类型名，detail 为工作进程内的堆栈追踪"""
+
+    def __init__(self, exc_name: str, message: str, detail: str = None):
+        super().__init__(f"{exc_name}: {message}")
+        self.exc_name = exc_name
+        self.detail = detail
+
+
+def _rss_mb() -> float:
+    """当前进程常驻内存（MB）；Linux 读 /proc，其他平台退化为 ru_maxrss 峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为 KB
+        return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+    except (ImportError, AttributeError):
+        return 0.0
+
+
+def _worker_main(conn, warm_themes):
+    """
+    工作进程：启动即创建引擎（字体、样式表、KaTeX 页面），并预先编译 warm_themes 中的主题，
+    之后循环接收 ("file", md_path, pdf_path, config, preview_pages, offline)
+    或 ("memory", markdown, files, config, preview_pages, offline) 执行转换，
+    返回各阶段耗时与当前内存；内存转换时 PDF 字节随结果一并返回。
+    offline 不为 None 时本次转换按它设置离线模式，否则沿用进程自身的环境变量。
+    """
+    import io
+
+    from .converter import parse_markdown, render_document
+    from .core import MarkPressEngine
+    from .themes import StyleConfig
+    from .utils.tracing import StageTotals, tracing
+
+    for module in WARM_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    os.makedirs(APP_TMP, exist_ok=True)
+    warmup_pdf = os.path.join(APP_TMP, f"warmup-{os.getpid()}.pdf")
+    engine = None
+    try:
+        # 单个主题预热失败（如云端字体拉取失败）只跳过该主题，第一次用到时再按需注册
+        for theme in warm_themes:
+            try:
+                config = StyleConfig.get_pre_build_style(theme)
+                if engine is None:
+                    engine = MarkPressEngine(warmup_pdf, config=config)
+                    # 临时目录被所有工作进程共享，由 WorkerPool 在全部空闲时统一清理
+                    engine.clear_temp_on_save = False
+                else:
+                    engine.reset(warmup_pdf, config=config)
+            except Exception as e:
+                print(f"[Warn] 工作进程预热主题 {theme} 失败: {e}")
+        if engine is None:
+            raise RuntimeError(f"所有预热主题均失败: {', '.join(warm_themes)}")
+        # 单次转换时浏览器按需启动，常驻进程则在预热阶段一并启动
+        engine.katex_renderer.ensure_browser()
+    except Exception as e:
+        conn.send(("error", type(e).__name__, str(e)))
+        if engine is not None:
+            engine.close_katex_render()
+        return
+    conn.send(("ready", os.getpid(), _rss_mb()))
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            kind, source, target, config, preview_pages, offline = message
+            stages = StageTotals()
+            start = time.perf_counter()
+            try:
+                with tracing(stages), offline_mode(offline):
+                    if kind == "memory":
+                        text, buffer = source.decode("utf-8"), io.BytesIO()
+                        engine.reset(buffer, config=config, preview_pages=preview_pages)
+                        engine.vfs, base_dir = target, target.root
+                    else:
+                        with open(source, "r", encoding="utf-8") as f:
+                            text = f.read()
+                        buffer = None
+                        engine.reset(target, config=config, preview_pages=preview_pages)
+                        base_dir = os.path.dirname(os.path.abspath(source))
+                    ast = parse_markdown(text)
+                    render_document(engine, ast, base_dir)
+                    engine.save_pdf()
+                pdf = buffer.getvalue() if buffer is not None else None
+                conn.send(("ok", stages.totals, time.perf_counter() - start, _rss_mb(), pdf))
+            except Exception as e:
+                conn.send(("error", type(e).__name__, str(e), _rss_mb(), traceback.format_exc()))
+    finally:
+        engine.close_katex_render()
+
+
+class _Worker:
+    def __init__(self, ctx, warm_themes):
+        parent, child = ctx.Pipe()
+        self.conn = parent
+        self.process = ctx.Process(target=_worker_main, args=(child, warm_themes), daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = 0
+        self.rss_mb = 0.0
+
+    def wait_ready(self, timeout: float = None):
+        if not self.conn.poll(timeout):
+            raise TimeoutError("工作进程预热超时")
+        try:
+            reply = self.conn.recv()
+        except EOFError:
+            # 进程在发出就绪消息前就退出了（段错误、被 OOM killer 杀掉等）
+            self.process.join(timeout=5)
+            raise WorkerCrashed(f"工作进程在预热阶段退出 (exit code {self.process.exitcode})")
+        if reply[0] == "error":
+            raise WorkerCrashed(f"工作进程预热失败: {reply[1]}: {reply[2]}")
+        status, pid, rss = reply
+        self.rss_mb = rss
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    预先启动并预热的转换进程池：请求分派给空闲进程，进程内的引擎、字体、主题和 KaTeX 页面在任务间复用，
+    处理满 max_jobs 个任务或常驻内存超过 max_rss_mb 后回收，并在后台拉起一个新的预热进程替补。
+    run() 会阻塞调用线程直到有空闲进程并完成转换，供服务端的请求线程 / 任务线程直接调用。
+    """
+
+    def __init__(self, size: int = None, max_jobs: int = DEFAULT_MAX_JOBS, max_rss_mb: float = DEFAULT_MAX_RSS_MB,
+                 warm_themes: tuple = WARM_THEMES, start_method: str = DEFAULT_START_METHOD):
+        self.size = max(1, size or os.cpu_count() or 1)
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.warm_themes = tuple(warm_themes)
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._closed = False
+
+    def start(self, wait: bool = True):
+        workers = [_Worker(self._ctx, self.warm_themes) for _ in range(self.size)]
+        for i, worker in enumerate(workers):
+            if wait:
+                try:
+                    worker.wait_ready()
+                except Exception:
+                    # 已就绪的进程在 _idle 里，由调用方的 close() 回收；其余的在这里停掉
+                    for pending in workers[i:]:
+                        pending.stop()
+                    raise
+                self._release(worker)
+            else:
+                threading.Thread(target=self._ready_then_release, args=(worker,), daemon=True).start()
+        print(f"[MarkPress] 已启动 {self.size} 个转换进程")
+
+    def _ready_then_release(self, worker: _Worker):
+        try:
+            worker.wait_ready()
+        except Exception as e:
+            print(f"[Warn] {e}")
+            worker.stop()
+            time.sleep(1)
+            self._spawn()
+            return
+        self._release(worker)
+
+    def _spawn(self):
+        if not self._closed:
+            threading.Thread(target=self._ready_then_release, args=(_Worker(self._ctx, self.warm_themes),),
+                             daemon=True).start()
+
+    def _release(self, worker: _Worker):
+        if self._closed:
+            worker.stop()
+            return
+        _IDLE.inc()
+        self._idle.put(worker)
+
+    def _recycle(self, worker: _Worker, reason: str):
+        _RECYCLES.inc(reason=reason)
+        worker.stop()
+        self._spawn()
+
+    def run(self, md_path: str, pdf_path: str, config, timeout: float = None, preview_pages: int = None,
+            offline: bool = None) -> dict:
+        """
+        在空闲进程中转换，返回 {阶段: 自身耗时}；转换失败时抛出 ConversionFailed。
+        offline 为 None 时沿用工作进程的 MARKPRESS_OFFLINE，否则只对本次转换生效。
+        """
+        return self._dispatch(("file", md_path, pdf_path, config, preview_pages, offline), timeout)[1]
+
+    def run_memory(self, markdown: bytes, files, config, timeout: float = None, preview_pages: int = None):
+        """内存转换：Markdown 与图片（MemoryFS）经管道发给空闲进程，返回 (PDF 字节, {阶段: 自身耗时})"""
+        reply = self._dispatch(("memory", markdown, files, config, preview_pages, None), timeout)
+        return reply[4], reply[1]
+
+    def _dispatch(self, message: tuple, timeout: float = None) -> tuple:
+        worker = self._idle.get(timeout=timeout)
+        _IDLE.dec()
+        with self._lock:
+            self._busy += 1
+        try:
+            try:
+                worker.conn.send(message)
+                reply = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                self._recycle(worker, "crash")
+                raise WorkerCrashed(f"工作进程意外退出 (exit code {worker.process.exitcode})") from e
+
+            worker.jobs += 1
+            worker.rss_mb = reply[3]
+            if worker.jobs >= self.max_jobs:
+                self._recycle(worker, "jobs")
+            elif self.max_rss_mb and worker.rss_mb > self.max_rss_mb:
+                self._recycle(worker, "rss")
+            else:
+                self._release(worker)
+
+            if reply[0] == "error":
+                _, exc_name, message, _, detail = reply
+                raise ConversionFailed(exc_name, message, detail)
+            return reply
+        finally:
+            with self._lock:
+                self._busy -= 1
+                # 行内公式图片只在没有任何进程在转换时清理
+                if self._busy == 0:
+                    clear_temp_files()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            _IDLE.dec()
+            worker.stop()
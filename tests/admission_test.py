@@ -0,0 +1,99 @@
+"""
+准入控制回归测试：名额占满时后来的请求排队等待，队列已满或排队超时返回 429 与 Retry-After。
+运行：
+    python -m pytest tests/admission_test.py
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from markpress import server
+from markpress.admission import AdmissionController, AdmissionRejected
+
+
+def _hold(controller: AdmissionController, cost: float = 1.0):
+    """在后台线程里占用 cost 个单位，直到返回的 release 事件被 set"""
+    admitted, release = threading.Event(), threading.Event()
+
+    def run():
+        with controller.admit(cost):
+            admitted.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert admitted.wait(5)
+    return release, thread
+
+
+def test_full_capacity_blocks_next_request():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait=5)
+    release, holder = _hold(controller)
+
+    entered = threading.Event()
+
+    def second():
+        with controller.admit(1.0):
+            entered.set()
+
+    waiter = threading.Thread(target=second, daemon=True)
+    waiter.start()
+    assert not entered.wait(0.2)
+
+    release.set()
+    holder.join(5)
+    assert entered.wait(5)
+    waiter.join(5)
+
+
+def test_queue_overflow_is_rejected_with_retry_after():
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+    release, holder = _hold(controller)
+    try:
+        with pytest.raises(AdmissionRejected) as info:
+            with controller.admit(1.0):
+                pass
+        assert info.value.status == 429
+        assert info.value.retry_after >= 1
+    finally:
+        release.set()
+        holder.join(5)
+
+
+def test_timeout_removes_ticket():
+    controller = AdmissionController(max_concurrent=1, max_queue=2, max_wait=0.2)
+    release, holder = _hold(controller)
+
+    with pytest.raises(AdmissionRejected) as info:
+        with controller.admit(1.0):
+            pass
+    assert info.value.status == 429
+    assert not controller._waiting
+
+    release.set()
+    holder.join(5)
+    # 超时的请求不再占着队首，后来的请求可以直接进入
+    start = time.monotonic()
+    with controller.admit(1.0):
+        pass
+    assert time.monotonic() - start < 0.1
+
+
+def test_convert_endpoint_returns_429_with_retry_after(monkeypatch):
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+    monkeypatch.setattr(server, "_admission", controller)
+    monkeypatch.setitem(server._CACHE_SETTINGS, "max_mb", 0)
+    monkeypatch.setattr(server, "_result_cache", None)
+
+    release, holder = _hold(controller)
+    try:
+        response = TestClient(server.app).post(
+            "/api/convert", files={"file": ("busy.md", b"# busy\n")}, data={"theme": "academic"})
+    finally:
+        release.set()
+        holder.join(5)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
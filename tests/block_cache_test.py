@@ -0,0 +1,70 @@
+"""
+增量转换测试：未改动的顶层块命中缓存，改动 / 删除的块失效并清理其公式临时文件，主题变化时整体失效。
+运行：
+    python -m pytest tests/block_cache_test.py
+"""
+
+import os
+
+import pytest
+
+from markpress.converter import parse_markdown, render_document
+from markpress.incremental import BlockCache
+from markpress.themes import StyleConfig
+from markpress.utils.utils import clear_temp_files
+
+DOC = "# Title\n\nfirst paragraph with $x^2$\n\nsecond paragraph\n\nsecond paragraph\n\n```python\nprint(1)\n```\n"
+
+
+@pytest.fixture
+def cache():
+    cache = BlockCache()
+    yield cache
+    cache.close()
+
+
+def _run(engine, cache, md, path, config=None):
+    engine.reset(str(path), config=config)
+    render_document(engine, parse_markdown(md), ".", block_cache=cache)
+    engine.save_pdf()
+    return cache.hits, cache.misses
+
+
+def test_unchanged_blocks_hit(offline_engine, cache, tmp_path):
+    engine = offline_engine(str(tmp_path / "a.pdf"), "github")
+    _, blocks = _run(engine, cache, DOC, tmp_path / "a.pdf")
+    # 重复的段落各占一个条目：同一个 Flowable 不能在一次 build 中出现两次
+    assert len(cache) == blocks
+    assert _run(engine, cache, DOC, tmp_path / "b.pdf") == (blocks, 0)
+    assert (tmp_path / "b.pdf").stat().st_size > 0
+
+
+def test_changed_block_is_invalidated(offline_engine, cache, tmp_path):
+    engine = offline_engine(str(tmp_path / "a.pdf"), "github")
+    _, blocks = _run(engine, cache, DOC, tmp_path / "a.pdf")
+    formula_files = set(os.listdir(cache.temp_dir))
+    assert formula_files
+
+    # 另一次转换清理共享临时目录，不影响缓存私有目录里的公式图片
+    clear_temp_files()
+    assert set(os.listdir(cache.temp_dir)) == formula_files
+
+    edited = DOC.replace("first paragraph with $x^2$", "first paragraph edited")
+    assert _run(engine, cache, edited, tmp_path / "b.pdf") == (blocks - 1, 1)
+    # 旧版本的块被丢弃，它引用的公式图片随之删除
+    assert len(cache) == blocks
+    assert not set(os.listdir(cache.temp_dir)) & formula_files
+
+
+def test_theme_change_invalidates_everything(offline_engine, cache, tmp_path):
+    engine = offline_engine(str(tmp_path / "a.pdf"), "github")
+    _, blocks = _run(engine, cache, DOC, tmp_path / "a.pdf")
+    other = StyleConfig.get_pre_build_style("academic")
+    assert _run(engine, cache, DOC, tmp_path / "b.pdf", config=other) == (0, blocks)
+
+
+def test_close_removes_private_dir(cache):
+    temp_dir = cache.temp_dir
+    assert os.path.isdir(temp_dir)
+    cache.close()
+    assert not os.path.exists(temp_dir)
@@ -0,0 +1,43 @@
+"""
+cjk_frag_split 测试：普通多片段段落与 ReportLab 的 cjkFragSplit 断行一致，
+空片段与行内图片不会崩溃，放不下的图片整体推到下一行。
+运行：
+    python -m pytest tests/cjk_paragraph_test.py
+"""
+
+from pathlib import Path
+
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Paragraph
+from reportlab.platypus.paragraph import cjkFragSplit
+
+from markpress.inherited.SafeCJKParagraph import SafeCJKParagraph, cjk_frag_split
+
+STYLE = ParagraphStyle("cjk", fontName="Helvetica", fontSize=10, wordWrap="CJK")
+IMAGE = Path(__file__).resolve().parent / "SunYZ.png"
+
+
+def _line_texts(para_lines) -> list:
+    return ["".join(getattr(w, "text", str(w)) for w in line.words) for line in para_lines.lines]
+
+
+def test_matches_reportlab_on_plain_frags():
+    frags = Paragraph("Hello <b>world</b> 中文混排，this is a test。" * 6, STYLE).frags
+    for width in (80, 120, 300):
+        assert _line_texts(cjk_frag_split(frags, [width], False)) == _line_texts(cjkFragSplit(frags, [width], False))
+
+
+def test_empty_frags_do_not_crash():
+    para = SafeCJKParagraph('<a name="anchor"/>中文<font size="10"></font>段落' * 10, STYLE)
+    para.wrap(60, 1000)
+    assert len(para.blPara.lines) > 1
+
+
+def test_overflowing_image_moves_to_next_line():
+    para = SafeCJKParagraph(f'abcdefghij <img src="{IMAGE}" width="50" height="10"/> tail', STYLE)
+    para.wrap(90, 1000)
+    lines = para.blPara.lines
+    assert len(lines) == 2
+    # 第二行以图片（空文本单元）开头，第一行没有悬挂到右边距之外
+    assert getattr(lines[1].words[0], "text", None) == ""
+    assert all(line.extraSpace >= 0 for line in lines)
@@ -0,0 +1,73 @@
+"""
+代码块 Lexer 解析测试：围栏信息串规范化、别名 / 扩展名索引、负缓存与缓存上限。
+运行：
+    python -m pytest tests/code_lexer_test.py
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("pygments")
+
+from markpress.renders import code
+from markpress.renders.code import LEXER_CACHE_SIZE, normalize_language, resolve_lexer
+
+
+@pytest.mark.parametrize("info, expected", [
+    ("python", "python"),
+    ("{python}", "python"),
+    ("{.python}", "python"),
+    ("{r, echo=FALSE}", "r"),
+    ("language-Python", "python"),
+    ('python title="a.py"', "python"),
+    ("", ""),
+    (None, ""),
+])
+def test_normalize_language(info, expected):
+    assert normalize_language(info) == expected
+
+
+@pytest.mark.parametrize("info, lexer_name", [
+    ("py", "Python"),
+    ("{.python}", "Python"),
+    ("yml", "YAML"),
+    ("rs", "Rust"),
+    ("golang", "Go"),
+    ("shell-session", "Bash Session"),
+])
+def test_aliases_and_extensions(info, lexer_name):
+    assert resolve_lexer(info).name == lexer_name
+
+
+def test_unknown_language_is_negatively_cached():
+    code._lexer_for.cache_clear()
+    assert resolve_lexer("no-such-language") is None
+    assert resolve_lexer("no-such-language") is None
+    info = code._lexer_for.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_cache_is_bounded():
+    code._lexer_for.cache_clear()
+    for i in range(LEXER_CACHE_SIZE + 50):
+        resolve_lexer(f"unknown-{i}")
+    assert code._lexer_for.cache_info().currsize == LEXER_CACHE_SIZE
+
+
+def test_concurrent_first_build(monkeypatch):
+    monkeypatch.setattr(code, "_LANG_ALIAS_INDEX", None)
+    code._lexer_for.cache_clear()
+    start = threading.Barrier(8)
+    results = []
+
+    def resolve():
+        start.wait()
+        results.append(code._build_alias_index().get("yml"))
+
+    threads = [threading.Thread(target=resolve) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["yaml"] * 8
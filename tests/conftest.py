@@ -0,0 +1,35 @@
+"""
+测试公共夹具：离线构建 MarkPressEngine。
+主题字体需要联网下载，测试中统一注册为随包附带的 JetBrainsMono，KaTeX 浏览器不启动（公式走 Matplotlib）。
+"""
+
+from pathlib import Path
+
+import pytest
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+FONTS_DIR = Path(__file__).resolve().parents[1] / "src" / "markpress" / "assets" / "fonts"
+
+
+def _register_bundled(logical_name: str, font_filename: str, font_type: str = "sans"):
+    """resolve_and_register_font 的离线替身：按字重/斜体挑选对应的 JetBrainsMono 文件"""
+    if logical_name in pdfmetrics.getRegisteredFontNames():
+        return
+    stem = Path(font_filename).stem
+    variant = "".join(suffix for suffix in ("-Bold", "-Italic") if suffix in stem)
+    pdfmetrics.registerFont(TTFont(logical_name, str(FONTS_DIR / f"JetBrainsMono{variant}.ttf")))
+
+
+@pytest.fixture
+def offline_engine(monkeypatch):
+    """在当前进程内可直接构建 MarkPressEngine（字体离线注册、不启动浏览器）"""
+    if not (FONTS_DIR / "JetBrainsMono.ttf").exists():
+        pytest.skip("缺少内置 JetBrainsMono 字体")
+    from markpress import core
+    from markpress.renders.katex import KatexRenderer
+
+    monkeypatch.setattr(core, "resolve_and_register_font", _register_bundled)
+    monkeypatch.setattr(KatexRenderer, "ensure_browser", lambda self: False)
+    monkeypatch.setattr(KatexRenderer, "close", lambda self: None)
+    return core.MarkPressEngine
@@ -0,0 +1,155 @@
+"""
+守护进程协议测试：ping / stop / convert、错误回复、无效请求、版本握手与失效套接字清理。
+转换进程池替换为进程内的假实现，不启动真实的工作进程。
+运行：
+    python -m pytest tests/daemon_test.py
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+if not hasattr(socket, "AF_UNIX"):
+    pytest.skip("当前平台不支持 Unix 套接字", allow_module_level=True)
+
+from markpress import __version__, daemon
+from markpress.daemon import Daemon, DaemonError, request, try_convert
+
+
+class FakePool:
+    size = 1
+
+    def __init__(self):
+        self.calls = []
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def run(self, md_path, pdf_path, config, preview_pages=None, offline=None):
+        self.calls.append((md_path, pdf_path, preview_pages))
+        if md_path.endswith("bad.md"):
+            err = RuntimeError("boom")
+            err.detail = "worker traceback"
+            raise err
+        return {}
+
+
+@pytest.fixture
+def socket_path():
+    # AF_UNIX 路径长度有限（约 104~108 字节），pytest 的 tmp_path 可能过长
+    root = tempfile.mkdtemp(prefix="mpd-")
+    yield os.path.join(root, "d.sock")
+    shutil.rmtree(root, ignore_errors=True)
+
+
+@pytest.fixture
+def running(socket_path, monkeypatch):
+    # signal.signal 只能在主线程调用
+    monkeypatch.setattr(daemon.signal, "signal", lambda *args: None)
+    d = Daemon(socket_path, workers=1)
+    d.pool = FakePool()
+    d._config = lambda theme: theme
+    thread = threading.Thread(target=d.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.time() + 5
+    while request({"op": "ping"}, socket_path) is None:
+        assert time.time() < deadline, "守护进程未能启动"
+        time.sleep(0.02)
+    yield d
+    if thread.is_alive():
+        request({"op": "stop"}, socket_path)
+        thread.join(timeout=5)
+
+
+def test_ping_reports_version(running, socket_path):
+    status, info = request({"op": "ping"}, socket_path)
+    assert status == "ok"
+    assert info["version"] == __version__
+    assert info["pid"] == os.getpid()
+
+
+def test_stop_removes_socket(running, socket_path):
+    assert request({"op": "stop"}, socket_path) == ("ok", None)
+    deadline = time.time() + 5
+    while os.path.exists(socket_path) and time.time() < deadline:
+        time.sleep(0.02)
+    assert not os.path.exists(socket_path)
+    assert request({"op": "ping"}, socket_path) is None
+
+
+def test_convert_ok(running, socket_path):
+    elapsed = try_convert("/abs/ok.md", "/abs/ok.pdf", "github", preview_pages=2, socket_path=socket_path)
+    assert elapsed >= 0
+    assert running.pool.calls == [("/abs/ok.md", "/abs/ok.pdf", 2)]
+    assert running.handled == 1
+
+
+def test_convert_error_carries_detail(running, socket_path):
+    with pytest.raises(DaemonError) as info:
+        try_convert("/abs/bad.md", "/abs/bad.pdf", "github", socket_path=socket_path)
+    assert "boom" in str(info.value)
+    assert info.value.detail == "worker traceback"
+    assert running.failed == 1
+
+
+@pytest.mark.parametrize("message", [["convert"], "ping", None, {"op": "nope"}])
+def test_invalid_request_gets_error_reply(running, socket_path, message):
+    status, text, _ = request(message, socket_path)
+    assert status == "error"
+    # 处理线程没有因异常退出，守护进程仍能响应
+    assert request({"op": "ping"}, socket_path)[0] == "ok"
+
+
+def test_handler_exception_is_replied(running, socket_path, monkeypatch):
+    def broken():
+        raise KeyError("started_at")
+
+    monkeypatch.setattr(running, "status", broken)
+    status, text, detail = request({"op": "ping"}, socket_path)
+    assert status == "error"
+    assert "KeyError" in text and "Traceback" in detail
+
+
+def test_version_mismatch_falls_back(running, socket_path, monkeypatch, capsys):
+    # 客户端与守护进程在同一进程内，改写守护进程上报的版本模拟升级前启动的守护进程
+    status = running.status
+    monkeypatch.setattr(running, "status", lambda: {**status(), "version": "0.0.0-other"})
+    assert try_convert("/abs/ok.md", "/abs/ok.pdf", "github", socket_path=socket_path) is None
+    assert "markpress daemon --stop" in capsys.readouterr().err
+    assert running.pool.calls == []
+
+
+def test_convert_rejects_other_client_version(running, socket_path):
+    reply = request({"op": "convert", "version": "0.0.0-other", "input": "/abs/ok.md",
+                     "output": "/abs/ok.pdf", "theme": "github"}, socket_path)
+    assert reply == ("version", __version__)
+    assert running.pool.calls == []
+
+
+def test_unavailable_daemon_returns_none(socket_path):
+    assert try_convert("/abs/ok.md", "/abs/ok.pdf", "github", socket_path=socket_path) is None
+
+
+def test_stale_socket_is_replaced(socket_path):
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(socket_path)
+    stale.close()
+    assert os.path.exists(socket_path)
+    assert request({"op": "ping"}, socket_path) is None
+
+    d = Daemon(socket_path, workers=1)
+    d._prepare_socket()
+    assert not os.path.exists(socket_path)
+
+
+def test_second_daemon_refuses_to_start(running, socket_path):
+    with pytest.raises(RuntimeError):
+        Daemon(socket_path, workers=1)._prepare_socket()
@@ -0,0 +1,82 @@
+"""
+字体解析缓存测试：还原后的字体与直接解析的测宽、子集逐字节一致，损坏或旧格式的缓存条目告警并重建。
+运行：
+    python -m pytest tests/font_cache_test.py
+"""
+
+import pickle
+from pathlib import Path
+
+import pytest
+from reportlab.pdfbase.ttfonts import TTFont
+
+from markpress.inherited.LazyTTFontFace import LazyTTFontFace
+from markpress.utils import font_cache
+from markpress.utils.font_cache import load_ttfont
+
+FONT_PATH = Path(__file__).resolve().parents[1] / "src" / "markpress" / "assets" / "fonts" / "JetBrainsMono.ttf"
+
+pytestmark = pytest.mark.skipif(not FONT_PATH.exists(), reason="缺少内置 JetBrainsMono 字体")
+
+TEXT = "The quick brown fox jumps over the lazy dog 0123456789 {}[]→≠"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(font_cache, "FONT_TABLE_CACHE_DIR", tmp_path)
+    return tmp_path
+
+
+def _entry(cache_dir) -> Path:
+    entries = list(cache_dir.glob("*.pickle"))
+    assert len(entries) == 1
+    return entries[0]
+
+
+def test_restored_font_matches_parsed(cache_dir):
+    parsed = load_ttfont("FontCacheParsed", str(FONT_PATH))
+    assert not isinstance(parsed.face, LazyTTFontFace)
+    restored = load_ttfont("FontCacheRestored", str(FONT_PATH))
+    assert isinstance(restored.face, LazyTTFontFace)
+    assert restored.fontName == "FontCacheRestored"
+    assert "_pos" not in restored.face.__dict__
+
+    for size in (9, 10.5, 12):
+        assert restored.stringWidth(TEXT, size) == parsed.stringWidth(TEXT, size)
+
+    subset = sorted({ord(c) for c in TEXT})
+    fresh = TTFont("FontCacheFresh", str(FONT_PATH))
+    assert restored.face.makeSubset(subset) == fresh.face.makeSubset(subset)
+
+
+def test_corrupt_entry_is_rebuilt(cache_dir, capsys):
+    load_ttfont("FontCacheA", str(FONT_PATH))
+    entry = _entry(cache_dir)
+    entry.write_bytes(entry.read_bytes()[:100])
+
+    font = load_ttfont("FontCacheB", str(FONT_PATH))
+    assert "[Warn]" in capsys.readouterr().out
+    assert font.stringWidth(TEXT, 10) == TTFont("FontCacheC", str(FONT_PATH)).stringWidth(TEXT, 10)
+    # 重新写入的条目可以正常还原
+    assert isinstance(load_ttfont("FontCacheD", str(FONT_PATH)).face, LazyTTFontFace)
+
+
+@pytest.mark.parametrize("mutate", [
+    # 加入版本号之前的格式：(font_state, face_state)
+    lambda version, font_state, face_state: (font_state, face_state),
+    lambda version, font_state, face_state: (version - 1, font_state, face_state),
+    lambda version, font_state, face_state: (version, font_state,
+                                             {k: v for k, v in face_state.items() if k != "charWidths"}),
+    lambda version, font_state, face_state: (version, font_state, {**face_state, "_pos": 0}),
+])
+def test_invalid_entry_is_deleted_and_rebuilt(cache_dir, capsys, mutate):
+    load_ttfont("FontCacheE", str(FONT_PATH))
+    entry = _entry(cache_dir)
+    entry.write_bytes(pickle.dumps(mutate(*pickle.loads(entry.read_bytes()))))
+
+    font = load_ttfont("FontCacheF", str(FONT_PATH))
+    assert not isinstance(font.face, LazyTTFontFace)
+    assert "[Warn]" in capsys.readouterr().out
+    version, _, face_state = pickle.loads(_entry(cache_dir).read_bytes())
+    assert version == font_cache.FONT_TABLE_FORMAT_VERSION
+    assert "charWidths" in face_state and "_pos" not in face_state
@@ -0,0 +1,70 @@
+"""
+字宽表测试：与 ReportLab stringWidth 逐位一致、孤立代理项、磁盘缓存的校验与重建。
+运行：
+    python -m pytest tests/glyph_metrics_test.py
+"""
+
+from pathlib import Path
+
+import pytest
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from markpress.utils import glyph_metrics
+from markpress.utils.glyph_metrics import VECTORIZE_MIN_LENGTH, char_widths, string_width
+
+FONT_PATH = Path(__file__).resolve().parents[1] / "src" / "markpress" / "assets" / "fonts" / "JetBrainsMono.ttf"
+FONT_NAME = "GlyphMetricsTestMono"
+
+pytestmark = pytest.mark.skipif(not FONT_PATH.exists(), reason="缺少内置 JetBrainsMono 字体")
+
+
+@pytest.fixture
+def font(tmp_path, monkeypatch):
+    monkeypatch.setattr(glyph_metrics, "METRICS_CACHE_DIR", tmp_path)
+    glyph_metrics._WIDTH_TABLES.pop(FONT_NAME, None)
+    pdfmetrics.registerFont(TTFont(FONT_NAME, str(FONT_PATH)))
+    yield FONT_NAME
+    glyph_metrics._WIDTH_TABLES.pop(FONT_NAME, None)
+
+
+@pytest.mark.parametrize("text", [
+    "Hello, world",
+    "The quick brown fox jumps over the lazy dog. " * 5,
+    "中文与 English 混排，" * 10,
+    "a" * 70 + "\ud800",
+    "\ud83d",
+])
+def test_matches_reportlab_exactly(font, text):
+    for size in (9, 10.5, 12):
+        assert string_width(text, font, size) == pdfmetrics.stringWidth(text, font, size)
+
+
+def test_vectorized_path_handles_lone_surrogates(font):
+    text = "a" * VECTORIZE_MIN_LENGTH + "\ud800" + "b"
+    assert string_width(text, font, 10) == pdfmetrics.stringWidth(text, font, 10)
+
+
+def test_char_widths_match_per_char(font):
+    text = "Wi中,"
+    assert char_widths(text, font, 10) == [pdfmetrics.stringWidth(ch, font, 10) for ch in text]
+
+
+def test_disk_table_round_trip(font, tmp_path):
+    face = pdfmetrics.getFont(font).face
+    built = glyph_metrics._load_or_build(face)
+    assert glyph_metrics._cache_path(face).exists()
+    restored = glyph_metrics._load_or_build(face)
+    assert restored.widths == built.widths
+
+
+def test_truncated_disk_table_is_rebuilt(font, capsys):
+    face = pdfmetrics.getFont(font).face
+    path = glyph_metrics._cache_path(face)
+    built = glyph_metrics._load_or_build(face)
+    path.write_bytes(path.read_bytes()[:-4])
+
+    rebuilt = glyph_metrics._load_or_build(face)
+    assert rebuilt.widths == built.widths
+    assert "[Warn]" in capsys.readouterr().out
+    assert path.stat().st_size == len(built.widths) * built.widths.itemsize
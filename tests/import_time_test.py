@@ -0,0 +1,40 @@
+"""
+导入开销回归测试：CLI 与转换入口不应在导入阶段加载重量级依赖。
+Matplotlib 只在公式退回 Matplotlib 渲染时加载，Playwright 只在遇到公式或 SVG 时加载，
+Pygments 的 lexer 注册表只在遇到围栏代码块时加载。
+运行：
+    python -m pytest tests/import_time_test.py
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+HEAVY_MODULES = ("matplotlib", "playwright", "pygments.lexers", "emoji", "bs4", "numpy")
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+
+
+def _loaded_heavy_modules(module: str) -> list:
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    return [m for m in _run(code).stdout.strip().split(",") if m]
+
+
+def test_cli_import_is_light():
+    assert _loaded_heavy_modules("markpress.cli") == []
+
+
+def test_daemon_client_import_is_light():
+    # convert 交给守护进程时只导入 CLI 与客户端
+    assert _loaded_heavy_modules("markpress.daemon") == []
+    assert "reportlab" not in _run("import sys, markpress.daemon; print(sorted(sys.modules))").stdout
+
+
+def test_converter_import_defers_heavy_modules():
+    assert _loaded_heavy_modules("markpress.converter") == []
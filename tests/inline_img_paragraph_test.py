@@ -0,0 +1,49 @@
+"""
+行内公式图段落测试：<br/> 注入结果按可用宽度缓存，同一宽度只解析一次，不同宽度互不影响。
+运行：
+    python -m pytest tests/inline_img_paragraph_test.py
+"""
+
+import pytest
+from reportlab.lib.styles import ParagraphStyle
+
+from markpress.inherited.SmartInlineImgParagraph import SmartInlineImgParagraph
+
+PIL = pytest.importorskip("PIL.Image")
+
+STYLE = ParagraphStyle("body", fontName="Helvetica", fontSize=10, leading=14)
+
+
+@pytest.fixture
+def para(tmp_path):
+    png = tmp_path / "formula.png"
+    PIL.new("RGB", (8, 2)).save(png)
+    img = f'<img src="{png}" width="80" height="12" valign="middle"/>'
+    return SmartInlineImgParagraph("word " * 8 + img + " tail " + img, STYLE)
+
+
+def test_injection_is_parsed_once_per_width(para, monkeypatch):
+    setups = []
+    base_setup = SmartInlineImgParagraph._setup
+
+    def setup(self, *args):
+        setups.append(args[0])
+        return base_setup(self, *args)
+
+    monkeypatch.setattr(SmartInlineImgParagraph, "_setup", setup)
+    narrow = para.wrap(120, 1000)
+    assert para.wrap(120, 1000) == narrow
+    assert len(setups) == 1 and "<br/>" in setups[0]
+
+    # 宽版面无需注入，回到原始解析结果；再回到窄宽度时直接复用缓存
+    wide = para.wrap(400, 1000)
+    assert wide[1] < narrow[1]
+    assert "<br/>" not in para.text
+    assert para.wrap(120, 1000) == narrow
+    assert len(setups) == 1
+
+
+def test_breaks_do_not_leak_between_widths(para):
+    fresh_wide = para.wrap(400, 1000)
+    para.wrap(120, 1000)
+    assert para.wrap(400, 1000) == fresh_wide
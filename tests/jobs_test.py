@@ -0,0 +1,93 @@
+"""
+异步任务测试：排队上限、过期结果的后台清理，以及多个实例共用同一任务根目录时互不删除对方的文件。
+运行：
+    python -m pytest tests/jobs_test.py
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from markpress import jobs
+from markpress.jobs import JobManager, JobQueueFull
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _write_result(job, progress):
+    Path(job.result_path).write_bytes(b"%PDF-1.4")
+
+
+def test_queue_bound(tmp_path):
+    release = threading.Event()
+
+    def blocking(job, progress):
+        release.wait(5)
+        _write_result(job, progress)
+
+    manager = JobManager(str(tmp_path), workers=1, max_queue=1, runner=blocking)
+    manager.start()
+    try:
+        running = manager.submit("a.md", b"# a")
+        assert _wait(lambda: running.status == "running")
+        queued = manager.submit("b.md", b"# b")
+        with pytest.raises(JobQueueFull):
+            manager.submit("c.md", b"# c")
+        assert manager.queue_size() == 1
+
+        release.set()
+        assert _wait(lambda: queued.status == "done")
+        # 队列空出后可以继续提交
+        manager.submit("d.md", b"# d")
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_expired_jobs_are_purged_in_background(tmp_path):
+    manager = JobManager(str(tmp_path), workers=1, result_ttl=0.1, purge_interval=0.05, runner=_write_result)
+    manager.start()
+    try:
+        job = manager.submit("a.md", b"# a", images=[(["fig", "x.png"], b"png")])
+        assert os.path.exists(os.path.join(job.work_dir, "fig", "x.png"))
+        assert _wait(lambda: job.status == "done")
+        # 不调用 submit / get，后台线程也会清理过期结果
+        assert _wait(lambda: job.id not in manager._jobs)
+        assert not os.path.exists(job.work_dir)
+    finally:
+        manager.shutdown()
+
+
+def test_instances_sharing_a_root(tmp_path):
+    first = JobManager(str(tmp_path), workers=1, runner=_write_result)
+    first.start()
+    second = None
+    try:
+        job = first.submit("a.md", b"# a")
+        assert _wait(lambda: job.status == "done")
+
+        stale = tmp_path / "12345-deadbeef"
+        stale.mkdir()
+        old = time.time() - jobs.STALE_ROOT_SECONDS - 10
+        os.utime(stale, (old, old))
+
+        second = JobManager(str(tmp_path), workers=1, runner=_write_result)
+        second.start()
+        assert second.root != first.root
+        assert os.path.exists(job.result_path)
+        assert not stale.exists()
+    finally:
+        first.shutdown()
+        if second is not None:
+            second.shutdown()
+    assert not os.path.exists(first.root)
@@ -0,0 +1,44 @@
+"""
+实时预览测试：/ws/live 增量渲染、图片总大小按替换后的集合计算（同一路径重复上传不累加）。
+运行：
+    python -m pytest tests/live_test.py
+"""
+
+import base64
+
+from fastapi.testclient import TestClient
+
+from markpress import server
+from markpress.admission import AdmissionController
+
+
+def _image(path: str, size: int) -> dict:
+    return {"type": "image", "path": path, "data": base64.b64encode(b"x" * size).decode("ascii")}
+
+
+def _render(markdown: str) -> dict:
+    return {"type": "render", "markdown": markdown, "theme": "github"}
+
+
+def test_reuploading_an_image_replaces_its_size(offline_engine, monkeypatch):
+    monkeypatch.setattr(server, "_admission", AdmissionController(max_image_bytes=100))
+    with TestClient(server.app).websocket_connect("/ws/live") as ws:
+        for _ in range(3):
+            ws.send_json(_image("fig.png", 80))
+        ws.send_json(_render("# Doc\n\ntext\n"))
+        first = ws.receive_json()
+        assert first["type"] == "rendered", first
+        assert ws.receive_bytes().startswith(b"%PDF")
+
+        ws.send_json(_image("other.png", 80))
+        error = ws.receive_json()
+        assert error["type"] == "error" and "图片总大小过大" in error["detail"]
+
+        # 被拒绝的图片没有保存：替换为更小的内容后仍在上限内
+        ws.send_json(_image("fig.png", 10))
+        ws.send_json(_image("other.png", 80))
+        ws.send_json(_render("# Doc\n\nedited\n"))
+        second = ws.receive_json()
+        assert second["type"] == "rendered", second
+        assert second["reused"] == 0
+        ws.receive_bytes()
@@ -0,0 +1,80 @@
+"""
+运行指标测试：Counter / Gauge / Histogram 的 Prometheus 文本格式，以及 /metrics 导出的转换指标。
+运行：
+    python -m pytest tests/metrics_test.py
+"""
+
+from fastapi.testclient import TestClient
+
+from markpress import server
+from markpress.utils.metrics import Registry
+
+
+def test_counter_and_gauge_format():
+    registry = Registry()
+    hits = registry.counter("demo_hits_total", "Hits by path", ("path",))
+    hits.inc(path="/a")
+    hits.inc(2, path='/"b"')
+    registry.counter("demo_plain_total", "Never updated")
+    workers = registry.gauge("demo_workers", "Workers")
+    workers.inc(3)
+    workers.dec()
+    assert registry.counter("demo_hits_total", "ignored") is hits
+
+    assert registry.render().splitlines() == [
+        "# HELP demo_hits_total Hits by path",
+        "# TYPE demo_hits_total counter",
+        'demo_hits_total{path="/\\"b\\""} 2',
+        'demo_hits_total{path="/a"} 1',
+        "# HELP demo_plain_total Never updated",
+        "# TYPE demo_plain_total counter",
+        "demo_plain_total 0",
+        "# HELP demo_workers Workers",
+        "# TYPE demo_workers gauge",
+        "demo_workers 2",
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("demo_seconds", "Latency", ("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        latency.observe(value, stage="layout")
+
+    assert latency.samples() == [
+        'demo_seconds_bucket{stage="layout",le="0.1"} 1',
+        'demo_seconds_bucket{stage="layout",le="1"} 3',
+        'demo_seconds_bucket{stage="layout",le="+Inf"} 4',
+        'demo_seconds_sum{stage="layout"} 4.05',
+        'demo_seconds_count{stage="layout"} 4',
+    ]
+
+
+def _sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_endpoint_counts_conversions(monkeypatch):
+    monkeypatch.setitem(server._CACHE_SETTINGS, "max_mb", 0)
+    monkeypatch.setattr(server, "_result_cache", None)
+    monkeypatch.setitem(server._UPLOAD_SETTINGS, "in_memory", False)
+    monkeypatch.setattr(server, "_convert_on_disk", lambda *args: (b"%PDF-1.4 fake", {"layout": 0.01}))
+    client = TestClient(server.app)
+
+    before = client.get("/metrics")
+    assert before.status_code == 200
+    assert before.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE markpress_conversion_duration_seconds histogram" in before.text
+
+    response = client.post("/api/convert", files={"file": ("doc.md", b"# doc\n")}, data={"theme": "academic"})
+    assert response.status_code == 200
+
+    after = client.get("/metrics").text
+    success = 'markpress_conversions_total{outcome="success"}'
+    assert _sample(after, success) == _sample(before.text, success) + 1
+    layout = 'markpress_conversion_stage_seconds_count{stage="layout"}'
+    assert _sample(after, layout) == _sample(before.text, layout) + 1
+    assert _sample(after, "markpress_conversions_in_flight") == 0
@@ -0,0 +1,72 @@
+"""
+并行分段排版测试：按顶层标题切分章节、收集锚点，跨章节链接在拼接后改写为指向正确页面的页内跳转。
+运行：
+    python -m pytest tests/parallel_sections_test.py
+"""
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+from pypdf import PdfReader
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate
+
+from markpress.converter import parse_markdown
+from markpress.inherited.SectionCanvas import ANCHOR_URI_PREFIX, SectionCanvas
+from markpress.parallel import collect_anchors, split_sections, stitch_sections
+
+BODY = ParagraphStyle("body", fontName="Helvetica", fontSize=10, leading=14)
+
+
+def test_split_by_top_level_heading():
+    ast = parse_markdown("intro\n\n## A\n\ntext\n\n### A.1\n\n## B\n\nmore\n")
+    sections = split_sections(ast)
+    assert len(sections) == 3
+    # 标题之前的内容归入第一段，更低级的标题不切分
+    assert sections[0][0]["type"] == "paragraph"
+    assert [t["type"] for t in sections[1]].count("heading") == 2
+
+
+def test_collect_anchors_includes_html_names():
+    ast = parse_markdown('# Hello World\n\n<a name="manual-anchor"></a>\n\ntext\n')
+    anchors = collect_anchors(ast)
+    assert "manual-anchor" in anchors
+    assert len(anchors) == 2
+
+
+def _section(path, story, foreign):
+    doc = SimpleDocTemplate(str(path))
+    doc.build(story, canvasmaker=lambda *a, **kw: SectionCanvas(*a, foreign_anchors=foreign, **kw))
+    return doc.canv.anchor_positions()
+
+
+def test_cross_section_links_are_rewritten(tmp_path):
+    first, second, out = tmp_path / "s0.pdf", tmp_path / "s1.pdf", tmp_path / "out.pdf"
+    pos0 = _section(first, [
+        Paragraph('<a name="intro"/>Intro <a href="#details">see details</a>', BODY),
+        PageBreak(),
+        Paragraph('<a href="#intro">back to intro</a>', BODY),
+    ], foreign={"details"})
+    pos1 = _section(second, [
+        Paragraph("filler", BODY), PageBreak(),
+        Paragraph('<a name="details"/>Details', BODY),
+    ], foreign={"intro"})
+    assert pos0["intro"][0] == 0 and pos1["details"][0] == 1
+
+    stitch_sections([str(first), str(second)], [pos0, pos1], str(out), title="Doc")
+
+    reader = PdfReader(str(out))
+    assert len(reader.pages) == 4
+    page_of = {page.indirect_reference.idnum: i for i, page in enumerate(reader.pages)}
+    links = {}
+    for i, page in enumerate(reader.pages):
+        for annot in page.get("/Annots") or []:
+            annot = annot.get_object()
+            assert ANCHOR_URI_PREFIX not in str(annot.get("/A", ""))
+            dest = annot.get("/Dest")
+            if dest is not None:
+                links[i] = page_of[dest[0].idnum]
+    # 第 0 页 -> 第二段的第 2 页（全局第 3 页）；第 1 页的段内链接 -> 第 0 页
+    assert links == {0: 3, 1: 0}
+    assert reader.metadata.title == "Doc"
@@ -0,0 +1,48 @@
+"""
+预览模式测试：只排前 N 页，截断之后的块不再渲染（公式不再调用渲染器），文件与内存两条转换路径一致。
+运行：
+    python -m pytest tests/preview_test.py
+"""
+
+import re
+
+from markpress.converter import convert_markdown_bytes, convert_markdown_file
+from markpress.utils.metrics import FORMULA_RENDERS
+
+DOC = "\n\n".join(f"# Chapter {c}\n\n" + "\n\n".join(
+    f"Paragraph {c}.{i} with $x_{{{c}{i}}}^2$ " + "lorem ipsum dolor " * 20 for i in range(10))
+    for c in range(6))
+
+
+def _pages(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", pdf))
+
+
+def _formulas() -> float:
+    return sum(FORMULA_RENDERS.value(engine=e) for e in ("katex", "matplotlib"))
+
+
+def test_preview_stops_layout_and_rendering(offline_engine, tmp_path):
+    md = tmp_path / "doc.md"
+    md.write_text(DOC, encoding="utf-8")
+
+    start = _formulas()
+    convert_markdown_file(str(md), str(tmp_path / "full.pdf"), "github")
+    full_formulas = _formulas() - start
+    full_pages = _pages((tmp_path / "full.pdf").read_bytes())
+    assert full_pages > 4
+
+    start = _formulas()
+    convert_markdown_file(str(md), str(tmp_path / "preview.pdf"), "github", preview_pages=2)
+    assert _pages((tmp_path / "preview.pdf").read_bytes()) == 2
+    assert _formulas() - start < full_formulas / 2
+
+
+def test_preview_in_memory(offline_engine):
+    pdf = convert_markdown_bytes(DOC.encode("utf-8"), theme="github", preview_pages=1)
+    assert _pages(pdf) == 1
+
+
+def test_preview_longer_than_document(offline_engine):
+    pdf = convert_markdown_bytes(b"# Short\n\ntext\n", theme="github", preview_pages=5)
+    assert _pages(pdf) == 1
@@ -0,0 +1,68 @@
+"""
+引用块测试：QuoteBlock 在子元素之间与子元素内部跨页拆分，嵌套引用递归拆分，超过一页的长引用正常排版。
+运行：
+    python -m pytest tests/quote_block_test.py
+"""
+
+import io
+
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+from markpress.inherited.QuoteBlock import QuoteBlock
+
+BODY = ParagraphStyle("body", fontName="Helvetica", fontSize=10, leading=14)
+CANVAS = Canvas(io.BytesIO())
+
+
+def _quote(content):
+    return QuoteBlock(content, border_width=2, border_color=colors.grey, left_padding=8)
+
+
+def _paras(n, words=5):
+    return [Paragraph(f"line {i} " + "text " * words, BODY) for i in range(n)]
+
+
+def _build(story) -> int:
+    pages = []
+    doc = SimpleDocTemplate(io.BytesIO())
+    doc.build(story, onLaterPages=lambda c, d: pages.append(d.page))
+    return 1 + len(pages)
+
+
+def test_fits_without_split():
+    quote = _quote(_paras(3))
+    quote.wrapOn(CANVAS, 300, 1000)
+    assert quote.splitOn(CANVAS, 300, 1000) == [quote]
+
+
+def test_splits_between_children():
+    content = _paras(10)
+    quote = _quote(content)
+    head, tail = quote.splitOn(CANVAS, 300, 14 * 4 + 3)
+    assert head.content + tail.content == content
+    assert len(head.content) == 4
+
+
+def test_splits_inside_a_tall_child():
+    long_para = Paragraph("word " * 400, BODY)
+    head, tail = _quote([long_para]).splitOn(CANVAS, 300, 200)
+    _, head_h = head.wrapOn(CANVAS, 300, 200)
+    assert head_h <= 200
+    assert len(tail.content) == 1 and tail.content[0] is not long_para
+
+
+def test_nested_quote_splits_recursively():
+    inner = _quote(_paras(20))
+    outer = _quote(_paras(2) + [inner])
+    head, tail = outer.splitOn(CANVAS, 300, 200)
+    assert isinstance(head.content[-1], QuoteBlock)
+    assert isinstance(tail.content[0], QuoteBlock)
+    assert head.content[-1].content + tail.content[0].content == inner.content
+
+
+def test_quote_taller_than_a_page_builds():
+    assert _build([_quote(_paras(300))]) > 3
+    assert _build([_quote([Paragraph("word " * 5000, BODY)])]) > 1
@@ -0,0 +1,59 @@
+"""
+PDF 结果缓存测试：内容哈希的组成、按修改时间的 LRU 淘汰与覆盖写入时的容量统计。
+运行：
+    python -m pytest tests/result_cache_test.py
+"""
+
+import os
+
+from markpress.result_cache import ResultCache, result_key
+
+
+def _key(markdown=b"# doc", images=(), theme="academic", preview_pages=0):
+    return result_key(markdown, list(images), theme, "A4", "portrait", preview_pages)
+
+
+def _age(cache: ResultCache, key: str, mtime: float):
+    os.utime(cache._path(key), (mtime, mtime))
+
+
+def test_key_covers_inputs():
+    fig = (["assets", "fig.png"], b"png-1")
+    logo = (["logo.png"], b"png-2")
+    base = _key(images=[fig, logo])
+    # 上传顺序无关
+    assert _key(images=[logo, fig]) == base
+    assert _key(images=[fig, (["logo.png"], b"png-3")]) != base
+    assert _key(markdown=b"# other", images=[fig, logo]) != base
+    assert _key(images=[fig, logo], theme="github") != base
+    assert _key(images=[fig, logo], preview_pages=2) != base
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=250)
+    for i, key in enumerate(("a", "b")):
+        cache.put(key, b"x" * 100)
+        _age(cache, key, 1000 + i)
+    # 读取刷新 a 的 LRU 时间，b 成为最久未用
+    assert cache.get("a") == b"x" * 100
+
+    cache.put("c", b"y" * 100)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache._size == 200
+
+
+def test_overwrite_counts_size_once(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1000)
+    cache.put("a", b"x" * 300)
+    cache.put("a", b"x" * 300)
+    cache.put("a", b"x" * 200)
+    assert cache._size == 200
+
+
+def test_oversized_result_is_not_stored(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=10)
+    cache.put("a", b"x" * 11)
+    assert cache.get("a") is None
+    assert cache._size == 0
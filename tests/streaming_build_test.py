@@ -0,0 +1,82 @@
+"""
+流式构建测试：分段喂入的排版结果与一次性 build 逐字节一致，已排版的 Flowable 随即释放。
+运行：
+    python -m pytest tests/streaming_build_test.py
+"""
+
+import io
+
+from reportlab import rl_config
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Paragraph
+
+from markpress.inherited.StreamingDocTemplate import StreamingDocTemplate
+
+BODY = ParagraphStyle("body", fontName="Helvetica", fontSize=10, leading=14)
+HEADING = ParagraphStyle("heading", parent=BODY, fontSize=14, leading=18, keepWithNext=1)
+
+
+def _story(n=300):
+    return [Paragraph(f"para {i} " + "text " * 40, HEADING if i % 25 == 0 else BODY) for i in range(n)]
+
+
+def test_chunked_feed_matches_single_build():
+    whole = io.BytesIO()
+    StreamingDocTemplate(whole, invariant=1).build(_story())
+
+    streamed = io.BytesIO()
+    doc = StreamingDocTemplate(streamed, invariant=1)
+    doc.begin_stream()
+    story = _story()
+    for start in range(0, len(story), 37):
+        doc.feed(story[start:start + 37])
+    doc.feed([], final=True)
+    doc.end_stream()
+    assert streamed.getvalue() == whole.getvalue()
+
+
+def test_feed_releases_flowables_but_holds_keep_with_next():
+    doc = StreamingDocTemplate(io.BytesIO())
+    doc.begin_stream()
+    chunk = _story(10) + [Paragraph("next section", HEADING)]
+    doc.feed(chunk)
+    # 末尾的标题要和下一段的首个段落排在一起，留到下一次 feed
+    assert len(chunk) == 1 and chunk[0].style is HEADING
+    chunk.append(Paragraph("body", BODY))
+    doc.feed(chunk, final=True)
+    assert chunk == []
+    doc.end_stream()
+
+
+def test_engine_stream_mode_matches_normal_build(offline_engine, tmp_path, monkeypatch):
+    from markpress.converter import convert_markdown_file
+
+    monkeypatch.setattr(rl_config, "invariant", 1)
+    md = tmp_path / "long.md"
+    sections = [f"# Chapter {c}\n\n" + "\n\n".join(f"Paragraph {c}.{i} " + "lorem ipsum " * 30 for i in range(20))
+                for c in range(4)]
+    md.write_text("\n\n".join(sections), encoding="utf-8")
+
+    convert_markdown_file(str(md), str(tmp_path / "whole.pdf"), "github")
+    convert_markdown_file(str(md), str(tmp_path / "stream.pdf"), "github", stream=True, stream_chunk=7)
+    assert (tmp_path / "stream.pdf").read_bytes() == (tmp_path / "whole.pdf").read_bytes()
+
+
+def test_engine_checkpoint_skips_nested_quotes(offline_engine, tmp_path):
+    engine = offline_engine(str(tmp_path / "out.pdf"), "github", stream=True, stream_chunk=5)
+    for i in range(12):
+        engine.add_text(f"paragraph {i}")
+        engine.stream_checkpoint()
+    assert len(engine.story) < 5
+
+    # 引用内部不切段：QuoteBlock 还没有生成，即使顶层已攒够一段也保持不动
+    while len(engine.story) < 5:
+        engine.add_text("pending")
+    engine.start_quote()
+    kept = len(engine.story)
+    for i in range(12):
+        engine.add_text(f"quoted {i}")
+        engine.stream_checkpoint()
+    assert len(engine.story) == kept
+    engine.end_quote()
+    engine.save_pdf()
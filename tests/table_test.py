@@ -0,0 +1,112 @@
+"""
+表格渲染测试：内容感知的列宽分配，大表单元格在 LongTable 分页重测时复用断行结果。
+运行：
+    python -m pytest tests/table_test.py
+"""
+
+import io
+
+import pytest
+from reportlab.lib.styles import ParagraphStyle, StyleSheet1
+from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate
+
+from markpress.inherited.WrapMemoParagraph import WrapMemoParagraph
+from markpress.renders.table import TableRenderer
+
+CELL_STYLE = ParagraphStyle("cell", fontName="Helvetica", fontSize=9, leading=12)
+
+_BASE_INIT, _BASE_WRAP = Paragraph.__init__, Paragraph.wrap
+
+
+def _renderer() -> TableRenderer:
+    """表头/单元格样式预先放入样式表，_init_styles 不再读取主题字体"""
+    sheet = StyleSheet1()
+    sheet.add(ParagraphStyle("Table_Header", fontName="Helvetica-Bold", fontSize=10))
+    sheet.add(ParagraphStyle("Table_Cell", fontName="Helvetica", fontSize=10))
+    return TableRenderer(None, sheet)
+
+
+def _widths(header, body, avail=400.0, spans=()):
+    return TableRenderer._compute_col_widths(_renderer(), header, body, len(header), avail, list(spans))
+
+
+def test_narrow_table_fills_width_by_max_content():
+    widths = _widths(["id", "name"], [["1", "alpha"], ["2", "beta"]])
+    assert sum(widths) == pytest.approx(400)
+    assert widths[1] > widths[0]
+
+
+def test_long_text_column_takes_the_slack():
+    prose = "lorem ipsum dolor sit amet " * 20
+    widths = _widths(["id", "text"], [["1", prose]])
+    assert sum(widths) == pytest.approx(400)
+    # 短列保持其最大内容宽度，不被长文本列挤压到最小宽度以下
+    renderer = _renderer()
+    id_max = renderer._measure_cell("id", "Helvetica-Bold", 10)[1] + 2 * TableRenderer.CELL_PADDING
+    assert widths[0] >= id_max - 1e-6
+    assert widths[1] > 300
+
+
+def test_min_content_overflow_is_scaled():
+    word = "x" * 60
+    widths = _widths(["a", "b", "c"], [[word, word, word]], avail=300)
+    assert sum(widths) == pytest.approx(300)
+    assert widths[0] == pytest.approx(widths[1]) == pytest.approx(widths[2])
+
+
+def test_spanned_cells_are_not_measured():
+    wide = "a very long spanning caption that would widen the first column"
+    header = ["k", "v"]
+    body = [[wide, ""], ["1", "value"]]
+    plain = _widths(header, body)
+    spanned = _widths(header, body, spans=[((0, 1), (1, 1))])
+    assert spanned[0] < plain[0]
+    assert sum(spanned) == pytest.approx(400)
+
+
+def test_measure_cell_lines_and_images():
+    renderer = _renderer()
+    one_min, one_max = renderer._measure_cell("short<br/>a much longer line", "Helvetica", 10)
+    assert one_max == pytest.approx(renderer._measure_cell("a much longer line", "Helvetica", 10)[1])
+    assert one_min == pytest.approx(renderer._measure_cell("longer", "Helvetica", 10)[1])
+
+    img_min, img_max = renderer._measure_cell('<img src="a.png" width="120" height="40"/>', "Helvetica", 10)
+    assert img_min == img_max == 120
+
+
+def _count_layout(monkeypatch, cell_cls, rows: int = 1000, cols: int = 3) -> dict:
+    """排版一张 rows 行的 LongTable，统计 Paragraph 的构建与真正断行的次数"""
+    counts = {"build": 0, "wrap": 0}
+
+    def init(self, *args, **kwargs):
+        counts["build"] += 1
+        _BASE_INIT(self, *args, **kwargs)
+
+    def wrap(self, *args):
+        counts["wrap"] += 1
+        return _BASE_WRAP(self, *args)
+
+    monkeypatch.setattr(Paragraph, "__init__", init)
+    monkeypatch.setattr(Paragraph, "wrap", wrap)
+    data = [[cell_cls(f"row {i} col {j}", CELL_STYLE) for j in range(cols)] for i in range(rows)]
+    SimpleDocTemplate(io.BytesIO()).build([LongTable(data, colWidths=[150] * cols, repeatRows=1)])
+    return counts
+
+
+def test_large_table_wraps_each_cell_once(monkeypatch):
+    plain = _count_layout(monkeypatch, Paragraph)
+    memo = _count_layout(monkeypatch, WrapMemoParagraph)
+
+    cells = 1000 * 3
+    assert plain["build"] == memo["build"] == cells
+    # 分页时剩余的行被拼成新表重新测量：普通 Paragraph 每次都重新断行
+    assert plain["wrap"] > 2 * cells
+    assert memo["wrap"] == cells
+
+
+def test_memo_rewraps_on_width_change():
+    para = WrapMemoParagraph("some words " * 20, CELL_STYLE)
+    _, tall = para.wrap(100, 1000)
+    assert para.wrap(100, 1000)[1] == tall
+    _, short = para.wrap(400, 1000)
+    assert short < tall
@@ -0,0 +1,37 @@
+"""
+MemoryFS 测试：内存转换时 Markdown 中的相对图片路径按虚拟根目录解析，不访问磁盘。
+运行：
+    python -m pytest tests/vfs_test.py
+"""
+
+import os
+
+from markpress.utils.vfs import MEMORY_ROOT, MemoryFS
+
+
+def test_paths_are_normalised_under_root():
+    files = MemoryFS()
+    files.add(["assets", "fig1.png"], b"png")
+
+    path = os.path.join(MEMORY_ROOT, "assets", "fig1.png")
+    assert files.read(path) == b"png"
+    assert files.read(os.path.join(MEMORY_ROOT, "assets", ".", "..", "assets", "fig1.png")) == b"png"
+    assert path in files
+    assert files.open(path).read() == b"png"
+
+
+def test_missing_file():
+    files = MemoryFS()
+    missing = os.path.join(MEMORY_ROOT, "nope.png")
+    assert files.read(missing) is None
+    assert files.open(missing) is None
+    assert missing not in files
+
+
+def test_replace_and_size():
+    files = MemoryFS()
+    files.add(["a.png"], b"12")
+    files.add(["b", "c.png"], b"345")
+    files.add(["a.png"], b"6789")
+    assert len(files) == 2
+    assert files.total_bytes == 7
@@ -0,0 +1,75 @@
+"""
+监听重建测试：收集本地图片依赖，连续多次改动只在静默 DEBOUNCE_SECONDS 后合并为一次重建。
+运行：
+    python -m pytest tests/watch_test.py
+"""
+
+import os
+import threading
+import time
+
+from markpress import watch
+from markpress.converter import parse_markdown
+from markpress.watch import Watcher, collect_local_images
+
+
+def test_collect_local_images(tmp_path):
+    ast = parse_markdown('![a](fig/a.png)\n\n<img src="b.png" width="10">\n\n![c](https://example.com/c.png)\n')
+    assert collect_local_images(ast, str(tmp_path)) == {
+        os.path.normpath(tmp_path / "fig" / "a.png"),
+        os.path.normpath(tmp_path / "b.png"),
+    }
+
+
+def _touch(path, stamp_ns):
+    os.utime(path, ns=(stamp_ns, stamp_ns))
+
+
+def test_burst_of_changes_triggers_one_rebuild(offline_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(watch, "POLL_INTERVAL", 0.02)
+    monkeypatch.setattr(watch, "DEBOUNCE_SECONDS", 0.3)
+    md, img = tmp_path / "doc.md", tmp_path / "fig.png"
+    img.write_bytes(b"not really a png")
+    md.write_text("# Doc\n\ntext\n", encoding="utf-8")
+
+    watcher = Watcher(str(md), str(tmp_path / "doc.pdf"), "github")
+    try:
+        # 跳过首次构建，直接以当前版本为基准检测改动
+        watcher._images = {str(img)}
+        watcher._mtimes = watcher._snapshot()
+
+        base = time.time_ns()
+        last_write = []
+
+        def edit():
+            for i in range(1, 4):
+                time.sleep(0.1)
+                _touch(md, base + i * 10 ** 9)
+            _touch(img, base + 5 * 10 ** 9)
+            last_write.append(time.monotonic())
+
+        editor = threading.Thread(target=edit)
+        editor.start()
+        changed = watcher._wait_for_change()
+        returned = time.monotonic()
+        editor.join()
+
+        # 改动期间不返回：最后一次写入（图片）也被合并进同一批
+        assert changed == {str(md), str(img)}
+        assert returned - last_write[0] >= watch.DEBOUNCE_SECONDS
+    finally:
+        watcher.close()
+
+
+def test_rebuild_reuses_unchanged_blocks(offline_engine, tmp_path):
+    md = tmp_path / "doc.md"
+    md.write_text("# Doc\n\nfirst\n\nsecond\n", encoding="utf-8")
+    watcher = Watcher(str(md), str(tmp_path / "doc.pdf"), "github")
+    try:
+        assert watcher.rebuild()
+        md.write_text("# Doc\n\nfirst\n\nsecond edited\n", encoding="utf-8")
+        assert watcher.rebuild()
+        assert watcher.block_cache.misses == 1
+        assert watcher.block_cache.hits > 0
+    finally:
+        watcher.close()
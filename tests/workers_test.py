@@ -0,0 +1,96 @@
+"""
+转换进程池测试：默认以 spawn 启动，按任务数 / 内存回收并拉起替补进程，进程崩溃与转换异常分别上报。
+工作进程替换为只实现通信协议的轻量替身，不加载字体与浏览器。
+运行：
+    python -m pytest tests/workers_test.py
+"""
+
+import os
+
+import pytest
+
+from markpress import workers
+from markpress.workers import ConversionFailed, WorkerCrashed, WorkerPool
+
+
+def _fake_worker(conn, warm_themes):
+    """与 workers._worker_main 相同的消息格式：阶段耗时里带上进程号，source 控制内存 / 崩溃 / 失败"""
+    conn.send(("ready", os.getpid(), 10.0))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        kind, source, target, config, preview_pages, offline = message
+        if source == "crash":
+            os._exit(3)
+        if source == "fail":
+            conn.send(("error", "ValueError", "bad input", 10.0, "Traceback: ValueError"))
+            continue
+        rss = 4096.0 if source == "fat" else 10.0
+        conn.send(("ok", {"pid": os.getpid()}, 0.0, rss, None))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(workers, "_worker_main", _fake_worker)
+    created = []
+
+    def make(**kwargs):
+        p = WorkerPool(1, **kwargs)
+        p.start()
+        created.append(p)
+        return p
+
+    yield make
+    for p in created:
+        p.close()
+
+
+def _pid(pool: WorkerPool, source: str = "doc.md") -> int:
+    return pool.run(source, "out.pdf", None, timeout=60)["pid"]
+
+
+def _recycles(reason: str) -> float:
+    return workers._RECYCLES.value(reason=reason)
+
+
+def test_spawn_is_the_default_start_method():
+    assert WorkerPool(1)._ctx.get_start_method() == "spawn"
+
+
+def test_recycles_after_max_jobs(pool):
+    p = pool(max_jobs=2)
+    before = _recycles("jobs")
+    first = _pid(p)
+    assert _pid(p) == first
+    # 第二个任务后进程被回收，后台预热的替补接手下一个任务
+    replacement = _pid(p)
+    assert replacement != first
+    assert _recycles("jobs") == before + 1
+
+
+def test_recycles_on_rss(pool):
+    p = pool(max_rss_mb=1024)
+    first = _pid(p, "fat")
+    assert _pid(p) != first
+
+
+def test_crash_is_reported_and_replaced(pool):
+    p = pool()
+    first = _pid(p)
+    with pytest.raises(WorkerCrashed):
+        _pid(p, "crash")
+    assert _pid(p) != first
+
+
+def test_conversion_error_keeps_worker(pool):
+    p = pool()
+    first = _pid(p)
+    with pytest.raises(ConversionFailed) as info:
+        _pid(p, "fail")
+    assert info.value.exc_name == "ValueError"
+    assert info.value.detail == "Traceback: ValueError"
+    assert _pid(p) == first